@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de los caminos calientes del tablero, sin red ni Streamlit:
+descarga de Sheets (contra un servidor HTTP local que imita export/gviz),
+parsers, lectura del libro EPM en xlsx / csv, procesar_solar, cubos, filtros, agregación por vista,
+pronóstico, detección de anomalías, figuras y exportación.
+Los datos son sintéticos con el esquema de POR MES / POR DIA / POR HORA y
+EPM, de 1 a 20 años de datos horarios para N plantas.
+
+    python bench.py                                 # 1, 5 y 20 años × 2 y 8 plantas
+    python bench.py --anios 1 5 --plantas 2 -o base.json
+    python bench.py --comparar base.json nuevo.json
+
+Por etapa se informa el mejor tiempo de --repeticiones corridas, el pico
+de memoria (tracemalloc, en una corrida aparte para no inflar el tiempo)
+y filas/s. Los resultados se guardan en JSON (por defecto en bench/)
+para comparar corridas.
+"""
+import io, os, re, sys, json, time, hashlib, argparse, platform, tempfile, threading, tracemalloc
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import gedicol
+import figuras
+
+# ======================
+# DATOS SINTÉTICOS
+# ======================
+HORAS_SOL = range(6, 19)   # las pestañas sólo traen horas con generación
+FIN = pd.Timestamp("2026-06-30")
+
+def nombres_plantas(n):
+    """CAFE y MERCADO (con las variantes de nombre de las hojas) y luego PLANTA 3..n."""
+    base = ["MONTESERENO CAFE", "Mercado"]
+    return (base + [f"PLANTA {i}" for i in range(3, n + 1)])[:n]
+
+def generar(anios, plantas, semilla=7):
+    """
+    Frames numéricos (fecha ya como datetime) con el esquema de las hojas:
+    hora (fecha, hora, planta, energia_kwh), dia, mes y epm. Los kWh van
+    redondeados como en las hojas: 2 decimales por hora y por día.
+    """
+    rng = np.random.default_rng(semilla)
+    dias = pd.date_range(FIN - pd.DateOffset(years=anios) + pd.Timedelta(days=1), FIN)
+    horas = np.array(HORAS_SOL)
+    campana = np.sin(np.pi * (horas - 5.5) / 13.0)            # forma del día solar
+    estacion = 1 + 0.15 * np.sin(2 * np.pi * dias.dayofyear.to_numpy() / 365.25)
+    partes = []
+    for k, pl in enumerate(nombres_plantas(plantas)):
+        nubes = rng.uniform(0.35, 1.0, size=(len(dias), 1))
+        kwh = (6 + 2 * k) * campana[None, :] * estacion[:, None] * nubes
+        kwh = np.round(kwh * rng.uniform(0.9, 1.1, size=kwh.shape), 2)
+        partes.append(pd.DataFrame({
+            "fecha": np.repeat(dias.to_numpy(), len(horas)),
+            "hora_num": np.tile(horas, len(dias)),
+            "planta": pl,
+            "energia_kwh": kwh.ravel(),
+        }))
+    hora = pd.concat(partes, ignore_index=True)
+    dia = hora.groupby(["fecha", "planta"], as_index=False, sort=False)["energia_kwh"].sum()
+    dia["energia_kwh"] = dia["energia_kwh"].round(2)
+    mes = dia.groupby([dia["fecha"].dt.year.rename("anio"), dia["fecha"].dt.month.rename("mes"), "planta"],
+                      as_index=False)["energia_kwh"].sum()
+    mes["energia_kwh"] = mes["energia_kwh"].round(1)
+    epm = mes[mes["planta"].isin(["MONTESERENO CAFE", "Mercado"])].copy()
+    epm["energia_kwh"] = np.round(epm["energia_kwh"] * rng.uniform(2.0, 3.0, size=len(epm)))
+    return {"hora": hora, "dia": dia, "mes": mes, "epm": epm}
+
+def _kwh_txt(v):
+    """kWh como los exporta Sheets: coma de miles y punto decimal ("1,234.56")."""
+    return pd.Series(v).map("{:,.2f}".format)
+
+def columna_mixta(col):
+    """
+    Columna de kWh ("1,234.56") reescrita por filas en los formatos que
+    to_num_col debe igualar: "1.234,56", "1,234", "5,6", negativos y vacíos.
+    """
+    v = pd.to_numeric(col.str.replace(",", "", regex=False)).to_numpy()
+    i = np.arange(len(v)) % 6
+    out = col.to_numpy(dtype=object, copy=True)
+    out[i == 1] = [f"{x:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".") for x in v[i == 1]]
+    out[i == 2] = [f"{x:,.0f}" for x in v[i == 2]]
+    out[i == 3] = [f"{x:.1f}".replace(".", ",") for x in v[i == 3]]
+    out[i == 4] = [f"-{x:,.2f}" for x in v[i == 4]]
+    out[i == 5] = ""
+    return pd.Series(out, index=col.index, dtype=object)
+
+def csv_hojas(d):
+    """Frames numéricos → cuerpos CSV (bytes) de cada pestaña, como los sirve Google."""
+    h, di, m, e = d["hora"], d["dia"], d["mes"], d["epm"]
+    hora = pd.DataFrame({"fecha": h["fecha"].dt.strftime("%d/%m/%Y"),
+                         "hora": np.char.add(np.char.zfill(h["hora_num"].to_numpy().astype(str), 2), ":00"),
+                         "planta": h["planta"], "energia_kwh": _kwh_txt(h["energia_kwh"])})
+    dia = pd.DataFrame({"fecha": di["fecha"].dt.strftime("%d/%m/%Y"), "planta": di["planta"],
+                        "energia_kwh": _kwh_txt(di["energia_kwh"])})
+    mes = m.assign(energia_kwh=_kwh_txt(m["energia_kwh"]))
+    epm = pd.DataFrame({"anio": e["anio"], "mes": e["mes"], "dia": 1, "planta": e["planta"],
+                        "tipo": "EPM Consumo", "energia_kwh": e["energia_kwh"].map("{:,.0f}".format)})
+    extra = pd.DataFrame({"anio": "", "mes": ["Costo kWh", "Costo kWh", "Promedio histórico", "Promedio histórico"],
+                          "dia": "", "planta": ["CAFE", "MERCADO"] * 2, "tipo": "",
+                          "energia_kwh": ["1,041", "1,085", "6,500", "5,100"]})
+    epm = pd.concat([epm, extra], ignore_index=True)
+    return {gedicol.SOLAR_TAB_HORA: hora.to_csv(index=False).encode(),
+            gedicol.SOLAR_TAB_DIA: dia.to_csv(index=False).encode(),
+            gedicol.SOLAR_TAB_MES: mes.to_csv(index=False).encode(),
+            gedicol.EPM_TAB: epm.to_csv(index=False).encode()}
+
+def libro_epm(d):
+    """
+    Libro EPM diario de varios años como Reporte_Energia_EPM_Solar_Completo:
+    anio, mes, dia, planta, tipo y kWh por planta y día, más columnas que
+    los parsers no usan (medidor, factura, observaciones).
+    """
+    di = d["dia"]
+    f = di["fecha"].dt
+    return pd.DataFrame({
+        "anio": f.year, "mes": f.month, "dia": f.day, "planta": di["planta"].to_numpy(),
+        "tipo": "EPM Consumo", "energia_kwh": np.round(di["energia_kwh"].to_numpy() * 2.5),
+        "medidor": "MED-" + di["planta"].astype(str).str[:4].str.upper(),
+        "factura": f.strftime("%Y%m"), "observaciones": "lectura mensual",
+    })
+
+# ======================
+# SHEETS LOCAL
+# ======================
+class SheetsLocal:
+    """
+    Servidor HTTP en 127.0.0.1 que responde las URLs de gedicol (export por
+    gid y gviz por pestaña, con las dos consultas tq de la ingesta
+    incremental). Manda ETag y contesta 304 a If-None-Match, como Google.
+    """
+    def __init__(self):
+        self.datos, self.cuerpos, self.memo = None, None, {}
+        srv = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *a):
+                pass
+
+            def do_GET(self):
+                cuerpo = srv.responder(self.path)
+                if cuerpo is None:
+                    self.send_response(404); self.end_headers()
+                    return
+                etag = '"' + hashlib.sha1(cuerpo).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304); self.send_header("ETag", etag); self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def publicar(self, datos):
+        """Cambia lo que sirve el Sheet (frames numéricos de generar)."""
+        self.datos, self.cuerpos, self.memo = datos, csv_hojas(datos), {}
+
+    def responder(self, path):
+        u = urlsplit(path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        if u.path.endswith("/export"):
+            return self.cuerpos[gedicol.EPM_TAB]
+        tab = q.get("sheet")
+        if tab not in self.cuerpos:
+            return None
+        if "tq" not in q:
+            return self.cuerpos[tab]
+        clave = (tab, q["tq"])
+        if clave not in self.memo:
+            self.memo[clave] = self._gviz(tab, q["tq"])
+        return self.memo[clave]
+
+    def _gviz(self, tab, tq):
+        """Las dos consultas de _anexar_nuevas: huella mensual antes del corte y filas desde el corte."""
+        d = self.datos["dia" if tab == gedicol.SOLAR_TAB_DIA else "hora"]
+        corte = pd.Timestamp(re.search(r"date '([\d-]+)'", tq).group(1))
+        if "group by" in tq:
+            a = d[d["fecha"] < corte]
+            g = a.groupby([a["fecha"].dt.year.rename("y"), (a["fecha"].dt.month - 1).rename("m")])["energia_kwh"]
+            g = g.agg(["sum", "count"]).reset_index()
+            g.columns = ["year(A)", "month(A)", "sum(D)", "count(A)"]
+            return g.to_csv(index=False).encode()
+        sub = {"dia": self.datos["dia"], "hora": self.datos["hora"]}
+        cuerpo = csv_hojas({**self.datos, **{k: v[v["fecha"] >= corte] for k, v in sub.items()}})
+        return cuerpo[tab]
+
+# ======================
+# MEDICIÓN
+# ======================
+def medir(nombre, filas, fn, preparar=None, repeticiones=3, memoria=True):
+    """
+    Mejor tiempo de `repeticiones` corridas de fn (preparar corre antes de
+    cada una, fuera del tiempo) y pico de memoria de una corrida más bajo
+    tracemalloc. Devuelve (registro, resultado de la última corrida).
+    """
+    mejor, res = float("inf"), None
+    for _ in range(max(1, repeticiones)):
+        if preparar: preparar()
+        t0 = time.perf_counter()
+        res = fn()
+        mejor = min(mejor, time.perf_counter() - t0)
+    pico = None
+    if memoria:
+        if preparar: preparar()
+        tracemalloc.start()
+        try:
+            res = fn()
+            pico = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    reg = {"etapa": nombre, "filas": int(filas), "seg": round(mejor, 6),
+           "pico_mb": None if pico is None else round(pico, 2),
+           "filas_s": round(filas / mejor) if mejor > 0 else None}
+    print(f"  {nombre:<22} {mejor * 1000:10.1f} ms  "
+          f"{'' if pico is None else f'{pico:8.1f} MB'}  {reg['filas_s'] or 0:>12,} filas/s", flush=True)
+    return reg, res
+
+def olvidar_sheets():
+    """Estado de proceso de gedicol en frío: sin respuestas recordadas ni ingesta previa."""
+    gedicol.respuestas_previas.cache_clear()
+    gedicol.ingesta_estado.cache_clear()
+    gedicol.http_session.cache_clear()
+
+def escenario(srv, anios, plantas, reps, memoria):
+    print(f"\n== {anios} año(s) × {plantas} plantas", flush=True)
+    todo = generar(anios, plantas)
+    ultimo = todo["dia"]["fecha"].max()
+    base = {k: (v[v["fecha"] < ultimo] if "fecha" in v else v) for k, v in todo.items()}
+    n = {k: len(v) for k, v in todo.items()}
+    print("  filas: " + " · ".join(f"{k} {v:,}" for k, v in n.items()), flush=True)
+    total = sum(n.values())
+    et, kw = [], dict(repeticiones=reps, memoria=memoria)
+
+    # --- descarga (servidor local) ---
+    def en_frio():
+        olvidar_sheets()
+        srv.publicar(base)
+
+    def creciendo():
+        en_frio()
+        gedicol.descargar_sheets()
+        srv.publicar(todo)
+
+    r, _ = medir("descarga_completa", total, gedicol.descargar_sheets, en_frio, **kw); et.append(r)
+    r, _ = medir("revalidacion_304", total, gedicol.descargar_sheets, **kw); et.append(r)
+    r, hojas = medir("ingesta_incremental", n["hora"] + n["dia"], gedicol.descargar_sheets, creciendo, **kw); et.append(r)
+    dfs, errs, _ = hojas
+    assert not errs, errs
+    modos = {k: e.get("modo") for k, e in gedicol.ingesta_estado().items()}
+    assert all(m and m.startswith("+") for m in modos.values()), modos
+
+    # --- parsers ---
+    cuerpos = csv_hojas(todo)
+    crudo_hr = pd.read_csv(io.BytesIO(cuerpos[gedicol.SOLAR_TAB_HORA]), dtype=str)
+    crudo_ep = pd.read_csv(io.BytesIO(cuerpos[gedicol.EPM_TAB]))
+    col = crudo_hr["energia_kwh"]
+    r, fila = medir("to_num_auto", len(col), lambda: col.map(gedicol.to_num_auto), **kw); et.append(r)
+    r, vect = medir("to_num_col", len(col), lambda: gedicol.to_num_col(col), **kw); et.append(r)
+    assert np.array_equal(fila.to_numpy(), vect.to_numpy())
+    # Misma columna escrita como en las hojas reales: miles con coma o punto, decimal europeo, vacíos
+    mixta = columna_mixta(col)
+    r, fila = medir("to_num_auto_mixta", len(mixta), lambda: mixta.map(gedicol.to_num_auto), **kw); et.append(r)
+    r, vect = medir("to_num_col_mixta", len(mixta), lambda: gedicol.to_num_col(mixta), **kw); et.append(r)
+    assert np.array_equal(fila.to_numpy(), vect.to_numpy())
+    r, _ = medir("parse_hora", len(crudo_hr), lambda: gedicol.parse_hora(crudo_hr), **kw); et.append(r)
+    r, epm = medir("parse_epm_df", len(crudo_ep), lambda: gedicol.parse_epm_df(crudo_ep), **kw); et.append(r)
+    ep, cx = epm[0], epm[1]
+
+    # --- libro EPM en xlsx / csv: read_excel por defecto contra leer_epm_crudo ---
+    libro = libro_epm(todo)
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = os.path.join(tmp, "epm.xlsx")
+        libro.to_excel(xlsx, index=False)
+        csv_epm = libro.to_csv(index=False).encode()
+        r, _ = medir("epm_xlsx_read_excel", len(libro), lambda: pd.read_excel(xlsx), **kw); et.append(r)
+        r, _ = medir("epm_xlsx", len(libro), lambda: gedicol.leer_epm_crudo(xlsx), **kw)
+        r["motor"] = gedicol.motor_excel("xlsx"); et.append(r)
+        r, _ = medir("epm_csv", len(libro), lambda: gedicol.leer_epm_crudo(csv_epm), **kw); et.append(r)
+
+    # --- procesar_solar (lo que hace cargar_solar en el tablero), con snapshot ---
+    tabs = (gedicol.SOLAR_TAB_MES, gedicol.SOLAR_TAB_DIA, gedicol.SOLAR_TAB_HORA)
+    with tempfile.TemporaryDirectory() as tmp:
+        dir_prev, gedicol.SNAPSHOT_DIR = gedicol.SNAPSHOT_DIR, tmp
+        try:
+            r, (ms, di, hr) = medir("procesar_solar", total, lambda: gedicol.procesar_solar(
+                tuple(dfs[t].attrs.get("validador") for t in tabs), *(dfs[t] for t in tabs)), **kw)
+        finally:
+            gedicol.SNAPSHOT_DIR = dir_prev
+    et.append(r)
+    r, cb = medir("cubos", total, lambda: gedicol.construir_cubos(ms, di, hr), **kw); et.append(r)
+
+    # --- filtros y vistas: todas las plantas, último año completo ---
+    pl = sorted(ms["planta"].unique())
+    ff = pd.Timestamp(ultimo); fi = ff - pd.DateOffset(years=1) + pd.Timedelta(days=1)
+    anios_sel, meses_sel = sorted(ms["anio"].unique()), list(range(1, 13))
+
+    def filtros():
+        dff = gedicol.filas_rango(di, pl, fi, ff)
+        hf = gedicol.filas_rango(hr, pl, fi, ff, 6, 18)
+        ef = ep[ep["anio"].isin(anios_sel) & ep["mes"].isin(meses_sel)]
+        return dff, hf, ef
+    r, (dff, hf, ef) = medir("filtros", len(di) + len(hr), filtros, **kw); et.append(r)
+
+    costos = {**gedicol.COSTOS_EPM, **cx}
+    def mensual():
+        mf = gedicol.mensual_desde_cubo(cb["mes"], pl, anios_sel, meses_sel)
+        return mf, gedicol.tabla_mensual(mf, ef, costos)
+    r, (mf, b) = medir("vista_mensual", len(ms), mensual, **kw); et.append(r)
+    r, (dd, hm, _) = medir("vista_diaria", len(dff),
+                           lambda: gedicol.diario_desde_cubo(cb["dia"], pl, fi, ff), **kw); et.append(r)
+    r, (hh, _) = medir("vista_horaria", len(hf),
+                       lambda: gedicol.horario_desde_cubo(cb["hora"], pl, fi, ff, 6, 18), **kw); et.append(r)
+
+    # --- pronóstico: ajuste completo, incremental (última semana nueva) y horizonte ---
+    filas_hr = cb["hora"]["n"].sum()
+    r, modelo = medir("pronostico_ajuste", filas_hr, lambda: gedicol.ajustar_pronostico(cb["hora"]), **kw); et.append(r)
+    previo = gedicol.ajustar_pronostico(gedicol.cubo_fechas(hr[hr["fecha"] <= ultimo - pd.Timedelta(days=7)], horas=True))
+    r, _ = medir("pronostico_incremental", filas_hr, lambda: gedicol.ajustar_pronostico(cb["hora"], previo), **kw)
+    r["dias_nuevos"] = gedicol.ajustar_pronostico(cb["hora"], previo)["nuevos"]; et.append(r)
+    r, _ = medir("pronosticar", len(pl), lambda: gedicol.pronosticar(modelo, costos, pl), **kw); et.append(r)
+
+    # --- anomalías sobre los cubos diario y horario ---
+    r, al = medir("anomalias", len(di) + len(hr), lambda: gedicol.detectar_anomalias(cb), **kw)
+    r["alertas"] = len(al); et.append(r)
+
+    # --- figuras (sin el LRU del tablero) ---
+    pv = tuple(gedicol.plantas_orden(pl))
+    k, tot = gedicol.kpis_plantas(mf, ef, pv, costos)
+    proms = tuple(zip(k["solar_prom"], k["epm_prom"]))
+    bb = b[["Mes", *pv, *(f"EPM_{p}" for p in pv)]]
+
+    def figs_mensual():
+        return [figuras.fig_comparativo(bb, pv, proms), figuras.fig_apilado(bb, pv, proms),
+                figuras.fig_torta_solar(pv, tuple(k["solar"]), tot["solar"]),
+                figuras.fig_torta_epm(pv, tuple(k["epm"]), tot["epm"]),
+                figuras.fig_ahorro(b[["Mes", "Ahorro"]]), figuras.fig_tendencia(b[["Mes", "EPM_T", "SOL_T"]])]
+    r, _ = medir("figuras_mensual", len(b), figs_mensual, **kw); et.append(r)
+    r, _ = medir("figuras_diaria", len(dd), lambda: [figuras.fig_diario(dd[["fecha", "planta", "energia_kwh"]], pv),
+                                                     figuras.fig_mapa_calor(hm)], **kw); et.append(r)
+    r, _ = medir("figuras_horaria", len(hh), lambda: figuras.fig_horaria(hh, pv), **kw); et.append(r)
+
+    # --- exportación del reporte (todas las hojas, horario completo del último año) ---
+    hojas = gedicol.hojas_reporte(hr, cb, ep, costos, pl, anios_sel, meses_sel, fi, ff)
+    for formato in gedicol.FORMATOS_EXPORT:
+        r, _ = medir(f"exportar_{formato}", len(hf), lambda: gedicol.exportar(formato, hojas), **kw); et.append(r)
+    return {"anios": anios, "plantas": plantas, "filas": n, "etapas": et}
+
+# ======================
+# COMPARACIÓN
+# ======================
+def comparar(a, b):
+    """Tabla etapa por etapa de dos JSON de resultados: tiempo y pico de b relativos a a."""
+    ra, rb = (json.load(open(p, encoding="utf-8")) for p in (a, b))
+    idx = {(e["anios"], e["plantas"], x["etapa"]): x for e in ra["escenarios"] for x in e["etapas"]}
+    print(f"{'escenario':<12} {'etapa':<22} {'antes ms':>10} {'después ms':>11} {'×':>7} {'pico MB':>16}")
+    for e in rb["escenarios"]:
+        for x in e["etapas"]:
+            y = idx.get((e["anios"], e["plantas"], x["etapa"]))
+            if y is None:
+                continue
+            pico = f"{y['pico_mb'] or 0:.1f} → {x['pico_mb'] or 0:.1f}"
+            print(f"{str(e['anios']) + 'a×' + str(e['plantas']) + 'pl':<12} {x['etapa']:<22} {y['seg'] * 1000:10.1f} "
+                  f"{x['seg'] * 1000:11.1f} {x['seg'] / y['seg'] if y['seg'] else 0:7.2f} {pico:>16}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="bench", description="Benchmark offline de gedicol / figuras.")
+    ap.add_argument("--anios", type=int, nargs="+", default=[1, 5, 20], help="años de datos horarios por escenario")
+    ap.add_argument("--plantas", type=int, nargs="+", default=[2, 8], help="cantidad de plantas por escenario")
+    ap.add_argument("--repeticiones", type=int, default=3, help="corridas por etapa (se toma la mejor)")
+    ap.add_argument("--sin-memoria", action="store_true", help="no medir el pico con tracemalloc")
+    ap.add_argument("-o", "--salida", default=os.path.join("bench", f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"),
+                    help="JSON de resultados (por defecto en bench/, fuera de git)")
+    ap.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"), help="compara dos JSON y sale")
+    args = ap.parse_args(argv)
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+
+    srv = SheetsLocal()
+    gedicol.SHEETS_URL = srv.url
+    res = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+        "plataforma": platform.platform(), "cpus": os.cpu_count(),
+        "repeticiones": args.repeticiones, "escenarios": [],
+    }
+    for anios in args.anios:
+        for plantas in args.plantas:
+            res["escenarios"].append(escenario(srv, anios, plantas, args.repeticiones, not args.sin_memoria))
+    srv.httpd.shutdown()
+    os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=1, ensure_ascii=False)
+    print(f"\nResultados en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
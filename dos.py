@@ -1,40 +1,43 @@
 # -*- coding: utf-8 -*-
-import re, os, traceback
-from io import StringIO, BytesIO
+import os, json, time, uuid, hashlib, threading, functools, traceback
 from datetime import datetime
 
-import numpy as np
 import pandas as pd
-import requests
 import streamlit as st
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
+from streamlit.errors import StreamlitAPIException
+
+# lectores, parsers y agregados sin Streamlit (ver gedicol.py); figuras en figuras.py
+import gedicol
+import figuras
+from gedicol import (
+    SOLAR_TAB_MES, SOLAR_TAB_DIA, SOLAR_TAB_HORA, EPM_SHEET_ID, EPM_GID_MES, EPM_TAB,
+    ML, SNAPSHOT_DIR, EPM_LOCAL_PATHS, PLANTAS,
+    sf, fn, fc, dlbl, mlbl_col, dlbl_col, hlbl_col,
+    parse_epm_df, leer_epm_crudo, ingesta_estado, guardar_snapshot, rango_fechas,
+    version_datos, construir_cubos, mensual_desde_cubo, diario_desde_cubo, horario_desde_cubo,
+    plantas_orden, info_planta, tabla_mensual, kpis_plantas, tabla_resumen, hojas_reporte, exportar,
+    ajustar_pronostico, pronosticar, detectar_anomalias, marcas_mapa,
+    FORMATOS_EXPORT, medir, contar, iniciar_registro, activar_log, memoria_proceso, contadores,
+)
+from figuras import (
+    COLOR_ACENTO, COLOR_VERDE, COLOR_TOTAL, COLOR_AMBAR, BG,
+    MAX_PUNTOS_DIA, PUNTOS_PANTALLA,
+)
 
 # ======================
 # CONFIG
 # ======================
-SOLAR_SHEET_ID = "1ceFwwFm6D1QRW4slPj67BlSDR9woGFFaOMLoN1FxVvs"
-SOLAR_TAB_MES  = "POR MES"
-SOLAR_TAB_DIA  = "POR DIA"
-SOLAR_TAB_HORA = "POR HORA"
-
-EPM_SHEET_ID   = "1ANEtNlryqo_4wq1n6V5OlutpcDFMP_EdxxWXgjEhQ3c"
-EPM_GID_MES    = "2089036315"
+# cada cuánto se revalida contra Sheets; si nada cambió cuesta un GET condicional
+TTL_SHEETS     = 120
+REFRESCO_SEG   = 90        # el hilo de refresco revalida antes de que venza TTL_SHEETS
 
-# costos base por kWh
-COSTOS_EPM = {"CAFE": 1033, "MERCADO": 1077}
+# "compartido": los frames de datos (snapshots, EPM, solar procesado) son un
+# único objeto por proceso, que todas las sesiones leen sin copiarlo;
+# "copias": cada llamada devuelve su propia copia (st.cache_data)
+ALMACEN = os.environ.get("GEDICOL_ALMACEN", "compartido")
 
-# paleta mejorada - EPM más visible
-COLOR_CAFE       = "#3b82f6"  # azul
-COLOR_MERC       = "#10b981"  # verde
-COLOR_TOTAL      = "#8b5cf6"  # morado
-COLOR_AMBAR      = "#f59e0b"  # dorado
-COLOR_EPM_CAFE   = "#1e40af"  # azul oscuro (EPM)
-COLOR_EPM_MERC   = "#047857"  # verde oscuro (EPM)
-BG = "#f8fafc"
-
-ML = {1:"Ene",2:"Feb",3:"Mar",4:"Abr",5:"May",6:"Jun",7:"Jul",8:"Ago",9:"Sep",10:"Oct",11:"Nov",12:"Dic"}
+# costos base por kWh, del registro de plantas
+COSTOS_EPM = dict(gedicol.COSTOS_EPM)   # copia: los costos del Excel de EPM la ajustan
 
 st.set_page_config(
     page_title="Energía solar - Café y Mercado · Monte Sereno",
@@ -42,6 +45,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# mediciones por etapa; con GEDICOL_LOG_MEDICIONES=archivo.jsonl (o "-") salen también como log JSON
+activar_log(os.environ.get("GEDICOL_LOG_MEDICIONES"))
+
 # ======================
 # CSS
 # ======================
@@ -57,19 +63,16 @@ header{{visibility:hidden}}
 
 .left-card{{background:#fff;border:1px solid #e2e8f0;border-radius:16px;padding:16px;box-shadow:0 4px 14px rgba(0,0,0,.06)}}
 .left-title{{font-size:15px;font-weight:900;margin:0 0 10px;color:#0f172a}}
-.fsec{{font-size:11px;font-weight:800;color:{COLOR_CAFE};text-transform:uppercase;letter-spacing:1.5px;padding:10px 0 4px;margin-top:8px;border-top:1px solid #e2e8f0}}
+.fsec{{font-size:11px;font-weight:800;color:{COLOR_ACENTO};text-transform:uppercase;letter-spacing:1.5px;padding:10px 0 4px;margin-top:8px;border-top:1px solid #e2e8f0}}
 .small-note{{font-size:10px;color:#94a3b8;font-weight:500;line-height:1.3;background:#f1f5f9;border-radius:8px;padding:8px;margin-top:6px}}
 
 .kpi-row{{display:flex;gap:10px;flex-wrap:wrap;margin-bottom:14px}}
 .kpi-card{{flex:1;min-width:160px;background:#fff;border:1px solid #e2e8f0;border-radius:14px;padding:14px 16px;box-shadow:0 4px 14px rgba(0,0,0,.05);border-left:5px solid {COLOR_TOTAL};transition:transform .2s,box-shadow .2s}}
 .kpi-card:hover{{transform:translateY(-2px);box-shadow:0 8px 24px rgba(0,0,0,.1)}}
-.kpi-card.c1{{border-left-color:{COLOR_CAFE}}}
-.kpi-card.c2{{border-left-color:{COLOR_MERC}}}
+.kpi-card.c1{{border-left-color:{COLOR_ACENTO}}}
 .kpi-card.c3{{border-left-color:{COLOR_TOTAL}}}
 .kpi-card.c4{{border-left-color:{COLOR_AMBAR}}}
 .kpi-card.c5{{border-left-color:#ef4444}}
-.kpi-card.c6{{border-left-color:{COLOR_EPM_CAFE}}}
-.kpi-card.c7{{border-left-color:{COLOR_EPM_MERC}}}
 .kl{{font-size:10px;font-weight:900;color:#64748b;text-transform:uppercase;letter-spacing:1px}}
 .kv{{font-size:22px;font-weight:900;margin-top:4px;line-height:1}}
 .ks{{font-size:11px;color:#64748b;font-weight:600;margin-top:6px}}
@@ -87,156 +90,75 @@ div[data-baseweb="select"]>div{{border-radius:10px!important}}
 # ======================
 # HELPERS
 # ======================
-PLT = dict(
-    paper_bgcolor="rgba(255,255,255,0)",
-    plot_bgcolor="rgba(255,255,255,0)",
-    font=dict(family="Inter,sans-serif", color="#0f172a", size=12),
-    margin=dict(l=50, r=30, t=50, b=50),
-    legend=dict(bgcolor="rgba(255,255,255,.95)", bordercolor="#e2e8f0", borderwidth=1, font=dict(size=11))
-)
-
-def aplyt(fig, h=420):
-    fig.update_layout(**PLT, height=h)
-    fig.update_xaxes(showgrid=True, gridcolor="#f1f5f9", zeroline=False)
-    fig.update_yaxes(showgrid=True, gridcolor="#f1f5f9", zeroline=False)
-    return fig
-
-def sf(x):
-    try:
-        v = float(x)
-        return 0.0 if np.isnan(v) or np.isinf(v) else v
-    except:
-        return 0.0
-
-def fn(x, d=0):
-    s = f"{sf(x):,.{d}f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return s.split(",")[0] if d == 0 else s
-
-def fc(x, decimals=0):
-    """Formato moneda COP con decimales opcionales"""
-    if decimals > 0:
-        s = f"{sf(x):,.{decimals}f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        return f"${s}"
-    return f"${sf(x):,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-def mlbl(y, m):
-    return f"{ML.get(int(m), str(m))} {int(y)}"
-
-def dlbl(dt):
-    return f"{dt.day} {ML.get(dt.month, str(dt.month))} {dt.year}"
-
-def tis(val):
-    try:
-        if pd.isna(val): return 0
-        if isinstance(val, (int, np.integer)): return int(val)
-        if isinstance(val, (float, np.floating)):
-            if np.isnan(val) or np.isinf(val): return 0
-            return int(val)
-        s = str(val).strip()
-        if s == "": return 0
-        return int(float(s))
-    except:
-        return 0
-
-def parse_h(x):
-    if pd.isna(x): return np.nan
-    m = re.match(r"(\d+)", str(x).strip())
-    return int(m.group(1)) if m else np.nan
-
-def parse_mes_any(x):
-    if pd.isna(x): return 0
-    if isinstance(x, (int, np.integer)):
-        m = int(x)
-        return m if 1 <= m <= 12 else 0
-    if isinstance(x, (float, np.floating)):
-        if np.isnan(x) or np.isinf(x): return 0
-        m = int(x)
-        return m if 1 <= m <= 12 else 0
-    s = str(x).strip().lower()
-    if s.startswith("ene"): return 1
-    if s.startswith("feb"): return 2
-    if s.startswith("mar"): return 3
-    if s.startswith("abr"): return 4
-    if s.startswith("may"): return 5
-    if s.startswith("jun"): return 6
-    if s.startswith("jul"): return 7
-    if s.startswith("ago"): return 8
-    if s.startswith("sep"): return 9
-    if s.startswith("oct"): return 10
-    if s.startswith("nov"): return 11
-    if s.startswith("dic"): return 12
-    m = re.match(r"^\s*(\d{1,2})(?:\.0+)?\s*$", s)
-    if m:
-        mm = int(m.group(1))
-        return mm if 1 <= mm <= 12 else 0
-    return 0
-
-def to_num_auto(v):
-    """
-    Convierte cualquier representación de número a float.
-    Detecta correctamente separadores de miles vs decimales:
-      "5,444"   → 5444   (coma = miles, Google Sheets format)
-      "5.6"     → 5.6    (punto = decimal)
-      "1,234.56"→ 1234.56 (anglosajón)
-      "1.234,56"→ 1234.56 (europeo)
-      "1,234,567"→ 1234567 (múltiples comas = miles)
-    """
-    try:
-        if v is None: return 0.0
-        if isinstance(v, (int, np.integer)): return float(v)
-        if isinstance(v, (float, np.floating)):
-            return 0.0 if (np.isnan(v) or np.isinf(v)) else float(v)
-        s = str(v).strip()
-        if s == "" or s.lower() in ["nan", "none", "null", "-"]: return 0.0
-        # Quitar símbolos de moneda y espacios
-        s = s.replace(" ", "").replace("$", "").replace("€", "").replace("£", "")
-        has_comma = "," in s
-        has_dot   = "." in s
-        if has_comma and has_dot:
-            # El último separador es el decimal
-            if s.rfind(",") > s.rfind("."):
-                s = s.replace(".", "").replace(",", ".")   # "1.234,56" → "1234.56"
-            else:
-                s = s.replace(",", "")                      # "1,234.56" → "1234.56"
-        elif has_comma and not has_dot:
-            parts = s.split(",")
-            # N,NNN  → exactamente 3 dígitos tras la coma = separador de miles
-            if len(parts) == 2 and re.fullmatch(r"\d{1,3}", parts[0]) and re.fullmatch(r"\d{3}", parts[1]):
-                s = s.replace(",", "")   # "5,444" → "5444"
-            elif len(parts) > 2:
-                s = s.replace(",", "")   # "1,234,567" → "1234567"
-            else:
-                s = s.replace(",", ".")  # "5,6" → "5.6" decimal europeo
-        # Solo punto: lo dejamos como está (decimal estándar)
-        s = re.sub(r"[^0-9\.\-]", "", s)
-        if s in ["", "-", ".", "-."]: return 0.0
-        return float(s)
-    except:
-        return 0.0
-
-def norm_planta(p):
-    s = str(p or "").strip().upper()
-    s = s.replace("Á","A").replace("É","E").replace("Í","I").replace("Ó","O").replace("Ú","U")
-    s = re.sub(r"\s+", " ", s)
-    if s in ["CAFE","CAFÉ","MONTESERENO CAFE","MONTESERENO CAFÉ","MONTE SERENO CAFE","MONTE SERENO CAFÉ"]:
-        return "CAFE"
-    if s in ["MERCADO","MONTESERENO MERCADO","MONTE SERENO MERCADO"]:
-        return "MERCADO"
-    if "CAFE" in s: return "CAFE"
-    if "MERCADO" in s: return "MERCADO"
-    return s if s else "TOTAL"
-
 def st_btn(label):
     try:
         return st.button(label, width="stretch")
     except TypeError:
         return st.button(label, use_container_width=True)
 
-def st_plot(fig):
+def st_rerun_app():
+    """Vuelve a correr toda la app, también desde un fragmento."""
     try:
-        return st.plotly_chart(fig, width="stretch")
+        st.rerun(scope="app")
     except TypeError:
-        return st.plotly_chart(fig, use_container_width=True)
+        st.rerun()
+
+def st_descarga(label, generar, **kwargs):
+    """
+    download_button que arma el archivo recién al hacer clic, en otro hilo
+    (data invocable). Donde Streamlit no lo acepta, un botón "Preparar" lo
+    arma en esa corrida y muestra la descarga.
+    """
+    try:
+        return st.download_button(label, generar, on_click="ignore", **kwargs)
+    except (TypeError, StreamlitAPIException):
+        if st_btn(f"📦 Preparar: {label}"):
+            return st.download_button(label, generar(), **kwargs)
+
+def st_plot(fig):
+    with medir("st_plot") as info:
+        # el tamaño del JSON cuesta una serialización extra: sólo con el panel de depuración
+        if st.session_state.get("depurar"):
+            info["bytes"] = len(fig.to_json(validate=False))
+        try:
+            return st.plotly_chart(fig, width="stretch")
+        except TypeError:
+            return st.plotly_chart(fig, use_container_width=True)
+
+def cache_contado(cache):
+    """
+    Como aplicar `cache` (st.cache_data(...) / st.cache_resource(...)), pero
+    cuenta llamadas y fallos (ejecuciones reales) en CONTADORES y anota cada
+    llamada como etapa "cache" con su tiempo y si fue acierto. Streamlit
+    sigue viendo la función original (nombre, código y parámetros).
+    """
+    def decorar(fn_):
+        marca = threading.local()   # el cuerpo cacheado corre en el hilo de quien llama
+
+        @functools.wraps(fn_)
+        def real(*args, **kwargs):
+            marca.fallo = True
+            return fn_(*args, **kwargs)
+
+        cacheado = cache(real)
+
+        @functools.wraps(fn_)
+        def llamar(*args, **kwargs):
+            marca.fallo = False
+            with medir("cache", funcion=fn_.__name__) as info:
+                out = cacheado(*args, **kwargs)
+                info["acierto"] = not marca.fallo
+            contar(fn_.__name__, "llamadas")
+            if marca.fallo:
+                contar(fn_.__name__, "fallos")
+            return out
+
+        llamar.clear = cacheado.clear
+        return llamar
+    return decorar
+
+# st.fragment (o experimental_fragment en versiones previas); sin soporte corre normal
+fragmento = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
 
 def st_df(df, **kwargs):
     try:
@@ -244,170 +166,320 @@ def st_df(df, **kwargs):
     except TypeError:
         return st.dataframe(df, use_container_width=True, **kwargs)
 
-def cc(df):
-    df.columns = [
-        str(c).strip().lower()
-        .replace("á","a").replace("é","e").replace("í","i").replace("ó","o").replace("ú","u")
-        for c in df.columns
-    ]
-    return df
-
-# ======================
-# EPM PARSER
-# ======================
-def parse_epm_df(raw_df):
-    ep = cc(raw_df.copy())
-    cx, ph = {}, {}
-    debug_msgs = []
-
-    for old in ["año", "ano"]:
-        if old in ep.columns and "anio" not in ep.columns:
-            ep = ep.rename(columns={old: "anio"})
+def kpi_planta(titulo, valor, color, sub=None):
+    """Tarjeta KPI de una planta, con el color del registro en el borde y el valor."""
+    ks = f'<div class="ks">{sub}</div>' if sub else ""
+    return (f'<div class="kpi-card" style="border-left-color:{color}"><div class="kl">{titulo}</div>'
+            f'<div class="kv" style="color:{color}">{valor}</div>{ks}</div>')
 
-    if "planta" not in ep.columns and "sede" in ep.columns:
-        ep = ep.rename(columns={"sede": "planta"})
-    if "planta" in ep.columns:
-        ep["planta"] = ep["planta"].astype(str).apply(norm_planta)
-    else:
-        ep["planta"] = "TOTAL"
-
-    kwh_col = None
-    KWHS_NAMES = {"energia_kwh","energía_kwh","energia kwh","energía kwh","epm_kwh","consumo_kwh","kwh","consumo","energia (kwh)","energía (kwh)","epm (kwh)","valor","energia","energía"}
-    for c in ep.columns:
-        if str(c).strip().lower() in KWHS_NAMES:
-            kwh_col = c; break
+def registro(parte):
+    """Registro de mediciones nuevo para esta sesión ("carga" o "vista"); cada uno es una corrida."""
+    ss = st.session_state
+    ss.setdefault("sesion", uuid.uuid4().hex[:8])
+    ss["corrida"] = ss.get("corrida", 0) + 1
+    return iniciar_registro(sesion=ss["sesion"], corrida=ss["corrida"], parte=parte)
 
-    if kwh_col:
-        ep["epm_kwh"] = ep[kwh_col].apply(to_num_auto)
-        debug_msgs.append(f"kwh_col='{kwh_col}'")
-    else:
-        ep["epm_kwh"] = 0.0
-        debug_msgs.append("⚠ No se encontró columna kWh")
-
-    if "mes" in ep.columns:
-        for _, row in ep.iterrows():
-            mes_raw = str(row.get("mes", "")).strip().lower()
-            planta  = str(row.get("planta", "")).strip().upper()
-            valor   = sf(row.get("epm_kwh", 0))
-            if planta not in ("CAFE", "MERCADO") or valor <= 0: continue
-            if "costo" in mes_raw:
-                cx[planta] = valor
-                debug_msgs.append(f"Costo {planta}={valor}")
-            elif "promedio" in mes_raw or mes_raw.startswith("prom"):
-                ph[planta] = valor
-                debug_msgs.append(f"Promedio {planta}={valor}")
-        ep["mes"] = ep["mes"].apply(parse_mes_any)
-    else:
-        ep["mes"] = 0
-
-    if "anio" in ep.columns:
-        ep["anio"] = ep["anio"].apply(tis)
-    else:
-        ep["anio"] = 0
-
-    ep = ep[ep["mes"].between(1, 12)].copy()
-    ep = ep[ep["anio"] > 0].copy()
-    debug_msgs.append(f"rows={len(ep)} | total={sf(ep['epm_kwh'].sum()):.0f} kWh")
-    return ep, cx, ph, " | ".join(debug_msgs)
+def cache_frames(**kwargs):
+    """
+    Caché de los frames de datos según ALMACEN. En modo compartido es
+    st.cache_resource: la memoria no crece con las sesiones, pero el frame
+    devuelto es de todos y no se modifica (los filtros son vistas y, con
+    Copy-on-Write, un derivado sólo copia si se escribe). En modo copias es
+    st.cache_data, que deserializa una copia por llamada.
+    """
+    if ALMACEN == "copias":
+        return st.cache_data(**kwargs)
+    return st.cache_resource(**kwargs)
 
 # ======================
 # GOOGLE SHEETS
 # ======================
-def read_gid_csv(sid, gid):
-    url = f"https://docs.google.com/spreadsheets/d/{sid}/export?format=csv&gid={gid}"
-    r = requests.get(url, timeout=30)
-    if r.status_code != 200:
-        raise RuntimeError(f"Sheet gid={gid} status={r.status_code}")
-    head = (r.text or "")[:2500].lower()
-    if "<!doctype html" in head or "accounts.google.com" in head or "servicelogin" in head:
-        raise RuntimeError("Google devolvió HTML de login. El Sheet de EPM NO está público.")
-    return pd.read_csv(StringIO(r.text))
-
-def read_tab_csv(sid, tab):
-    url = (
-        f"https://docs.google.com/spreadsheets/d/{sid}"
-        f"/gviz/tq?tqx=out:csv&sheet={requests.utils.quote(tab)}"
-    )
-    r = requests.get(url, timeout=30)
-    if r.status_code != 200:
-        raise RuntimeError(f"Sheet tab='{tab}' status={r.status_code}")
-    head = (r.text or "")[:2500].lower()
-    if "<!doctype html" in head or "accounts.google.com" in head or "servicelogin" in head:
-        raise RuntimeError(f"Google devolvió HTML de login. La pestaña '{tab}' NO está pública.")
-    return pd.read_csv(StringIO(r.text))
+@cache_contado(st.cache_resource(ttl=TTL_SHEETS))
+def descargar_sheets():
+    """gedicol.descargar_sheets compartido por proceso; un fallo solar no se cachea."""
+    return gedicol.descargar_sheets()
 
 # ======================
-# EPM LOADER
+# SNAPSHOT LOCAL
 # ======================
-EPM_LOCAL_PATHS = [
-    r"/mnt/data/Reporte_Energia_EPM_Solar_Completo.xlsx",
-    r"Reporte_Energia_EPM_Solar_Completo.xlsx",
-]
+@cache_contado(cache_frames(show_spinner=False, max_entries=8))
+def leer_snapshot(nombre, mtime_ns):
+    return gedicol.leer_snapshot(nombre, mtime_ns)
 
-def load_epm(uploaded_file=None):
+def snapshot(nombre):
+    """(df, info) del último snapshot guardado, o None si no hay uno legible."""
+    path = os.path.join(SNAPSHOT_DIR, nombre + ".parquet")
+    try:
+        return leer_snapshot(nombre, os.stat(path).st_mtime_ns)
+    except Exception:
+        return None
+
+# ======================
+# EPM LOADER
+# ======================
+@cache_contado(cache_frames(show_spinner=False, max_entries=16))
+def parse_epm_cached(clave, _leer, snap=None):
+    """
+    parse_epm_df memorizado por clave de contenido (hash de bytes, ETag o mtime).
+    _leer no entra en la clave; devuelve None si la fuente no trae filas.
+    Con snap, el resultado se guarda además como snapshot local.
+    """
+    with medir("leer_epm", fuente=clave[0]):
+        raw = _leer()
+    if raw is None or (hasattr(raw, "empty") and raw.empty):
+        return None
+    with medir("parse", tab=EPM_TAB, filas=len(raw)):
+        ep, cx, ph, info = parse_epm_df(raw)
+    if snap:
+        guardar_snapshot(snap, ep, meta={"cx": cx, "ph": ph, "info": info})
+    return ep, cx, ph, info
+
+def load_epm(uploaded_file=None, usar_sheets=True):
     debug_msgs = []
-    raw = None
+    res, ok = None, False
 
     if uploaded_file is not None:
         try:
-            raw = pd.read_excel(BytesIO(uploaded_file.read()))
+            data = uploaded_file.getvalue()
+            res = parse_epm_cached(("archivo", hashlib.sha1(data).hexdigest()),
+                                   lambda: leer_epm_crudo(data, uploaded_file.name))
+            ok = True
             debug_msgs.append(f"✅ EPM desde archivo subido")
         except Exception as e:
             debug_msgs.append(f"⚠ Error leyendo archivo subido: {e}")
 
-    if raw is None:
+    if not ok and usar_sheets:
         try:
-            raw = read_gid_csv(EPM_SHEET_ID, EPM_GID_MES)
+            dfs, errs, _ = hojas_actuales()
+            if EPM_TAB in errs:
+                raise RuntimeError(errs[EPM_TAB])
+            raw = dfs[EPM_TAB]
+            res = parse_epm_cached(("sheets", EPM_SHEET_ID, EPM_GID_MES, raw.attrs.get("validador")),
+                                   lambda: raw, snap="epm")
+            ok = True
             debug_msgs.append("✅ EPM desde Google Sheets")
         except Exception as e:
             debug_msgs.append(f"❌ EPM Sheets: {e}")
 
-    if raw is None:
+    if not ok:
+        snp = snapshot("epm")
+        if snp is not None:
+            ep, info = snp
+            meta = info.get("meta", {})
+            res = ep, meta.get("cx", {}), meta.get("ph", {}), meta.get("info", "")
+            ok = True
+            debug_msgs.append(f"✅ EPM desde snapshot local ({info.get('guardado', '?')})")
+
+    if not ok:
         for path in EPM_LOCAL_PATHS:
             if os.path.exists(path):
                 try:
-                    raw = pd.read_excel(path)
+                    fst = os.stat(path)
+                    res = parse_epm_cached(("local", path, fst.st_mtime_ns, fst.st_size),
+                                           lambda: leer_epm_crudo(path))
+                    ok = True
                     debug_msgs.append(f"✅ EPM desde archivo local: {path}")
                     break
                 except Exception as e:
                     debug_msgs.append(f"⚠ Error local ({path}): {e}")
 
-    if raw is None or (hasattr(raw, "empty") and raw.empty):
+    if res is None:
         empty = pd.DataFrame(columns=["anio","mes","planta","epm_kwh"])
         return empty, {}, {}, " | ".join(debug_msgs) + " | ⛔ Sin datos EPM"
 
-    ep, cx, ph, parse_info = parse_epm_df(raw)
+    ep, cx, ph, parse_info = res
     return ep, cx, ph, " | ".join(debug_msgs) + " | " + parse_info
 
 # ======================
 # SOLAR LOADER
 # ======================
-@st.cache_data(ttl=300)
-def cargar_solar():
-    ms = cc(read_tab_csv(SOLAR_SHEET_ID, SOLAR_TAB_MES))
-    di = cc(read_tab_csv(SOLAR_SHEET_ID, SOLAR_TAB_DIA))
-    hr = cc(read_tab_csv(SOLAR_SHEET_ID, SOLAR_TAB_HORA))
+def cargar_solar(hojas, previo=None):
+    """
+    (clave, (ms, di, hr)) de una descarga de gedicol.descargar_sheets. La
+    clave son los validadores de las tres pestañas: si coincide con la de
+    `previo` (clave, datos) no se vuelve a procesar y la versión (y con ella
+    los cubos y las figuras en caché) se mantiene.
+    """
+    dfs, _, _ = hojas
+    tabs = (SOLAR_TAB_MES, SOLAR_TAB_DIA, SOLAR_TAB_HORA)
+    clave = tuple(dfs[t].attrs.get("validador") for t in tabs)
+    if None in clave:
+        clave += (time.time_ns(),)
+    if previo is not None and previo[0] == clave:
+        return previo
+    return clave, gedicol.procesar_solar(clave, *(dfs[t] for t in tabs))
 
-    for d in [ms, di, hr]:
-        for old in ["año","ano"]:
-            if old in d.columns and "anio" not in d.columns:
-                d.rename(columns={old: "anio"}, inplace=True)
+# ======================
+# REFRESCO EN SEGUNDO PLANO
+# ======================
+@st.cache_resource
+def estado_datos():
+    """
+    Estado por proceso del refresco en segundo plano: los últimos datos
+    buenos (compartidos entre sesiones: no modificar), la descarga de la que
+    salieron, cuándo se obtuvieron y el último error.
+    """
+    return {"lock": threading.Lock(), "despertar": threading.Event(), "primera": threading.Event(),
+            "hilo": None, "datos": None, "clave": None, "cubos": None, "hojas": None, "t_ok": None,
+            "error": None, "t_error": None, "completo": False, "refrescando": False, "medicion": None,
+            "vueltas": 0}
+
+def refrescar(est):
+    """
+    Una vuelta del refresco: revalida Sheets (GET condicionales), procesa y
+    arma los cubos; recién entonces cambia los datos servidos, de una sola
+    vez. Si algo falla se conservan los anteriores. Corre en un hilo sin
+    contexto de Streamlit, así que usa gedicol directamente y no las
+    funciones con st.cache_*.
+    """
+    with est["lock"]:   # pedir_refresco lee y escribe lo mismo bajo el lock
+        est["refrescando"] = True
+        completo, est["completo"] = est["completo"], False
+    est["medicion"] = iniciar_registro(parte="refresco")
+    try:
+        with medir("refresco", completo=completo):
+            if completo:
+                ingesta_estado().clear()
+            hojas = gedicol.descargar_sheets()
+            previo = (est["clave"], est["datos"]) if est["datos"] is not None else None
+            clave, (ms, di, hr) = cargar_solar(hojas, previo)
+            version = version_datos(ms, di, hr)
+            cb = est["cubos"] if est["cubos"] and est["cubos"][0] == version else \
+                (version, construir_cubos(ms, di, hr))
+            with est["lock"]:
+                est["hojas"], est["clave"], est["datos"], est["cubos"] = hojas, clave, (ms, di, hr), cb
+                est["t_ok"], est["error"] = datetime.now(), None
+    except Exception as e:
+        est["error"], est["t_error"] = str(e), datetime.now()
+    finally:
+        with est["lock"]:
+            est["refrescando"] = False
+            est["vueltas"] += 1
+        est["primera"].set()
+
+def _programador(est):
+    while True:
+        refrescar(est)
+        est["despertar"].wait(REFRESCO_SEG)
+        est["despertar"].clear()
+
+def asegurar_programador():
+    """Arranca (una vez por proceso) el hilo que refresca cada REFRESCO_SEG segundos."""
+    est = estado_datos()
+    with est["lock"]:
+        if est["hilo"] is None or not est["hilo"].is_alive():
+            est["hilo"] = threading.Thread(target=_programador, args=(est,), daemon=True, name="refresco-sheets")
+            est["hilo"].start()
+    return est
+
+def pedir_refresco(completo=False, esperar=0):
+    """
+    Adelanta la próxima vuelta del refresco; completo=True descarta la
+    ingesta incremental. Con esperar > 0 espera (hasta esos segundos) a que
+    termine una vuelta que empiece después del pedido.
+    """
+    est = asegurar_programador()
+    with est["lock"]:
+        meta = est["vueltas"] + (2 if est["refrescando"] else 1)
+        est["completo"] = est["completo"] or completo
+    est["despertar"].set()
+    limite = time.monotonic() + esperar
+    while est["vueltas"] < meta and time.monotonic() < limite:
+        time.sleep(0.1)
+
+def datos_nuevos():
+    """True si el refresco ya cambió los datos que muestra esta corrida de la app."""
+    datos = estado_datos()["datos"]
+    return datos is not None and version_datos(*datos) != version_servida
+
+def hojas_actuales():
+    """La descarga de Sheets de la que salen los datos servidos (sin bloquear si ya hay una)."""
+    return estado_datos()["hojas"] or descargar_sheets()
+
+def datos_solar():
+    """
+    (ms, di, hr, origen, guardado). Se sirve siempre lo último bueno del
+    refresco en segundo plano (origen "sheets"). En un proceso recién
+    arrancado, mientras llega la primera vuelta, se sirve el snapshot local
+    ("snapshot", u "offline" si Google no respondió). Sólo si no hay ni
+    datos ni snapshot se espera la primera vuelta y se propaga su error.
+    """
+    est = asegurar_programador()
+    if est["datos"] is None:
+        snaps = [snapshot(n) for n in ("mes", "dia", "hora")]
+        if all(snaps):
+            origen = "offline" if est["error"] else "snapshot"
+            return snaps[0][0], snaps[1][0], snaps[2][0], origen, snaps[2][1].get("guardado")
+        est["primera"].wait(timeout=120)
+        if est["datos"] is None:
+            raise RuntimeError(est["error"] or "Sin respuesta de Google Sheets")
+    ms, di, hr = est["datos"]
+    return ms, di, hr, "sheets", est["t_ok"].isoformat(timespec="seconds")
 
-    ms["planta"]      = ms["planta"].astype(str).apply(norm_planta)
-    ms["anio"]        = ms["anio"].apply(tis)
-    ms["mes"]         = ms["mes"].apply(parse_mes_any)
-    ms["energia_kwh"] = ms["energia_kwh"].apply(to_num_auto)
+# ======================
+# CUBO DE AGREGADOS
+# ======================
+@cache_contado(st.cache_resource(max_entries=4))
+def cubos(version, _ms, _di, _hr):
+    """Cubos de POR MES / POR DIA / POR HORA, construidos una vez por versión de datos."""
+    with medir("cubos", filas=len(_ms) + len(_di) + len(_hr)):
+        return construir_cubos(_ms, _di, _hr)
+
+def cubos_datos(ms, di, hr):
+    """Cubos de los datos servidos: los que armó el refresco si son de esta versión; si no, de la caché."""
+    version = version_datos(ms, di, hr)
+    hechos = estado_datos()["cubos"]
+    if hechos is not None and hechos[0] == version:
+        return hechos[1]
+    return cubos(version, ms, di, hr)
 
-    di["planta"]      = di["planta"].astype(str).apply(norm_planta)
-    di["energia_kwh"] = di["energia_kwh"].apply(to_num_auto)
-    di["fecha"]       = pd.to_datetime(di["fecha"], errors="coerce", dayfirst=True)
+# ======================
+# PRONÓSTICO
+# ======================
+@st.cache_resource
+def estado_pronostico():
+    """Último modelo ajustado en el proceso: con datos nuevos sólo se absorben los días nuevos."""
+    return {"lock": threading.Lock(), "modelo": None}
+
+@cache_contado(st.cache_resource(max_entries=4))
+def pronostico(version, _cubo):
+    """Modelo de pronóstico por versión de datos, ajustado a partir del anterior."""
+    est = estado_pronostico()
+    with est["lock"], medir("pronostico") as info:
+        est["modelo"] = ajustar_pronostico(_cubo, est["modelo"])
+        info["dias_nuevos"] = est["modelo"]["nuevos"]
+    return est["modelo"]
 
-    hr["planta"]      = hr["planta"].astype(str).apply(norm_planta)
-    hr["energia_kwh"] = hr["energia_kwh"].apply(to_num_auto)
-    hr["fecha"]       = pd.to_datetime(hr["fecha"], errors="coerce", dayfirst=True)
-    hr["hora_num"]    = hr["hora"].apply(parse_h)
+# ======================
+# ANOMALÍAS
+# ======================
+@cache_contado(st.cache_resource(max_entries=4))
+def anomalias(version, _cubos):
+    """Alertas de días y horas fuera de lo esperado, calculadas una vez por versión de datos."""
+    with medir("anomalias") as info:
+        al = detectar_anomalias(_cubos)
+        info["alertas"] = len(al)
+    return al
 
-    return ms, di, hr
+# ======================
+# FIGURAS
+# ======================
+# Los constructores (figuras.py) son puros. Se guardan en un LRU acotado y
+# compartido entre sesiones, así volver a una vista o a un filtro ya visto
+# no reconstruye nada; st.plotly_chart sólo serializa la figura guardada.
+FIG_CACHE_MAX = 64
+_lru_fig = cache_contado(st.cache_resource(max_entries=FIG_CACHE_MAX, show_spinner=False))
+
+fig_comparativo = _lru_fig(figuras.fig_comparativo)
+fig_apilado     = _lru_fig(figuras.fig_apilado)
+fig_torta_solar = _lru_fig(figuras.fig_torta_solar)
+fig_torta_epm   = _lru_fig(figuras.fig_torta_epm)
+fig_ahorro      = _lru_fig(figuras.fig_ahorro)
+fig_tendencia   = _lru_fig(figuras.fig_tendencia)
+fig_diario      = _lru_fig(figuras.fig_diario)
+fig_mapa_calor  = _lru_fig(figuras.fig_mapa_calor)
+fig_horaria     = _lru_fig(figuras.fig_horaria)
+fig_pronostico  = _lru_fig(figuras.fig_pronostico)
 
 # ======================
 # HEADER
@@ -423,7 +495,7 @@ def render_header(logo_bytes=None):
         st.markdown(f"""
 <div style="text-align:center;padding:10px 0">
   <div style="font-size:32px;font-weight:900;margin:0;line-height:1.1;
-              background:linear-gradient(135deg,{COLOR_CAFE},{COLOR_MERC},{COLOR_TOTAL});
+              background:linear-gradient(135deg,{COLOR_ACENTO},{COLOR_VERDE},{COLOR_TOTAL});
               -webkit-background-clip:text;-webkit-text-fill-color:transparent">
     Energía Solar · Café &amp; Mercado · Monte Sereno
   </div>
@@ -438,14 +510,14 @@ def render_header(logo_bytes=None):
 # ======================
 # APP
 # ======================
+reg_carga = registro("carga")
 try:
-    ms_df, di_df, hr_df = cargar_solar()
+    ms_df, di_df, hr_df, origen, guardado = datos_solar()
 except Exception as e:
     st.error(f"Error leyendo Google Sheets (Solar).\n\n{e}\n\n{traceback.format_exc()}")
     st.stop()
-
-di_df = di_df.dropna(subset=["fecha"])
-hr_df = hr_df.dropna(subset=["fecha","hora_num"])
+# versión de los frames de esta corrida (datos_nuevos la compara con la del refresco)
+version_servida = version_datos(ms_df, di_df, hr_df)
 
 # Sidebar
 with st.sidebar:
@@ -465,6 +537,9 @@ with st.sidebar:
         key="epm_up",
         label_visibility="collapsed"
     )
+    st.markdown("---")
+    st.checkbox("🔧 Panel de depuración", key="depurar",
+                help="Tiempos por etapa, aciertos de caché y tamaño de cada gráfico")
 
 logo_bytes = None
 if logo_file is not None:
@@ -473,35 +548,46 @@ if logo_file is not None:
 render_header(logo_bytes)
 
 # EPM
-ep_df, cx, ph, epm_debug = load_epm(epm_file)
+ep_df, cx, ph, epm_debug = load_epm(epm_file, usar_sheets=(origen == "sheets"))
+fetch_secs = hojas_actuales()[2] if origen == "sheets" else {}
 for k, v in cx.items():
     if v > 0:
         COSTOS_EPM[k] = v
 
 ya = sorted(set(ms_df["anio"].unique()) | (set(ep_df["anio"].unique()) if not ep_df.empty else set()))
 ma = sorted(set(ms_df["mes"].unique())  | (set(ep_df["mes"].unique())  if not ep_df.empty else set()))
-pa = sorted(set(ms_df["planta"].unique()) | {"CAFE","MERCADO"})
-
-min_f = di_df["fecha"].min().date() if not di_df.empty else datetime.today().date()
-max_f = di_df["fecha"].max().date() if not di_df.empty else datetime.today().date()
+# registradas primero, luego las que traigan los datos (y TOTAL si hay filas sin planta)
+pa = plantas_orden(PLANTAS, ms_df["planta"].unique())
+pa += ["TOTAL"] if "TOTAL" in set(ms_df["planta"].unique()) else []
+pa_base = [p for p in pa if p in PLANTAS] or pa
 
-# COLUMNAS
-col_f, col_m = st.columns([1.1, 3.2], gap="large")
+f_ini, f_fin = rango_fechas(di_df)
+min_f = pd.Timestamp(f_ini).date() if f_ini is not None else datetime.today().date()
+max_f = pd.Timestamp(f_fin).date() if f_fin is not None else datetime.today().date()
 
-with col_f:
+# ======================
+# PANEL DE FILTROS
+# ======================
+def panel_filtros():
+    """
+    Panel izquierdo: filtros, costos y estado de los datos. Devuelve
+    (vista, plantas, años, meses, fecha_ini, fecha_fin, hora_min, hora_max).
+    """
     st.markdown('<div class="left-card">', unsafe_allow_html=True)
     st.markdown('<div class="left-title">Filtros</div>', unsafe_allow_html=True)
 
     if st_btn("🔄 Actualizar datos"):
-        st.cache_data.clear()
-        st.rerun()
+        with st.spinner("Actualizando desde Google Sheets…"):
+            pedir_refresco(completo=True, esperar=60)
+        if datos_nuevos():
+            st_rerun_app()
 
     st.markdown('<div class="fsec">VISTA</div>', unsafe_allow_html=True)
     vista = st.selectbox("v", ["Mensual (Solar vs EPM)", "Diario (Solar)", "Hora (Solar)"], label_visibility="collapsed")
 
     st.markdown('<div class="fsec">PLANTAS</div>', unsafe_allow_html=True)
     all_pl = st.checkbox("Seleccionar todas", value=True, key="all_pl")
-    sel_pl = pa if all_pl else st.multiselect("p", pa, default=["CAFE","MERCADO"], label_visibility="collapsed")
+    sel_pl = pa if all_pl else st.multiselect("p", pa, default=pa_base, label_visibility="collapsed")
 
     st.markdown('<div class="fsec">AÑOS</div>', unsafe_allow_html=True)
     all_yr = st.checkbox("Seleccionar todos", value=True, key="all_yr")
@@ -521,13 +607,11 @@ with col_f:
     )
 
     st.markdown('<div class="fsec">COSTOS kWh</div>', unsafe_allow_html=True)
-    c_cafe = COSTOS_EPM["CAFE"]
-    c_merc = COSTOS_EPM["MERCADO"]
+    costos_txt = "".join(f"<b>{p}:</b> ${COSTOS_EPM.get(p, 0):,}/kWh<br>" for p in plantas_orden(pa))
     src_txt = "📄 desde Excel" if cx else "⚙️ config base"
     st.markdown(f"""
     <div style='font-size:12px;line-height:1.8'>
-      <b>CAFE:</b> ${c_cafe:,}/kWh<br>
-      <b>MERCADO:</b> ${c_merc:,}/kWh<br>
+      {costos_txt}
       <span style='color:#64748b;font-size:10px'>{src_txt}</span>
     </div>
     """.replace(",","."), unsafe_allow_html=True)
@@ -551,699 +635,465 @@ with col_f:
             unsafe_allow_html=True
         )
 
+    if origen == "sheets":
+        modos = {k: e.get("modo") for k, e in ingesta_estado().items()}
+        fetch_txt = "Descarga Sheets: " + " · ".join(
+            f"{k} {fn(v,2)} s" + (f" ({modos[k]})" if modos.get(k) else "") for k, v in fetch_secs.items()
+        )
+    elif origen == "snapshot":
+        fetch_txt = f"Datos del snapshot local ({guardado}) · actualizando desde Sheets en segundo plano"
+    else:
+        fetch_txt = f"⚠ Google Sheets no responde: mostrando snapshot local ({guardado})"
+    mem = {n: d.attrs.get("memoria") for n, d in (("mes", ms_df), ("dia", di_df), ("hora", hr_df))}
+    mem_txt = "Memoria: " + " · ".join(
+        f"{n} {fn(m['antes'] / 1024)} → {fn(m['despues'] / 1024)} KB" for n, m in mem.items() if m
+    )
+    est = estado_datos()
+    if origen == "sheets":
+        # la hora de los datos en pantalla, no la del último refresco del proceso
+        t_ok = datetime.fromisoformat(guardado)
+        edad = (datetime.now() - t_ok).total_seconds()
+        color = "#16a34a" if edad < 2 * REFRESCO_SEG else "#f59e0b"
+        act_txt = (f'{t_ok.strftime("%d/%m/%Y %H:%M")} '
+                   f'<span style="color:{color}">● hace {fn(edad / 60)} min</span>')
+    else:
+        act_txt = f'<span style="color:#f59e0b">● snapshot {guardado}</span>'
+    if est["refrescando"]:
+        act_txt += " · actualizando…"
+    if est["error"] and est["t_error"] and (est["t_ok"] is None or est["t_error"] > est["t_ok"]):
+        act_txt += f'<br>⚠ Falló el refresco de las {est["t_error"].strftime("%H:%M")}: se mantienen los últimos datos buenos'
     st.markdown(
-        f'<div class="small-note">Última actualización: {datetime.now().strftime("%d/%m/%Y %H:%M")}</div>',
+        f'<div class="small-note">Última actualización: {act_txt}'
+        f'<br>{fetch_txt}<br>{mem_txt}</div>',
         unsafe_allow_html=True
     )
     st.markdown("</div>", unsafe_allow_html=True)
 
-if not sel_pl: sel_pl = ["CAFE","MERCADO"]
-if not sel_yr: sel_yr = ya
-if not sel_ms: sel_ms = ma
-fi, ff = (fr if isinstance(fr, (tuple, list)) and len(fr) == 2 else (min_f, max_f))
-
-# FILTROS
-mf = ms_df[
-    ms_df["planta"].isin(sel_pl) &
-    ms_df["anio"].isin(sel_yr) &
-    ms_df["mes"].isin(sel_ms)
-].copy()
-
-dff = di_df[
-    di_df["planta"].isin(sel_pl) &
-    (di_df["fecha"].dt.date >= fi) &
-    (di_df["fecha"].dt.date <= ff)
-].copy()
-
-hf = hr_df[
-    hr_df["planta"].isin(sel_pl) &
-    (hr_df["fecha"].dt.date >= fi) &
-    (hr_df["fecha"].dt.date <= ff) &
-    (hr_df["hora_num"] >= h_min) &
-    (hr_df["hora_num"] <= h_max)
-].copy()
-
-ef = ep_df[
-    ep_df["anio"].isin(sel_yr) &
-    ep_df["mes"].isin(sel_ms)
-].copy() if not ep_df.empty else pd.DataFrame(columns=["anio","mes","planta","epm_kwh"])
+    if not sel_pl: sel_pl = pa_base
+    if not sel_yr: sel_yr = ya
+    if not sel_ms: sel_ms = ma
+    fi, ff = (fr if isinstance(fr, (tuple, list)) and len(fr) == 2 else (min_f, max_f))
+    return vista, sel_pl, sel_yr, sel_ms, fi, ff, h_min, h_max
+
+def panel_exportar(sel_pl, sel_yr, sel_ms, fi, ff, h_min, h_max):
+    """
+    Reporte con los filtros actuales (mensual Solar vs EPM, diario, horario
+    y ahorro) en Excel o en un .zip de Parquet. Acá sólo se arman las
+    recetas de cada hoja: el archivo se escribe al hacer clic, en streaming.
+    """
+    st.markdown('<div class="fsec">EXPORTAR</div>', unsafe_allow_html=True)
+    formato = st.radio(
+        "e", list(FORMATOS_EXPORT), horizontal=True, key="formato_export", label_visibility="collapsed",
+        format_func={"xlsx": "Excel (.xlsx)", "parquet": "Parquet (.zip)"}.get,
+    )
+    hojas = hojas_reporte(hr_df, cb, ep_df, dict(COSTOS_EPM), sel_pl, sel_yr, sel_ms, fi, ff, h_min, h_max)
+    _, ext, mime = FORMATOS_EXPORT[formato]
+    st_descarga("⬇ Descargar reporte", lambda: exportar(formato, hojas), key="descarga_reporte",
+                file_name=f"reporte_gedicol_{fi:%Y%m%d}_{ff:%Y%m%d}.{ext}", mime=mime)
+
+MESES_REAL = 12   # meses de historia junto al pronóstico
+
+def panel_pronostico(plantas):
+    """
+    Pronóstico mensual de las plantas visibles (del histórico horario) a
+    continuación de los últimos MESES_REAL meses reales de POR MES.
+    """
+    st.markdown('<div class="panel"><div class="pt">Pronóstico Mensual</div>', unsafe_allow_html=True)
+    modelo = pronostico(version_datos(hr_df), cb["hora"])
+    with medir("pronosticar") as info:
+        _, pm = pronosticar(modelo, COSTOS_EPM, plantas)
+        info["filas"] = len(pm)
+    if pm.empty:
+        st.info("Sin datos horarios suficientes para pronosticar.")
+    else:
+        real = mensual_desde_cubo(cb["mes"], plantas, cb["mes"]["anios"], cb["mes"]["meses"]) \
+            .groupby(["anio", "mes"], as_index=False)["energia_kwh"].sum().tail(MESES_REAL)
+        real = pd.DataFrame({"Mes": mlbl_col(real["anio"], real["mes"]), "SOL_T": real["energia_kwh"]})
+        pron = pd.DataFrame({"Mes": mlbl_col(pm["anio"], pm["mes"]), "planta": pm["planta"],
+                             "energia_kwh": pm["energia_kwh"]})
+        hasta = dlbl(pd.Timestamp(modelo["ultimo"], unit="D"))
+        st.markdown(f'<div class="ps">{fn(pm["energia_kwh"].sum(),1)} kWh · ahorro {fc(pm["ahorro"].sum(), 2)} '
+                    f'· datos horarios hasta {hasta}</div>', unsafe_allow_html=True)
+        st_plot(fig_pronostico(real, pron, tuple(pm["planta"].unique())))
+    st.markdown("</div>", unsafe_allow_html=True)
 
 # ======================
-# CONTENIDO
+# VISTAS
 # ======================
-with col_m:
+def vista_mensual(sel_pl, sel_yr, sel_ms):
+    with medir("agregado", vista="mensual") as info:
+        mf = mensual_desde_cubo(cb["mes"], sel_pl, sel_yr, sel_ms)
+        info["filas"] = len(mf)
+    with medir("filtro", vista="mensual") as info:
+        ef = ep_df[
+            ep_df["anio"].isin(sel_yr) &
+            ep_df["mes"].isin(sel_ms)
+        ] if not ep_df.empty else pd.DataFrame(columns=["anio","mes","planta","epm_kwh"])
+        info["filas"] = len(ef)
+
+    # KPIs de todas las plantas visibles en un groupby por tabla
+    plantas = plantas_orden(sel_pl)
+    with medir("kpis", vista="mensual"):
+        k, tot = kpis_plantas(mf, ef, plantas, COSTOS_EPM)
+    gt_, et_, at_, cp_ = tot["solar"], tot["epm"], tot["ahorro"], tot["cobertura"]
+    proms = tuple((sf(r.solar_prom), sf(r.epm_prom)) for r in k.itertuples())
+
+    # KPIs principales
+    st.markdown(f"""
+    <div class="kpi-row">
+      <div class="kpi-card c3">
+        <div class="kl">Solar Total</div>
+        <div class="kv" style="color:{COLOR_TOTAL}">{fn(gt_,1)} kWh</div>
+        <div class="ks">Generación fotovoltaica</div>
+      </div>
+      <div class="kpi-card c5">
+        <div class="kl">EPM Total</div>
+        <div class="kv" style="color:#ef4444">{fn(et_)} kWh</div>
+        <div class="ks">Consumo eléctrico</div>
+      </div>
+      <div class="kpi-card c4">
+        <div class="kl">Ahorro Total</div>
+        <div class="kv" style="color:{COLOR_AMBAR}">{fc(at_, 2)}</div>
+        <div class="ks">Ahorro económico</div>
+      </div>
+      <div class="kpi-card c1">
+        <div class="kl">Cobertura</div>
+        <div class="kv" style="color:{COLOR_ACENTO}">{fn(cp_,1)}%</div>
+        <div class="ks">Solar / EPM</div>
+      </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # KPIs por planta
+    st.markdown('<div class="kpi-row">' + "".join(
+        [kpi_planta(f"Solar {p}", f"{fn(r.solar,1)} kWh", info_planta(p)["color"], f"Prom: {fn(r.solar_prom,1)} kWh/mes")
+         for p, r in zip(plantas, k.itertuples())] +
+        [kpi_planta(f"EPM {p}", f"{fn(r.epm)} kWh", info_planta(p)["color_epm"], f"Prom: {fn(r.epm_prom,1)} kWh/mes")
+         for p, r in zip(plantas, k.itertuples())]
+    ) + "</div>", unsafe_allow_html=True)
+
+    with medir("pivot_table", vista="mensual"):
+        b = tabla_mensual(mf, ef, COSTOS_EPM, plantas)
+    cols_b = ["Mes", *plantas, *(f"EPM_{p}" for p in plantas)]
+
+    # ──── GRÁFICO 1: Comparativo Solar/EPM por planta, agrupado, con promedios ────
+    st.markdown('<div class="panel">', unsafe_allow_html=True)
+    st.markdown('<div class="pt">Comparativo: Solar vs EPM por Planta</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="ps">{2 * len(plantas)} series agrupadas con líneas de promedio por planta</div>', unsafe_allow_html=True)
+
+    st_plot(fig_comparativo(b[cols_b], tuple(plantas), proms))
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # ──── GRÁFICO 2: Barras apiladas EPM vs Solar ────
+    st.markdown('<div class="panel">', unsafe_allow_html=True)
+    st.markdown('<div class="pt">Comparativo Apilado: Consumo EPM + Generación Solar</div>', unsafe_allow_html=True)
+    st.markdown('<div class="ps">Barras apiladas mostrando distribución por planta</div>', unsafe_allow_html=True)
+
+    st_plot(fig_apilado(b[cols_b], tuple(plantas), proms))
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Tarjetas resumen
+    c1, c2, c3 = st.columns(3)
+
+    with c1:
+        st.markdown('<div class="panel"><div class="pt">Solar por Planta</div>', unsafe_allow_html=True)
+        st_plot(fig_torta_solar(tuple(plantas), tuple(k["solar"]), gt_))
+        st.markdown("</div>", unsafe_allow_html=True)
 
-    # =========================================================
-    # MENSUAL
-    # =========================================================
-    if vista.startswith("Mensual"):
+    with c2:
+        st.markdown('<div class="panel"><div class="pt">EPM por Planta</div>', unsafe_allow_html=True)
+        st_plot(fig_torta_epm(tuple(plantas), tuple(k["epm"]), et_))
+        st.markdown("</div>", unsafe_allow_html=True)
 
-        gc  = mf[mf["planta"]=="CAFE"]["energia_kwh"].sum()
-        gm  = mf[mf["planta"]=="MERCADO"]["energia_kwh"].sum()
-        gt_ = gc + gm
+    with c3:
+        st.markdown('<div class="panel"><div class="pt">Ahorro Mensual</div>', unsafe_allow_html=True)
+        st_plot(fig_ahorro(b[["Mes","Ahorro"]]))
+        st.markdown("</div>", unsafe_allow_html=True)
 
-        et_ = ef["epm_kwh"].sum() if not ef.empty else 0
-        ec_ = ef[ef["planta"]=="CAFE"]["epm_kwh"].sum()    if not ef.empty else 0
-        em_ = ef[ef["planta"]=="MERCADO"]["epm_kwh"].sum() if not ef.empty else 0
+    # Tendencia y pronóstico
+    c1, c2 = st.columns(2)
 
-        ac_ = gc * COSTOS_EPM["CAFE"]
-        am_ = gm * COSTOS_EPM["MERCADO"]
-        at_ = ac_ + am_
-        cp_ = (gt_ / et_ * 100) if et_ > 0 else 0
+    with c1:
+        st.markdown('<div class="panel"><div class="pt">Tendencia Mensual</div>', unsafe_allow_html=True)
+        st_plot(fig_tendencia(b[["Mes","EPM_T","SOL_T"]]))
+        st.markdown("</div>", unsafe_allow_html=True)
 
-        # Promedios individuales
-        sol_cafe_prom = mf[mf["planta"]=="CAFE"].groupby(["anio","mes"])["energia_kwh"].sum().mean() if len(mf[mf["planta"]=="CAFE"]) > 0 else 0
-        sol_merc_prom = mf[mf["planta"]=="MERCADO"].groupby(["anio","mes"])["energia_kwh"].sum().mean() if len(mf[mf["planta"]=="MERCADO"]) > 0 else 0
-        epm_cafe_prom = ef[ef["planta"]=="CAFE"].groupby(["anio","mes"])["epm_kwh"].sum().mean() if len(ef[ef["planta"]=="CAFE"]) > 0 else 0
-        epm_merc_prom = ef[ef["planta"]=="MERCADO"].groupby(["anio","mes"])["epm_kwh"].sum().mean() if len(ef[ef["planta"]=="MERCADO"]) > 0 else 0
+    with c2:
+        panel_pronostico(plantas)
+
+    # Tabla resumen mejorada
+    st.markdown('<div class="panel"><div class="pt">Tabla Resumen Mensual</div>', unsafe_allow_html=True)
+    tbl = tabla_resumen(b)
+    st_df(tbl, hide_index=True, column_config={
+        **{f"Solar {p} (kWh)": st.column_config.NumberColumn(format="%.1f") for p in [*plantas, "TOTAL"]},
+        **{f"EPM {p} (kWh)": st.column_config.NumberColumn(format="%d") for p in [*plantas, "TOTAL"]},
+        "Cobertura (%)": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.1f%%"),
+        "Ahorro (COP)": st.column_config.NumberColumn(format="$%.2f"),
+    })
+    st.markdown("</div>", unsafe_allow_html=True)
+
+def vista_diaria(sel_pl, fi, ff):
+    st.markdown("## Vista Diaria: Generación Solar")
+
+    with medir("agregado", vista="diaria") as info:
+        dd, hm_pivot, resumen_diario = diario_desde_cubo(cb["dia"], sel_pl, fi, ff)
+        info["filas"] = len(dd)
+    if dd.empty:
+        st.info("Sin datos para el rango seleccionado.")
+    else:
+        dd["lbl"] = dlbl_col(dd["fecha"])
+
+        # KPIs diarios: totales por planta del resumen del cubo (sin recorrer dd)
+        plantas = plantas_orden(sel_pl)
+        tot_d = resumen_diario.set_index("planta")["sum"].reindex(plantas).fillna(0.0)
+        dt = sum(tot_d)
+        dias_totales = dd["fecha"].nunique()
+        prom_diario = dt / dias_totales if dias_totales > 0 else 0
+        ahorro_diario = sum(v * COSTOS_EPM.get(p, 0) for p, v in tot_d.items())
+        tarjetas = "".join(kpi_planta(p, f"{fn(v,1)} kWh", info_planta(p)["color"]) for p, v in tot_d.items())
 
-        # KPIs principales
         st.markdown(f"""
         <div class="kpi-row">
           <div class="kpi-card c3">
-            <div class="kl">Solar Total</div>
-            <div class="kv" style="color:{COLOR_TOTAL}">{fn(gt_,1)} kWh</div>
-            <div class="ks">Generación fotovoltaica</div>
-          </div>
-          <div class="kpi-card c5">
-            <div class="kl">EPM Total</div>
-            <div class="kv" style="color:#ef4444">{fn(et_)} kWh</div>
-            <div class="ks">Consumo eléctrico</div>
+            <div class="kl">Total Generado</div>
+            <div class="kv" style="color:{COLOR_TOTAL}">{fn(dt,1)} kWh</div>
+            <div class="ks">{dias_totales} días</div>
           </div>
+          {tarjetas}
           <div class="kpi-card c4">
             <div class="kl">Ahorro Total</div>
-            <div class="kv" style="color:{COLOR_AMBAR}">{fc(at_, 2)}</div>
-            <div class="ks">Ahorro económico</div>
+            <div class="kv" style="color:{COLOR_AMBAR}">{fc(ahorro_diario, 2)}</div>
           </div>
-          <div class="kpi-card c1">
-            <div class="kl">Cobertura</div>
-            <div class="kv" style="color:{COLOR_CAFE}">{fn(cp_,1)}%</div>
-            <div class="ks">Solar / EPM</div>
+          <div class="kpi-card c3">
+            <div class="kl">Promedio Diario</div>
+            <div class="kv" style="color:{COLOR_TOTAL}">{fn(prom_diario,1)} kWh/día</div>
           </div>
         </div>
         """, unsafe_allow_html=True)
 
-        # KPIs por planta
+        # Gráfico de barras apiladas (más visible que área)
+        st.markdown('<div class="panel">', unsafe_allow_html=True)
+        st.markdown('<div class="pt">Generación Diaria (Flujo)</div>', unsafe_allow_html=True)
+
+        # serie larga: se grafica reducida y el deslizador acota un tramo a resolución completa
+        dg = dd
+        dias = dd["fecha"].drop_duplicates()
+        if len(dias) > MAX_PUNTOS_DIA:
+            d0, d1 = dias.min().date(), dias.max().date()
+            det = st.slider("Detalle", min_value=d0, max_value=d1, value=(d0, d1),
+                            format="DD/MM/YYYY", label_visibility="collapsed")
+            dg = dd[dd["fecha"].between(pd.Timestamp(det[0]), pd.Timestamp(det[1]))]
+            n_det = dg["fecha"].nunique()
+            nota = (f"{n_det} días: serie reducida a ~{PUNTOS_PANTALLA} puntos. Acota el tramo a "
+                    f"{MAX_PUNTOS_DIA} días o menos para ver cada día.") if n_det > MAX_PUNTOS_DIA \
+                else f"{n_det} días a resolución completa."
+            st.markdown(f'<div class="ps">{nota}</div>', unsafe_allow_html=True)
+
+        st_plot(fig_diario(dg[["fecha","planta","energia_kwh"]], tuple(plantas)))
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        # Tabla diaria con ahorro
+        st.markdown('<div class="panel"><div class="pt">Tabla Diaria</div>', unsafe_allow_html=True)
+        with medir("pivot_table", vista="diaria"):
+            tbl_d = dd.pivot_table(index="lbl", columns="planta", values="energia_kwh", fill_value=0)
+        tbl_d = tbl_d.reindex(columns=plantas, fill_value=0.0)
+        tbl_d["TOTAL (kWh)"] = tbl_d[plantas].sum(axis=1)
+        tbl_d["Ahorro (COP)"] = tbl_d[plantas].mul([COSTOS_EPM.get(p, 0) for p in plantas]).sum(axis=1)
+        tbl_d = tbl_d.rename(columns={p: f"{p} (kWh)" for p in plantas}).reset_index()
+        tbl_d.columns.name = None
+        tbl_d = tbl_d.rename(columns={"lbl": "Fecha"})
+        st_df(tbl_d, hide_index=True, column_config={
+            **{f"{p} (kWh)": st.column_config.NumberColumn(format="%.1f") for p in plantas},
+            "TOTAL (kWh)": st.column_config.NumberColumn(format="%.1f"),
+            "Ahorro (COP)": st.column_config.NumberColumn(format="$%.2f"),
+        })
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        # alertas del rango y las plantas visibles
+        with medir("filtro", vista="alertas") as info:
+            al = anomalias(version_datos(ms_df, di_df, hr_df), cb)
+            al = al[al["planta"].isin(plantas) & al["fecha"].between(pd.Timestamp(fi), pd.Timestamp(ff))]
+            info["filas"] = len(al)
+
+        # Mapa de calor
+        st.markdown('<div class="panel"><div class="pt">Mapa de Calor: Generación por Día</div>', unsafe_allow_html=True)
+        if len(al):
+            st.markdown('<div class="ps">Recuadros: días con alertas (detalle al pasar el cursor)</div>', unsafe_allow_html=True)
+        st_plot(fig_mapa_calor(hm_pivot, marcas_mapa(al)))
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        # Alertas
+        st.markdown('<div class="panel"><div class="pt">Alertas de Generación</div>', unsafe_allow_html=True)
+        if al.empty:
+            st.markdown('<div class="ps">Sin días ni horas fuera de lo esperado en el rango.</div>', unsafe_allow_html=True)
+        else:
+            n_dias = int((al["nivel"] == "día").sum())
+            st.markdown(f'<div class="ps">{n_dias} días completos y {len(al) - n_dias} tramos de horas fuera de '
+                        f'lo esperado para la planta, la hora y el mes (más recientes primero)</div>', unsafe_allow_html=True)
+            al = al.iloc[::-1].reset_index(drop=True)
+            st_df(pd.DataFrame({
+                "Fecha": dlbl_col(al["fecha"]),
+                "Planta": al["planta"],
+                "Alcance": al["horas"].where(al["nivel"] != "día", "Día completo"),
+                "Generado (kWh)": al["energia_kwh"],
+                "Esperado (kWh)": al["esperado"],
+                "Desvío (%)": al["desvio"] * 100,
+                "Tipo": al["tipo"].map({"bajo": "⬇ Bajo lo esperado", "alto": "⬆ Sobre lo esperado"}),
+            }), hide_index=True, column_config={
+                "Generado (kWh)": st.column_config.NumberColumn(format="%.1f"),
+                "Esperado (kWh)": st.column_config.NumberColumn(format="%.1f"),
+                "Desvío (%)": st.column_config.NumberColumn(format="%.0f%%"),
+            })
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        # Tabla resumen diaria
+        st.markdown('<div class="panel"><div class="pt">Resumen Diario</div>', unsafe_allow_html=True)
+        resumen_diario.columns = ["Planta", "Total (kWh)", "Promedio (kWh)", "Máximo (kWh)", "Mínimo (kWh)"]
+        st_df(resumen_diario, hide_index=True, column_config={
+            "Total (kWh)": st.column_config.NumberColumn(format="%.1f"),
+            "Promedio (kWh)": st.column_config.NumberColumn(format="%.1f"),
+            "Máximo (kWh)": st.column_config.NumberColumn(format="%.1f"),
+            "Mínimo (kWh)": st.column_config.NumberColumn(format="%.1f"),
+        })
+        st.markdown("</div>", unsafe_allow_html=True)
+
+def vista_horaria(sel_pl, fi, ff, h_min, h_max):
+    st.markdown("## Vista Horaria: Generación Solar")
+
+    with medir("agregado", vista="horaria") as info:
+        hh, h_tot = horario_desde_cubo(cb["hora"], sel_pl, fi, ff, h_min, h_max)
+        info["filas"] = len(hh)
+    if hh.empty:
+        st.info("Sin datos para el rango y horario seleccionados.")
+    else:
+        # KPIs horarios: totales del cubo y la hora pico de cada planta en un groupby
+        plantas = plantas_orden(sel_pl)
+        ht = sum(h_tot.get(p, 0.0) for p in plantas)
+        pico = hh.loc[hh.groupby("planta")["energia_kwh"].idxmax()].set_index("planta")["hora_num"]
+        tarjetas = "".join(kpi_planta(p, f"{fn(h_tot.get(p, 0.0),1)} kWh", info_planta(p)["color"],
+                                      f"Pico: {int(pico.get(p, 0)):02d}:00") for p in plantas)
+
         st.markdown(f"""
         <div class="kpi-row">
-          <div class="kpi-card c1">
-            <div class="kl">Solar CAFE</div>
-            <div class="kv" style="color:{COLOR_CAFE}">{fn(gc,1)} kWh</div>
-            <div class="ks">Prom: {fn(sol_cafe_prom,1)} kWh/mes</div>
-          </div>
-          <div class="kpi-card c2">
-            <div class="kl">Solar MERCADO</div>
-            <div class="kv" style="color:{COLOR_MERC}">{fn(gm,1)} kWh</div>
-            <div class="ks">Prom: {fn(sol_merc_prom,1)} kWh/mes</div>
-          </div>
-          <div class="kpi-card c6">
-            <div class="kl">EPM CAFE</div>
-            <div class="kv" style="color:{COLOR_EPM_CAFE}">{fn(ec_)} kWh</div>
-            <div class="ks">Prom: {fn(epm_cafe_prom,1)} kWh/mes</div>
-          </div>
-          <div class="kpi-card c7">
-            <div class="kl">EPM MERCADO</div>
-            <div class="kv" style="color:{COLOR_EPM_MERC}">{fn(em_)} kWh</div>
-            <div class="ks">Prom: {fn(epm_merc_prom,1)} kWh/mes</div>
+          <div class="kpi-card c3">
+            <div class="kl">Total Generado</div>
+            <div class="kv" style="color:{COLOR_TOTAL}">{fn(ht,1)} kWh</div>
           </div>
+          {tarjetas}
         </div>
         """, unsafe_allow_html=True)
 
-        # Pivots
-        sp = mf.groupby(["anio","mes","planta"], as_index=False)["energia_kwh"].sum()
-        sp = sp.pivot_table(
-            index=["anio","mes"], columns="planta",
-            values="energia_kwh", aggfunc="sum", fill_value=0
-        ).reset_index()
-        for c in ["CAFE","MERCADO"]:
-            if c not in sp.columns: sp[c] = 0.0
-        sp["SOL_T"] = sp["CAFE"] + sp["MERCADO"]
-
-        if ef.empty or et_ == 0:
-            epp = pd.DataFrame(columns=["anio","mes","EC","EM","EPM_T"])
-        else:
-            epp = ef.pivot_table(
-                index=["anio","mes"], columns="planta",
-                values="epm_kwh", aggfunc="sum", fill_value=0
-            ).reset_index()
-            for c in ["CAFE","MERCADO"]:
-                if c not in epp.columns: epp[c] = 0.0
-            epp["EPM_T"] = epp["CAFE"] + epp["MERCADO"]
-            if "TOTAL" in epp.columns:
-                epp["EPM_T"] = np.where(epp["EPM_T"] > 0, epp["EPM_T"], epp["TOTAL"])
-            epp = epp.rename(columns={"CAFE":"EC","MERCADO":"EM"})
-
-        if epp.empty:
-            b = sp.copy()
-            b["EC"]    = 0.0
-            b["EM"]    = 0.0
-            b["EPM_T"] = 0.0
-        else:
-            b = pd.merge(sp, epp[["anio","mes","EC","EM","EPM_T"]], on=["anio","mes"], how="outer")
-            for c in ["CAFE","MERCADO","SOL_T","EC","EM","EPM_T"]:
-                if c not in b.columns: b[c] = 0.0
-                b[c] = b[c].fillna(0.0)
-
-        b["anio"] = b["anio"].apply(tis)
-        b["mes"]  = b["mes"].apply(parse_mes_any)
-        b = b[b["mes"].between(1,12)].sort_values(["anio","mes"]).reset_index(drop=True)
-        b["Mes"]    = b.apply(lambda r: mlbl(r["anio"], r["mes"]), axis=1)
-        b["Cob"]    = b.apply(lambda r: (r["SOL_T"] / r["EPM_T"] * 100) if r["EPM_T"] > 0 else 0, axis=1)
-        b["Ahorro"] = b["CAFE"] * COSTOS_EPM["CAFE"] + b["MERCADO"] * COSTOS_EPM["MERCADO"]
-
-        # ──── GRÁFICO 1: Comparativo 4 barras agrupadas con promedios ────
         st.markdown('<div class="panel">', unsafe_allow_html=True)
-        st.markdown('<div class="pt">Comparativo: Solar vs EPM por Planta</div>', unsafe_allow_html=True)
-        st.markdown('<div class="ps">4 series agrupadas con líneas de promedio por planta</div>', unsafe_allow_html=True)
-
-        fig1 = go.Figure()
-
-        # Solar CAFE
-        fig1.add_trace(go.Bar(
-            name="Solar CAFE",
-            x=b["Mes"],
-            y=b["CAFE"],
-            marker_color=COLOR_CAFE,
-            text=b["CAFE"].apply(lambda v: fn(v,1) if v > 0 else ""),
-            textposition="outside",
-            textfont=dict(size=9),
-            offsetgroup="1"
-        ))
-
-        # Solar MERCADO
-        fig1.add_trace(go.Bar(
-            name="Solar MERCADO",
-            x=b["Mes"],
-            y=b["MERCADO"],
-            marker_color=COLOR_MERC,
-            text=b["MERCADO"].apply(lambda v: fn(v,1) if v > 0 else ""),
-            textposition="outside",
-            textfont=dict(size=9),
-            offsetgroup="2"
-        ))
-
-        # EPM CAFE (color oscuro sólido)
-        fig1.add_trace(go.Bar(
-            name="EPM CAFE",
-            x=b["Mes"],
-            y=b["EC"],
-            marker_color=COLOR_EPM_CAFE,
-            text=b["EC"].apply(lambda v: fn(v) if v > 0 else ""),
-            textposition="outside",
-            textfont=dict(size=9),
-            offsetgroup="3"
-        ))
-
-        # EPM MERCADO (color oscuro sólido)
-        fig1.add_trace(go.Bar(
-            name="EPM MERCADO",
-            x=b["Mes"],
-            y=b["EM"],
-            marker_color=COLOR_EPM_MERC,
-            text=b["EM"].apply(lambda v: fn(v) if v > 0 else ""),
-            textposition="outside",
-            textfont=dict(size=9),
-            offsetgroup="4"
-        ))
-
-        # Promedios como líneas horizontales
-        if sol_cafe_prom > 0:
-            fig1.add_hline(
-                y=sol_cafe_prom,
-                line_dash="dot",
-                line_color=COLOR_CAFE,
-                line_width=2,
-                annotation_text=f"Prom Solar CAFE: {fn(sol_cafe_prom,1)}",
-                annotation_position="top left",
-                annotation_font=dict(size=9, color=COLOR_CAFE)
-            )
-        if sol_merc_prom > 0:
-            fig1.add_hline(
-                y=sol_merc_prom,
-                line_dash="dash",
-                line_color=COLOR_MERC,
-                line_width=2,
-                annotation_text=f"Prom Solar MERCADO: {fn(sol_merc_prom,1)}",
-                annotation_position="bottom right",
-                annotation_font=dict(size=9, color=COLOR_MERC)
-            )
-        if epm_cafe_prom > 0:
-            fig1.add_hline(
-                y=epm_cafe_prom,
-                line_dash="dot",
-                line_color=COLOR_EPM_CAFE,
-                line_width=2,
-                annotation_text=f"Prom EPM CAFE: {fn(epm_cafe_prom,1)}",
-                annotation_position="top right",
-                annotation_font=dict(size=9, color=COLOR_EPM_CAFE)
-            )
-        if epm_merc_prom > 0:
-            fig1.add_hline(
-                y=epm_merc_prom,
-                line_dash="dashdot",
-                line_color=COLOR_EPM_MERC,
-                line_width=2,
-                annotation_text=f"Prom EPM MERCADO: {fn(epm_merc_prom,1)}",
-                annotation_position="bottom left",
-                annotation_font=dict(size=9, color=COLOR_EPM_MERC)
-            )
-
-        fig1.update_layout(
-            barmode="group",
-            yaxis_title="Energía (kWh)",
-            bargap=0.15,
-            bargroupgap=0.1
-        )
-        fig1 = aplyt(fig1, 500)
-        st_plot(fig1)
-        st.markdown("</div>", unsafe_allow_html=True)
-
-        # ──── GRÁFICO 2: Barras apiladas EPM vs Solar ────
-        st.markdown('<div class="panel">', unsafe_allow_html=True)
-        st.markdown('<div class="pt">Comparativo Apilado: Consumo EPM + Generación Solar</div>', unsafe_allow_html=True)
-        st.markdown('<div class="ps">Barras apiladas mostrando distribución por planta</div>', unsafe_allow_html=True)
-
-        fig2 = go.Figure()
-
-        # EPM base (arriba)
-        fig2.add_trace(go.Bar(
-            name="EPM CAFE",
-            x=b["Mes"],
-            y=b["EC"],
-            marker_color=COLOR_EPM_CAFE,
-            text=b["EC"].apply(lambda v: fn(v) if v > 0 else ""),
-            textposition="inside",
-            textfont=dict(size=9, color="white")
-        ))
-        fig2.add_trace(go.Bar(
-            name="EPM MERCADO",
-            x=b["Mes"],
-            y=b["EM"],
-            marker_color=COLOR_EPM_MERC,
-            text=b["EM"].apply(lambda v: fn(v) if v > 0 else ""),
-            textposition="inside",
-            textfont=dict(size=9, color="white")
-        ))
-
-        # Solar encima
-        fig2.add_trace(go.Bar(
-            name="Solar CAFE",
-            x=b["Mes"],
-            y=b["CAFE"],
-            marker_color=COLOR_CAFE,
-            text=b["CAFE"].apply(lambda v: fn(v,1) if v > 0 else ""),
-            textposition="inside",
-            textfont=dict(size=9, color="white")
-        ))
-        fig2.add_trace(go.Bar(
-            name="Solar MERCADO",
-            x=b["Mes"],
-            y=b["MERCADO"],
-            marker_color=COLOR_MERC,
-            text=b["MERCADO"].apply(lambda v: fn(v,1) if v > 0 else ""),
-            textposition="inside",
-            textfont=dict(size=9, color="white")
-        ))
-
-        # Promedios totales por planta (Solar + EPM)
-        prom_cafe_total = sol_cafe_prom + epm_cafe_prom
-        prom_merc_total = sol_merc_prom + epm_merc_prom
-        
-        if prom_cafe_total > 0:
-            fig2.add_hline(
-                y=prom_cafe_total,
-                line_dash="dot",
-                line_color=COLOR_CAFE,
-                line_width=2,
-                annotation_text=f"Prom CAFE (Solar+EPM): {fn(prom_cafe_total,1)}",
-                annotation_position="top left",
-                annotation_font=dict(size=8, color=COLOR_CAFE)
-            )
-        if prom_merc_total > 0:
-            fig2.add_hline(
-                y=prom_merc_total,
-                line_dash="dash",
-                line_color=COLOR_MERC,
-                line_width=2,
-                annotation_text=f"Prom MERCADO (Solar+EPM): {fn(prom_merc_total,1)}",
-                annotation_position="bottom right",
-                annotation_font=dict(size=8, color=COLOR_MERC)
-            )
-
-        fig2.update_layout(
-            barmode="stack",
-            yaxis_title="Energía (kWh)"
-        )
-        fig2 = aplyt(fig2, 480)
-        st_plot(fig2)
-        st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown('<div class="pt">Generación Promedio por Hora</div>', unsafe_allow_html=True)
 
-        # Tarjetas resumen
-        c1, c2, c3 = st.columns(3)
-
-        with c1:
-            st.markdown('<div class="panel"><div class="pt">Solar por Planta</div>', unsafe_allow_html=True)
-            fp = go.Figure(go.Pie(
-                labels=["CAFE","MERCADO"], values=[sf(gc), sf(gm)],
-                hole=.55,
-                marker=dict(colors=[COLOR_CAFE, COLOR_MERC], line=dict(color="white", width=3)),
-                textinfo="label+percent", textfont=dict(size=11)
-            ))
-            fp.add_annotation(
-                text=f"<b>{fn(gt_,1)}</b><br><span style='font-size:9px;color:#64748b'>kWh</span>",
-                x=.5, y=.5, showarrow=False, font=dict(size=16, color="#0f172a")
-            )
-            fp.update_layout(paper_bgcolor="rgba(0,0,0,0)", showlegend=False,
-                             height=260, margin=dict(l=10,r=10,t=10,b=10))
-            st_plot(fp)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        with c2:
-            st.markdown('<div class="panel"><div class="pt">EPM por Planta</div>', unsafe_allow_html=True)
-            if (ec_ + em_) > 0:
-                fp2 = go.Figure(go.Pie(
-                    labels=["CAFE","MERCADO"], values=[sf(ec_), sf(em_)],
-                    hole=.55,
-                    marker=dict(colors=[COLOR_EPM_CAFE, COLOR_EPM_MERC], line=dict(color="white", width=3)),
-                    textinfo="label+percent", textfont=dict(size=11)
-                ))
-            elif et_ > 0:
-                fp2 = go.Figure(go.Pie(
-                    labels=["TOTAL"], values=[sf(et_)],
-                    hole=.55,
-                    marker=dict(colors=["#ef4444"], line=dict(color="white", width=3)),
-                    textinfo="label+percent", textfont=dict(size=11)
-                ))
-            else:
-                fp2 = go.Figure()
-                fp2.add_annotation(
-                    text="Sin datos EPM",
-                    x=.5, y=.5, showarrow=False,
-                    font=dict(size=14, color="#94a3b8"), xref="paper", yref="paper"
-                )
-            fp2.add_annotation(
-                text=f"<b>{fn(et_)}</b><br><span style='font-size:9px;color:#64748b'>kWh</span>",
-                x=.5, y=.5, showarrow=False, font=dict(size=16, color="#0f172a")
-            )
-            fp2.update_layout(paper_bgcolor="rgba(0,0,0,0)", showlegend=False,
-                              height=260, margin=dict(l=10,r=10,t=10,b=10))
-            st_plot(fp2)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        with c3:
-            st.markdown('<div class="panel"><div class="pt">Ahorro Mensual</div>', unsafe_allow_html=True)
-            fa = go.Figure(go.Bar(
-                x=b["Mes"], y=b["Ahorro"],
-                marker_color=COLOR_AMBAR,
-                text=b["Ahorro"].apply(lambda v: fc(v, 2) if v > 0 else ""),
-                textposition="outside", textfont=dict(size=9, color=COLOR_AMBAR)
-            ))
-            fa.update_layout(showlegend=False, yaxis_title="$COP")
-            fa = aplyt(fa, 260)
-            st_plot(fa)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        # Tendencia
-        st.markdown('<div class="panel"><div class="pt">Tendencia Mensual</div>', unsafe_allow_html=True)
-        ft = go.Figure()
-        if b["EPM_T"].sum() > 0:
-            ft.add_trace(go.Scatter(
-                name="EPM Total", x=b["Mes"], y=b["EPM_T"],
-                mode="lines+markers",
-                line=dict(color="#ef4444", width=2.5),
-                marker=dict(size=8, color="#ef4444", line=dict(width=2, color="white")),
-                fill="tozeroy", fillcolor="rgba(239,68,68,.06)"
-            ))
-        ft.add_trace(go.Scatter(
-            name="Solar Total", x=b["Mes"], y=b["SOL_T"],
-            mode="lines+markers",
-            line=dict(color=COLOR_TOTAL, width=3),
-            marker=dict(size=9, color=COLOR_TOTAL, line=dict(width=2, color="white")),
-            fill="tozeroy", fillcolor="rgba(139,92,246,.08)"
-        ))
-        ft.update_layout(yaxis_title="Energía (kWh)")
-        ft = aplyt(ft, 350)
-        st_plot(ft)
+        st_plot(fig_horaria(hh, tuple(plantas)))
         st.markdown("</div>", unsafe_allow_html=True)
 
-        # Tabla resumen mejorada
-        st.markdown('<div class="panel"><div class="pt">Tabla Resumen Mensual</div>', unsafe_allow_html=True)
-        tbl = pd.DataFrame({
-            "Periodo": b["Mes"],
-            "Solar CAFE (kWh)": b["CAFE"].round(1),
-            "Solar MERCADO (kWh)": b["MERCADO"].round(1),
-            "Solar TOTAL (kWh)": b["SOL_T"].round(1),
-            "EPM CAFE (kWh)": b["EC"].round(0).fillna(0).astype(int),
-            "EPM MERCADO (kWh)": b["EM"].round(0).fillna(0).astype(int),
-            "EPM TOTAL (kWh)": b["EPM_T"].round(0).fillna(0).astype(int),
-            "Cobertura (%)": b["Cob"].round(1),
-            "Ahorro (COP)": b["Ahorro"].round(2),
-        })
-        st_df(tbl, hide_index=True, column_config={
-            "Solar CAFE (kWh)": st.column_config.NumberColumn(format="%.1f"),
-            "Solar MERCADO (kWh)": st.column_config.NumberColumn(format="%.1f"),
-            "Solar TOTAL (kWh)": st.column_config.NumberColumn(format="%.1f"),
-            "EPM CAFE (kWh)": st.column_config.NumberColumn(format="%d"),
-            "EPM MERCADO (kWh)": st.column_config.NumberColumn(format="%d"),
-            "EPM TOTAL (kWh)": st.column_config.NumberColumn(format="%d"),
-            "Cobertura (%)": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.1f%%"),
-            "Ahorro (COP)": st.column_config.NumberColumn(format="$%.2f"),
+        # Tabla resumen horaria
+        st.markdown('<div class="panel"><div class="pt">Resumen por Hora</div>', unsafe_allow_html=True)
+        
+        # Pivot para tener formato tabular
+        with medir("pivot_table", vista="horaria"):
+            hh_pivot = hh.pivot_table(index="hora_num", columns="planta", values="energia_kwh", fill_value=0)
+        hh_pivot = hh_pivot.reindex(columns=plantas, fill_value=0.0)
+        hh_pivot["TOTAL"] = hh_pivot[plantas].sum(axis=1)
+        hh_pivot = hh_pivot.reset_index()
+        hh_pivot.columns.name = None
+        hh_pivot["Hora"] = hlbl_col(hh_pivot["hora_num"])
+        hh_pivot = hh_pivot.rename(columns={p: f"{p} Promedio (kWh)" for p in [*plantas, "TOTAL"]})
+        hh_pivot = hh_pivot[["Hora", *(f"{p} Promedio (kWh)" for p in [*plantas, "TOTAL"])]]
+        
+        st_df(hh_pivot, hide_index=True, column_config={
+            **{f"{p} Promedio (kWh)": st.column_config.NumberColumn(format="%.2f") for p in plantas},
+            "TOTAL Promedio (kWh)": st.column_config.NumberColumn(format="%.2f"),
         })
         st.markdown("</div>", unsafe_allow_html=True)
 
-    # =========================================================
-    # VISTA DIARIA
-    # =========================================================
-    elif vista.startswith("Diario"):
-        st.markdown("## Vista Diaria: Generación Solar")
-
-        if dff.empty:
-            st.info("Sin datos para el rango seleccionado.")
-        else:
-            dd = dff.groupby(["fecha","planta"], as_index=False)["energia_kwh"].sum()
-            dd["lbl"] = dd["fecha"].apply(dlbl)
-
-            # KPIs diarios
-            dc = dd[dd["planta"]=="CAFE"]["energia_kwh"].sum()
-            dm = dd[dd["planta"]=="MERCADO"]["energia_kwh"].sum()
-            dt = dc + dm
-            dias_totales = dd["fecha"].nunique()
-            prom_diario = dt / dias_totales if dias_totales > 0 else 0
-            ahorro_diario = dc * COSTOS_EPM["CAFE"] + dm * COSTOS_EPM["MERCADO"]
-
-            st.markdown(f"""
-            <div class="kpi-row">
-              <div class="kpi-card c3">
-                <div class="kl">Total Generado</div>
-                <div class="kv" style="color:{COLOR_TOTAL}">{fn(dt,1)} kWh</div>
-                <div class="ks">{dias_totales} días</div>
-              </div>
-              <div class="kpi-card c1">
-                <div class="kl">CAFE</div>
-                <div class="kv" style="color:{COLOR_CAFE}">{fn(dc,1)} kWh</div>
-              </div>
-              <div class="kpi-card c2">
-                <div class="kl">MERCADO</div>
-                <div class="kv" style="color:{COLOR_MERC}">{fn(dm,1)} kWh</div>
-              </div>
-              <div class="kpi-card c4">
-                <div class="kl">Ahorro Total</div>
-                <div class="kv" style="color:{COLOR_AMBAR}">{fc(ahorro_diario, 2)}</div>
-              </div>
-              <div class="kpi-card c3">
-                <div class="kl">Promedio Diario</div>
-                <div class="kv" style="color:{COLOR_TOTAL}">{fn(prom_diario,1)} kWh/día</div>
-              </div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # Gráfico de barras apiladas (más visible que área)
-            st.markdown('<div class="panel">', unsafe_allow_html=True)
-            st.markdown('<div class="pt">Generación Diaria (Flujo)</div>', unsafe_allow_html=True)
-
-            dd_pivot = dd.pivot_table(index="fecha", columns="planta", values="energia_kwh", fill_value=0).reset_index()
-            if "CAFE" not in dd_pivot.columns: dd_pivot["CAFE"] = 0
-            if "MERCADO" not in dd_pivot.columns: dd_pivot["MERCADO"] = 0
-            dd_pivot["lbl"] = dd_pivot["fecha"].apply(dlbl)
-
-            fig_d = go.Figure()
-            fig_d.add_trace(go.Bar(
-                name="CAFE",
-                x=dd_pivot["lbl"],
-                y=dd_pivot["CAFE"],
-                marker_color=COLOR_CAFE,
-                text=dd_pivot["CAFE"].apply(lambda v: fn(v,1) if v > 10 else ""),
-                textposition="inside",
-                textfont=dict(size=8, color="white")
-            ))
-            fig_d.add_trace(go.Bar(
-                name="MERCADO",
-                x=dd_pivot["lbl"],
-                y=dd_pivot["MERCADO"],
-                marker_color=COLOR_MERC,
-                text=dd_pivot["MERCADO"].apply(lambda v: fn(v,1) if v > 10 else ""),
-                textposition="inside",
-                textfont=dict(size=8, color="white")
-            ))
-            fig_d.update_layout(
-                barmode="stack",
-                yaxis_title="kWh",
-                hovermode="x unified",
-                showlegend=True,
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            fig_d = aplyt(fig_d, 400)
-            st_plot(fig_d)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            # Tabla diaria con ahorro
-            st.markdown('<div class="panel"><div class="pt">Tabla Diaria</div>', unsafe_allow_html=True)
-            tbl_d = dd.pivot_table(index="lbl", columns="planta", values="energia_kwh", fill_value=0).reset_index()
-            tbl_d.columns.name = None
-            if "CAFE" not in tbl_d.columns: tbl_d["CAFE"] = 0
-            if "MERCADO" not in tbl_d.columns: tbl_d["MERCADO"] = 0
-            tbl_d["TOTAL (kWh)"] = tbl_d.get("CAFE", 0) + tbl_d.get("MERCADO", 0)
-            tbl_d["Ahorro (COP)"] = tbl_d.get("CAFE", 0) * COSTOS_EPM["CAFE"] + tbl_d.get("MERCADO", 0) * COSTOS_EPM["MERCADO"]
-            tbl_d = tbl_d.rename(columns={"lbl": "Fecha", "CAFE": "CAFE (kWh)", "MERCADO": "MERCADO (kWh)"})
-            st_df(tbl_d, hide_index=True, column_config={
-                "CAFE (kWh)": st.column_config.NumberColumn(format="%.1f"),
-                "MERCADO (kWh)": st.column_config.NumberColumn(format="%.1f"),
-                "TOTAL (kWh)": st.column_config.NumberColumn(format="%.1f"),
-                "Ahorro (COP)": st.column_config.NumberColumn(format="$%.2f"),
-            })
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            # Mapa de calor
-            st.markdown('<div class="panel"><div class="pt">Mapa de Calor: Generación por Día</div>', unsafe_allow_html=True)
-            dff_hm = dff.copy()
-            dff_hm["dia"] = dff_hm["fecha"].dt.day
-            dff_hm["mes_nombre"] = dff_hm["fecha"].dt.month.apply(lambda m: ML.get(m, str(m)))
-            hm_pivot = dff_hm.groupby(["mes_nombre","dia"])["energia_kwh"].sum().reset_index()
-            hm_matrix = hm_pivot.pivot_table(index="mes_nombre", columns="dia", values="energia_kwh", fill_value=0)
-
-            fig_hm = go.Figure(go.Heatmap(
-                z=hm_matrix.values,
-                x=hm_matrix.columns,
-                y=hm_matrix.index,
-                colorscale="YlOrRd",
-                text=np.round(hm_matrix.values, 1),
-                texttemplate="%{text}",
-                textfont={"size": 9},
-                hovertemplate="Mes: %{y}<br>Día: %{x}<br>kWh: %{z:.1f}<extra></extra>"
-            ))
-            fig_hm.update_layout(
-                xaxis_title="Día del mes",
-                yaxis_title="Mes",
-                height=300,
-                margin=dict(l=50,r=30,t=30,b=50)
-            )
-            st_plot(fig_hm)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            # Tabla resumen diaria
-            st.markdown('<div class="panel"><div class="pt">Resumen Diario</div>', unsafe_allow_html=True)
-            resumen_diario = dff.groupby("planta")["energia_kwh"].agg(["sum","mean","max","min"]).reset_index()
-            resumen_diario.columns = ["Planta", "Total (kWh)", "Promedio (kWh)", "Máximo (kWh)", "Mínimo (kWh)"]
-            st_df(resumen_diario, hide_index=True, column_config={
-                "Total (kWh)": st.column_config.NumberColumn(format="%.1f"),
-                "Promedio (kWh)": st.column_config.NumberColumn(format="%.1f"),
-                "Máximo (kWh)": st.column_config.NumberColumn(format="%.1f"),
-                "Mínimo (kWh)": st.column_config.NumberColumn(format="%.1f"),
-            })
-            st.markdown("</div>", unsafe_allow_html=True)
+# ======================
+# DEPURACIÓN
+# ======================
+def tabla_etapas(reg):
+    """Etapas de un registro, con etapa y ms primero."""
+    df = pd.DataFrame((reg or {}).get("etapas", []))
+    if df.empty:
+        return df
+    return df[["etapa", "ms"] + [c for c in df.columns if c not in ("etapa", "ms")]]
+
+def panel_depuracion(reg_carga, reg_vista):
+    """
+    Mediciones de esta sesión: la carga (última corrida completa), la vista
+    (esta corrida del fragmento), la última vuelta del refresco y los
+    aciertos de las cachés del proceso. Se pueden bajar como JSON.
+    """
+    refresco = estado_datos()["medicion"]
+    with st.expander("🔧 Depuración", expanded=True):
+        st.markdown(f'<div class="small-note">EPM: {epm_debug}</div>', unsafe_allow_html=True)
+        for titulo, reg in (("Carga", reg_carga), ("Vista", reg_vista), ("Último refresco", refresco)):
+            t = tabla_etapas(reg)
+            total = f" · {fn(t['ms'].sum(), 1)} ms" if not t.empty else ""
+            st.markdown(f"**{titulo}**{total}")
+            st_df(t, hide_index=True)
+        cache = pd.DataFrame([
+            {"función": k, "llamadas": c.get("llamadas", 0), "fallos": c.get("fallos", 0)}
+            for k, c in sorted(contadores().items())
+        ])
+        if not cache.empty:
+            cache["acierto (%)"] = ((1 - cache["fallos"] / cache["llamadas"].clip(lower=1)) * 100).round(1)
+        st.markdown("**Cachés (proceso)**")
+        st_df(cache, hide_index=True)
+        pico = memoria_proceso()
+        if pico is not None:
+            st.markdown(f'<div class="small-note">Pico de memoria del proceso: {fn(pico)} MB</div>',
+                        unsafe_allow_html=True)
+        st.download_button(
+            "⬇ Mediciones (JSON)",
+            json.dumps({"carga": reg_carga, "vista": reg_vista, "refresco": refresco,
+                        "caches": contadores(), "pico_mb": pico}, default=str, ensure_ascii=False, indent=1),
+            file_name=f"mediciones_{reg_vista['contexto']['sesion']}_{reg_vista['contexto']['corrida']}.json",
+            mime="application/json",
+        )
 
-    # =========================================================
-    # VISTA HORARIA
-    # =========================================================
-    else:
-        st.markdown("## Vista Horaria: Generación Solar")
+# ======================
+# CONTENIDO
+# ======================
+# cubos de agregados: una vez por versión de datos, fuera del fragmento
+cb = cubos_datos(ms_df, di_df, hr_df)
 
-        if hf.empty:
-            st.info("Sin datos para el rango y horario seleccionados.")
+@fragmento
+def tablero():
+    """
+    Filtros + vista activa. Como fragmento, mover un filtro vuelve a correr
+    sólo esto (no el CSS, el encabezado, la carga de Sheets ni EPM) y sólo
+    se arma la vista elegida.
+    """
+    # los frames se leen fuera del fragmento: si el refresco los cambió, se rehace toda la app
+    if datos_nuevos():
+        st_rerun_app()
+    reg_vista = registro("vista")
+    col_f, col_m = st.columns([1.1, 3.2], gap="large")
+    with col_f:
+        vista, sel_pl, sel_yr, sel_ms, fi, ff, h_min, h_max = panel_filtros()
+        panel_exportar(sel_pl, sel_yr, sel_ms, fi, ff, h_min, h_max)
+    with col_m:
+        if vista.startswith("Mensual"):
+            vista_mensual(sel_pl, sel_yr, sel_ms)
+        elif vista.startswith("Diario"):
+            vista_diaria(sel_pl, fi, ff)
         else:
-            hh = hf.groupby(["hora_num","planta"], as_index=False)["energia_kwh"].mean()
-
-            # KPIs horarios
-            hc = hf[hf["planta"]=="CAFE"]["energia_kwh"].sum()
-            hm = hf[hf["planta"]=="MERCADO"]["energia_kwh"].sum()
-            ht = hc + hm
-            hora_pico_c = hh[hh["planta"]=="CAFE"].nlargest(1, "energia_kwh")["hora_num"].values[0] if len(hh[hh["planta"]=="CAFE"]) > 0 else 0
-            hora_pico_m = hh[hh["planta"]=="MERCADO"].nlargest(1, "energia_kwh")["hora_num"].values[0] if len(hh[hh["planta"]=="MERCADO"]) > 0 else 0
-
-            st.markdown(f"""
-            <div class="kpi-row">
-              <div class="kpi-card c3">
-                <div class="kl">Total Generado</div>
-                <div class="kv" style="color:{COLOR_TOTAL}">{fn(ht,1)} kWh</div>
-              </div>
-              <div class="kpi-card c1">
-                <div class="kl">CAFE</div>
-                <div class="kv" style="color:{COLOR_CAFE}">{fn(hc,1)} kWh</div>
-                <div class="ks">Pico: {int(hora_pico_c):02d}:00</div>
-              </div>
-              <div class="kpi-card c2">
-                <div class="kl">MERCADO</div>
-                <div class="kv" style="color:{COLOR_MERC}">{fn(hm,1)} kWh</div>
-                <div class="ks">Pico: {int(hora_pico_m):02d}:00</div>
-              </div>
-            </div>
-            """, unsafe_allow_html=True)
-
-            st.markdown('<div class="panel">', unsafe_allow_html=True)
-            st.markdown('<div class="pt">Generación Promedio por Hora</div>', unsafe_allow_html=True)
-
-            fig_h = go.Figure()
-            for pl, col in [("CAFE", COLOR_CAFE), ("MERCADO", COLOR_MERC)]:
-                sub = hh[hh["planta"]==pl].sort_values("hora_num")
-                if not sub.empty:
-                    fig_h.add_trace(go.Scatter(
-                        name=f"{pl}",
-                        x=sub["hora_num"],
-                        y=sub["energia_kwh"],
-                        mode="lines+markers",
-                        line=dict(color=col, width=3),
-                        marker=dict(size=8, color=col, line=dict(width=2, color="white")),
-                        fill="tozeroy",
-                        fillcolor=col.replace("#","rgba(").rstrip(")") + ",.12)"
-                        if False else f"rgba({'59,130,246' if pl=='CAFE' else '16,185,129'},.12)"
-                    ))
-            fig_h.update_layout(
-                xaxis=dict(title="Hora del día", tickmode="linear", dtick=1,
-                           ticktext=[f"{h:02d}:00" for h in range(24)],
-                           tickvals=list(range(24))),
-                yaxis_title="kWh promedio",
-                hovermode="x unified"
-            )
-            fig_h = aplyt(fig_h, 460)
-            st_plot(fig_h)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            # Tabla resumen horaria
-            st.markdown('<div class="panel"><div class="pt">Resumen por Hora</div>', unsafe_allow_html=True)
-            
-            # Pivot para tener formato tabular
-            hh_pivot = hh.pivot_table(index="hora_num", columns="planta", values="energia_kwh", fill_value=0).reset_index()
-            hh_pivot.columns.name = None
-            if "CAFE" not in hh_pivot.columns: hh_pivot["CAFE"] = 0
-            if "MERCADO" not in hh_pivot.columns: hh_pivot["MERCADO"] = 0
-            hh_pivot["TOTAL"] = hh_pivot["CAFE"] + hh_pivot["MERCADO"]
-            hh_pivot["Hora"] = hh_pivot["hora_num"].apply(lambda h: f"{int(h):02d}:00")
-            hh_pivot = hh_pivot.rename(columns={"CAFE": "CAFE Promedio (kWh)", "MERCADO": "MERCADO Promedio (kWh)", "TOTAL": "TOTAL Promedio (kWh)"})
-            hh_pivot = hh_pivot[["Hora", "CAFE Promedio (kWh)", "MERCADO Promedio (kWh)", "TOTAL Promedio (kWh)"]]
-            
-            st_df(hh_pivot, hide_index=True, column_config={
-                "CAFE Promedio (kWh)": st.column_config.NumberColumn(format="%.2f"),
-                "MERCADO Promedio (kWh)": st.column_config.NumberColumn(format="%.2f"),
-                "TOTAL Promedio (kWh)": st.column_config.NumberColumn(format="%.2f"),
-            })
-            st.markdown("</div>", unsafe_allow_html=True)
+            vista_horaria(sel_pl, fi, ff, h_min, h_max)
+    if st.session_state.get("depurar"):
+        with col_f:
+            panel_depuracion(reg_carga, reg_vista)
+
+tablero()
 
 # Footer
+leyenda = " ".join(f'<span style="color:{info_planta(p)["color"]}">&#9632;</span> {p} &nbsp;'
+                   for p in plantas_orden(pa))
 st.markdown(f"""
 <div class="dash-footer">
   Dashboard Energía Solar · GEDICOL &nbsp;|&nbsp; &copy; {datetime.now().year} &nbsp;|&nbsp;
-  <span style="color:{COLOR_CAFE}">&#9632;</span> CAFE &nbsp;
-  <span style="color:{COLOR_MERC}">&#9632;</span> MERCADO &nbsp;
+  {leyenda}
   <span style="color:{COLOR_TOTAL}">&#9632;</span> Total &nbsp;
   <span style="color:{COLOR_AMBAR}">&#9632;</span> Ahorro
 </div>
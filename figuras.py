@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Figuras Plotly del tablero GEDICOL, sin Streamlit. Cada constructor es
+puro: la figura depende sólo de sus argumentos (los datos ya filtrados,
+con los costos aplicados), así dos.py puede guardarlas en un LRU y
+bench.py medirlas por separado.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+from gedicol import sf, fn, etiquetas, dlbl_col, hlbl_col, info_planta
+
+# paleta mejorada - EPM más visible (los colores de cada planta están en gedicol.PLANTAS)
+COLOR_ACENTO     = "#3b82f6"  # azul
+COLOR_VERDE      = "#10b981"  # verde
+COLOR_TOTAL      = "#8b5cf6"  # morado
+COLOR_AMBAR      = "#f59e0b"  # dorado
+BG = "#f8fafc"
+
+# gráfico diario: con más días que esto pasa a WebGL reducido a ~PUNTOS_PANTALLA puntos
+MAX_PUNTOS_DIA  = 400
+PUNTOS_PANTALLA = 800
+
+# (estilo, posición de la anotación) de las líneas de promedio, por orden de planta
+LINEAS_SOLAR = [("dot", "top left"), ("dash", "bottom right"), ("dashdot", "top right"), ("longdash", "bottom left")]
+LINEAS_EPM   = [("dot", "top right"), ("dashdot", "bottom left"), ("dash", "top left"), ("longdash", "bottom right")]
+
+PLT = dict(
+    paper_bgcolor="rgba(255,255,255,0)",
+    plot_bgcolor="rgba(255,255,255,0)",
+    font=dict(family="Inter,sans-serif", color="#0f172a", size=12),
+    margin=dict(l=50, r=30, t=50, b=50),
+    legend=dict(bgcolor="rgba(255,255,255,.95)", bordercolor="#e2e8f0", borderwidth=1, font=dict(size=11))
+)
+
+def aplyt(fig, h=420):
+    fig.update_layout(**PLT, height=h)
+    fig.update_xaxes(showgrid=True, gridcolor="#f1f5f9", zeroline=False)
+    fig.update_yaxes(showgrid=True, gridcolor="#f1f5f9", zeroline=False)
+    return fig
+
+def rgba(color, alfa):
+    """Color "#rrggbb" con alfa (".12") → "rgba(r,g,b,.12)", para los rellenos."""
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alfa})"
+
+def submuestrear(y, n):
+    """
+    Índices ordenados de a lo sumo ~n puntos de y: el mínimo y el máximo de
+    cada uno de n/2 tramos consecutivos, más los extremos. Los picos y
+    valles siguen visibles, a diferencia de tomar uno de cada k.
+    """
+    y = np.asarray(y, dtype="float64")
+    if len(y) <= n:
+        return np.arange(len(y))
+    tramo = np.arange(len(y)) * max(1, n // 2) // len(y)
+    orden = np.lexsort((y, tramo))
+    t = tramo[orden]
+    ini = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+    fin = np.r_[ini[1:], len(t)] - 1
+    return np.unique(np.r_[orden[ini], orden[fin], 0, len(y) - 1])
+
+def fig_comparativo(b, plantas, proms):
+    """
+    Barras agrupadas Solar y EPM de cada planta con líneas de promedio.
+    b trae Mes, una columna por planta y EPM_<planta>; proms es
+    ((prom solar, prom EPM), ...) en el orden de plantas.
+    """
+    fig1 = go.Figure()
+    series = [(f"Solar {p}", b[p], info_planta(p)["color"], 1) for p in plantas] + \
+             [(f"EPM {p}", b[f"EPM_{p}"], info_planta(p)["color_epm"], 0) for p in plantas]
+
+    # Solar de cada planta y luego EPM (color oscuro sólido)
+    for i, (nombre, y, color, dec) in enumerate(series):
+        fig1.add_trace(go.Bar(
+            name=nombre,
+            x=b["Mes"],
+            y=y,
+            marker_color=color,
+            text=etiquetas(y, dec),
+            textposition="outside",
+            textfont=dict(size=9),
+            offsetgroup=str(i + 1)
+        ))
+
+    # Promedios como líneas horizontales
+    lineas = [(f"Prom Solar {p}", pr[0], info_planta(p)["color"], LINEAS_SOLAR[i % len(LINEAS_SOLAR)])
+              for i, (p, pr) in enumerate(zip(plantas, proms))] + \
+             [(f"Prom EPM {p}", pr[1], info_planta(p)["color_epm"], LINEAS_EPM[i % len(LINEAS_EPM)])
+              for i, (p, pr) in enumerate(zip(plantas, proms))]
+    for texto, y, color, (dash, pos) in lineas:
+        if y > 0:
+            fig1.add_hline(
+                y=y,
+                line_dash=dash,
+                line_color=color,
+                line_width=2,
+                annotation_text=f"{texto}: {fn(y,1)}",
+                annotation_position=pos,
+                annotation_font=dict(size=9, color=color)
+            )
+
+    fig1.update_layout(
+        barmode="group",
+        yaxis_title="Energía (kWh)",
+        bargap=0.15,
+        bargroupgap=0.1
+    )
+    fig1 = aplyt(fig1, 500)
+    return fig1
+
+def fig_apilado(b, plantas, proms):
+    """Barras apiladas EPM + Solar con el promedio total de cada planta."""
+    fig2 = go.Figure()
+
+    # EPM base (abajo) y Solar encima
+    series = [(f"EPM {p}", b[f"EPM_{p}"], info_planta(p)["color_epm"], 0) for p in plantas] + \
+             [(f"Solar {p}", b[p], info_planta(p)["color"], 1) for p in plantas]
+    for nombre, y, color, dec in series:
+        fig2.add_trace(go.Bar(
+            name=nombre,
+            x=b["Mes"],
+            y=y,
+            marker_color=color,
+            text=etiquetas(y, dec),
+            textposition="inside",
+            textfont=dict(size=9, color="white")
+        ))
+
+    # Promedios totales por planta (Solar + EPM)
+    for i, (p, (sol_prom, epm_prom)) in enumerate(zip(plantas, proms)):
+        prom_total = sol_prom + epm_prom
+        if prom_total > 0:
+            color = info_planta(p)["color"]
+            dash, pos = LINEAS_SOLAR[i % len(LINEAS_SOLAR)]
+            fig2.add_hline(
+                y=prom_total,
+                line_dash=dash,
+                line_color=color,
+                line_width=2,
+                annotation_text=f"Prom {p} (Solar+EPM): {fn(prom_total,1)}",
+                annotation_position=pos,
+                annotation_font=dict(size=8, color=color)
+            )
+
+    fig2.update_layout(
+        barmode="stack",
+        yaxis_title="Energía (kWh)"
+    )
+    fig2 = aplyt(fig2, 480)
+    return fig2
+
+def fig_torta_solar(plantas, valores, gt_):
+    """Torta de generación solar por planta."""
+    fp = go.Figure(go.Pie(
+        labels=list(plantas), values=[sf(v) for v in valores],
+        hole=.55,
+        marker=dict(colors=[info_planta(p)["color"] for p in plantas], line=dict(color="white", width=3)),
+        textinfo="label+percent", textfont=dict(size=11)
+    ))
+    fp.add_annotation(
+        text=f"<b>{fn(gt_,1)}</b><br><span style='font-size:9px;color:#64748b'>kWh</span>",
+        x=.5, y=.5, showarrow=False, font=dict(size=16, color="#0f172a")
+    )
+    fp.update_layout(paper_bgcolor="rgba(0,0,0,0)", showlegend=False,
+                     height=260, margin=dict(l=10,r=10,t=10,b=10))
+    return fp
+
+def fig_torta_epm(plantas, valores, et_):
+    """Torta de consumo EPM por planta (o el TOTAL si no viene por planta)."""
+    if sum(valores) > 0:
+        fp2 = go.Figure(go.Pie(
+            labels=list(plantas), values=[sf(v) for v in valores],
+            hole=.55,
+            marker=dict(colors=[info_planta(p)["color_epm"] for p in plantas], line=dict(color="white", width=3)),
+            textinfo="label+percent", textfont=dict(size=11)
+        ))
+    elif et_ > 0:
+        fp2 = go.Figure(go.Pie(
+            labels=["TOTAL"], values=[sf(et_)],
+            hole=.55,
+            marker=dict(colors=["#ef4444"], line=dict(color="white", width=3)),
+            textinfo="label+percent", textfont=dict(size=11)
+        ))
+    else:
+        fp2 = go.Figure()
+        fp2.add_annotation(
+            text="Sin datos EPM",
+            x=.5, y=.5, showarrow=False,
+            font=dict(size=14, color="#94a3b8"), xref="paper", yref="paper"
+        )
+    fp2.add_annotation(
+        text=f"<b>{fn(et_)}</b><br><span style='font-size:9px;color:#64748b'>kWh</span>",
+        x=.5, y=.5, showarrow=False, font=dict(size=16, color="#0f172a")
+    )
+    fp2.update_layout(paper_bgcolor="rgba(0,0,0,0)", showlegend=False,
+                      height=260, margin=dict(l=10,r=10,t=10,b=10))
+    return fp2
+
+def fig_ahorro(b):
+    """Ahorro mensual en COP."""
+    fa = go.Figure(go.Bar(
+        x=b["Mes"], y=b["Ahorro"],
+        marker_color=COLOR_AMBAR,
+        text=etiquetas(b["Ahorro"], 2, moneda=True),
+        textposition="outside", textfont=dict(size=9, color=COLOR_AMBAR)
+    ))
+    fa.update_layout(showlegend=False, yaxis_title="$COP")
+    fa = aplyt(fa, 260)
+    return fa
+
+def fig_tendencia(b):
+    """Tendencia mensual Solar vs EPM."""
+    ft = go.Figure()
+    if b["EPM_T"].sum() > 0:
+        ft.add_trace(go.Scatter(
+            name="EPM Total", x=b["Mes"], y=b["EPM_T"],
+            mode="lines+markers",
+            line=dict(color="#ef4444", width=2.5),
+            marker=dict(size=8, color="#ef4444", line=dict(width=2, color="white")),
+            fill="tozeroy", fillcolor="rgba(239,68,68,.06)"
+        ))
+    ft.add_trace(go.Scatter(
+        name="Solar Total", x=b["Mes"], y=b["SOL_T"],
+        mode="lines+markers",
+        line=dict(color=COLOR_TOTAL, width=3),
+        marker=dict(size=9, color=COLOR_TOTAL, line=dict(width=2, color="white")),
+        fill="tozeroy", fillcolor="rgba(139,92,246,.08)"
+    ))
+    ft.update_layout(yaxis_title="Energía (kWh)")
+    ft = aplyt(ft, 350)
+    return ft
+
+def fig_pronostico(real, pron, plantas):
+    """
+    Solar real de los últimos meses (Mes, SOL_T) y el pronóstico mensual por
+    planta (Mes, planta, energia_kwh) en barras apiladas, con su total.
+    """
+    fp = go.Figure()
+    for pl in plantas:
+        d = pron[pron["planta"] == pl]
+        col = info_planta(pl)["color"]
+        fp.add_trace(go.Bar(
+            name=f"Pronóstico {pl}", x=d["Mes"], y=d["energia_kwh"],
+            marker=dict(color=rgba(col, .45), line=dict(color=col, width=1.5))
+        ))
+    tot = pron.groupby("Mes", sort=False)["energia_kwh"].sum()
+    fp.add_trace(go.Scatter(
+        name="Pronóstico Total", x=tot.index, y=tot.values,
+        mode="lines+markers+text",
+        line=dict(color=COLOR_TOTAL, width=2.5, dash="dash"),
+        marker=dict(size=8, color=COLOR_TOTAL, symbol="diamond"),
+        text=etiquetas(tot.values, 0), textposition="top center", textfont=dict(size=9, color=COLOR_TOTAL)
+    ))
+    fp.add_trace(go.Scatter(
+        name="Solar Total", x=real["Mes"], y=real["SOL_T"],
+        mode="lines+markers",
+        line=dict(color=COLOR_TOTAL, width=3),
+        marker=dict(size=9, color=COLOR_TOTAL, line=dict(width=2, color="white"))
+    ))
+    fp.update_layout(barmode="stack", yaxis_title="Energía (kWh)",
+                     xaxis=dict(categoryorder="array", categoryarray=list(dict.fromkeys([*real["Mes"], *tot.index]))))
+    fp = aplyt(fp, 350)
+    return fp
+
+def fig_diario(dd, plantas):
+    """
+    Barras apiladas por día y planta. Con más de MAX_PUNTOS_DIA días pasa a
+    líneas Scattergl sin texto, cada planta reducida con submuestrear.
+    """
+    dd_pivot = dd.pivot_table(index="fecha", columns="planta", values="energia_kwh", fill_value=0)
+    dd_pivot = dd_pivot.reindex(columns=list(plantas), fill_value=0).reset_index()
+
+    if len(dd_pivot) > MAX_PUNTOS_DIA:
+        fig_d = go.Figure()
+        x = dd_pivot["fecha"].to_numpy()
+        for pl in plantas:
+            col = info_planta(pl)["color"]
+            y = dd_pivot[pl].to_numpy(dtype="float64")
+            i = submuestrear(y, PUNTOS_PANTALLA)
+            fig_d.add_trace(go.Scattergl(
+                name=pl, x=x[i], y=y[i],
+                mode="lines",
+                line=dict(color=col, width=1.5)
+            ))
+        fig_d.update_layout(
+            yaxis_title="kWh",
+            hovermode="x unified",
+            showlegend=True,
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
+        return aplyt(fig_d, 400)
+
+    dd_pivot["lbl"] = dlbl_col(dd_pivot["fecha"])
+
+    fig_d = go.Figure()
+    for pl in plantas:
+        fig_d.add_trace(go.Bar(
+            name=pl,
+            x=dd_pivot["lbl"],
+            y=dd_pivot[pl],
+            marker_color=info_planta(pl)["color"],
+            text=etiquetas(dd_pivot[pl], 1, umbral=10),
+            textposition="inside",
+            textfont=dict(size=8, color="white")
+        ))
+    fig_d.update_layout(
+        barmode="stack",
+        yaxis_title="kWh",
+        hovermode="x unified",
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    fig_d = aplyt(fig_d, 400)
+    return fig_d
+
+def fig_mapa_calor(hm_pivot, marcas=None):
+    """
+    Mapa de calor (mes × día del mes). marcas (mes_nombre, dia, texto)
+    resalta con un recuadro las celdas con alertas, con su detalle en el hover.
+    """
+    hm_matrix = hm_pivot.pivot_table(index="mes_nombre", columns="dia", values="energia_kwh", fill_value=0)
+
+    fig_hm = go.Figure(go.Heatmap(
+        z=hm_matrix.values,
+        x=hm_matrix.columns,
+        y=hm_matrix.index,
+        colorscale="YlOrRd",
+        text=np.round(hm_matrix.values, 1),
+        texttemplate="%{text}",
+        textfont={"size": 9},
+        hovertemplate="Mes: %{y}<br>Día: %{x}<br>kWh: %{z:.1f}<extra></extra>"
+    ))
+    if marcas is not None and len(marcas):
+        m = marcas[marcas["mes_nombre"].isin(hm_matrix.index) & marcas["dia"].isin(hm_matrix.columns)]
+        fig_hm.add_trace(go.Scatter(
+            x=m["dia"], y=m["mes_nombre"], mode="markers", showlegend=False,
+            marker=dict(symbol="square-open", size=22, color="#0f172a", line=dict(width=2.5)),
+            hovertext=m["texto"], hovertemplate="%{hovertext}<extra>Alerta</extra>"
+        ))
+    fig_hm.update_layout(
+        xaxis_title="Día del mes",
+        yaxis_title="Mes",
+        height=300,
+        margin=dict(l=50,r=30,t=30,b=50)
+    )
+    return fig_hm
+
+def fig_horaria(hh, plantas):
+    """Promedio por hora y planta."""
+    fig_h = go.Figure()
+    grupos = dict(tuple(hh.sort_values("hora_num").groupby("planta", sort=False)))
+    for pl in plantas:
+        sub = grupos.get(pl)
+        if sub is not None:
+            col = info_planta(pl)["color"]
+            fig_h.add_trace(go.Scatter(
+                name=f"{pl}",
+                x=sub["hora_num"],
+                y=sub["energia_kwh"],
+                mode="lines+markers",
+                line=dict(color=col, width=3),
+                marker=dict(size=8, color=col, line=dict(width=2, color="white")),
+                fill="tozeroy",
+                fillcolor=rgba(col, ".12")
+            ))
+    fig_h.update_layout(
+        xaxis=dict(title="Hora del día", tickmode="linear", dtick=1,
+                   ticktext=list(hlbl_col(range(24))),
+                   tickvals=list(range(24))),
+        yaxis_title="kWh promedio",
+        hovermode="x unified"
+    )
+    fig_h = aplyt(fig_h, 460)
+    return fig_h
@@ -0,0 +1,1921 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo de datos del tablero GEDICOL, sin Streamlit: lectores de Google
+Sheets / Excel, parsers, snapshot local, cubos de agregados y la tabla
+mensual Solar vs EPM. dos.py lo importa; también se usa por línea de
+comandos para armar reportes sin levantar el tablero:
+
+    python gedicol.py --fuente excel -o mensual.parquet
+    python gedicol.py --fuente sheets --anios 2025 2026 > mensual.csv
+"""
+import io, re, os, sys, json, time, zlib, hashlib, logging, argparse, tempfile, threading, contextvars
+from functools import lru_cache
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+# ======================
+# CONFIG
+# ======================
+SOLAR_SHEET_ID = "1ceFwwFm6D1QRW4slPj67BlSDR9woGFFaOMLoN1FxVvs"
+SOLAR_TAB_MES  = "POR MES"
+SOLAR_TAB_DIA  = "POR DIA"
+SOLAR_TAB_HORA = "POR HORA"
+
+EPM_SHEET_ID   = "1ANEtNlryqo_4wq1n6V5OlutpcDFMP_EdxxWXgjEhQ3c"
+EPM_GID_MES    = "2089036315"
+EPM_TAB        = "EPM"
+CSV_TROZO      = 1 << 16   # bytes por trozo al leer los CSV de Sheets en streaming
+CSV_COMPARAR   = 1 << 20   # sin ETag: cuerpos de hasta este tamaño se comparan enteros antes de parsear
+RESPUESTAS_MAX = 32        # URLs de Sheets con validadores y DataFrame recordados
+# raíz de las URLs de export / gviz; bench.py la apunta a un servidor local
+SHEETS_URL     = os.environ.get("GEDICOL_SHEETS_URL", "https://docs.google.com/spreadsheets/d")
+
+# registro de plantas: nombre canónico → alias (como vienen en las hojas),
+# color solar, color EPM y costo base por kWh. Una sede nueva se agrega aquí
+# o en el JSON de GEDICOL_PLANTAS (mismo formato); ver registrar_planta.
+PLANTAS = {
+    "CAFE":    {"alias": ["MONTESERENO CAFE", "MONTE SERENO CAFE"],
+                "color": "#3b82f6", "color_epm": "#1e40af", "costo": 1033},
+    "MERCADO": {"alias": ["MONTESERENO MERCADO", "MONTE SERENO MERCADO"],
+                "color": "#10b981", "color_epm": "#047857", "costo": 1077},
+}
+# plantas de los datos que no están en el registro: (color, color EPM) fijo por nombre y costo 0
+PALETA_PLANTAS = [("#f97316", "#c2410c"), ("#ec4899", "#be185d"), ("#14b8a6", "#0f766e"),
+                  ("#a855f7", "#7e22ce"), ("#eab308", "#a16207"), ("#64748b", "#334155")]
+
+# costos base por kWh (del registro; registrar_planta lo mantiene al día)
+COSTOS_EPM = {p: d["costo"] for p, d in PLANTAS.items()}
+
+ML = {1:"Ene",2:"Feb",3:"Mar",4:"Abr",5:"May",6:"Jun",7:"Jul",8:"Ago",9:"Sep",10:"Oct",11:"Nov",12:"Dic"}
+
+# ======================
+# MEDICIÓN
+# ======================
+# Cada etapa cronometrada se anota en el registro del contexto actual (una
+# corrida del tablero, una vuelta del refresco) y, si el logger
+# "gedicol.medicion" está activo, sale como una línea JSON.
+log_medicion = logging.getLogger("gedicol.medicion")
+_registro = contextvars.ContextVar("gedicol_registro", default=None)
+CONTADORES = {}   # por proceso: {nombre: {"llamadas": n, "fallos": n}}
+_contadores_lock = threading.Lock()
+
+def iniciar_registro(**contexto):
+    """Registro nuevo para este contexto; `contexto` (sesión, corrida...) acompaña cada línea del log."""
+    reg = {"contexto": contexto, "etapas": []}
+    _registro.set(reg)
+    return reg
+
+def anotar(etapa, **datos):
+    reg = _registro.get()
+    info = {"etapa": etapa, **datos}
+    if reg is not None:
+        reg["etapas"].append(info)
+    if log_medicion.isEnabledFor(logging.INFO):
+        linea = {"t": datetime.now().isoformat(timespec="milliseconds"), **(reg or {}).get("contexto", {}), **info}
+        log_medicion.info(json.dumps(linea, default=str, ensure_ascii=False))
+    return info
+
+@contextmanager
+def medir(etapa, **datos):
+    """Cronometra el bloque y lo anota; el bloque puede agregar filas, bytes, etc. al dict que recibe."""
+    info = dict(datos)
+    t0 = time.perf_counter()
+    try:
+        yield info
+    except Exception as e:
+        info["error"] = str(e)[:200]
+        raise
+    finally:
+        anotar(etapa, ms=round((time.perf_counter() - t0) * 1000, 2), **info)
+
+def contar(nombre, clave, n=1):
+    with _contadores_lock:
+        c = CONTADORES.setdefault(nombre, {})
+        c[clave] = c.get(clave, 0) + n
+
+def contadores():
+    """Copia de CONTADORES (se escriben desde varios hilos)."""
+    with _contadores_lock:
+        return {k: dict(v) for k, v in CONTADORES.items()}
+
+def memoria_proceso():
+    """Pico de memoria residente del proceso en MB (None donde no hay módulo resource)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+def activar_log(destino):
+    """Manda las mediciones como JSON por línea a un archivo ("-" = stderr). Sin destino no hace nada."""
+    if not destino or log_medicion.handlers:
+        return
+    h = logging.StreamHandler(sys.stderr) if destino == "-" else logging.FileHandler(destino, encoding="utf-8")
+    h.setFormatter(logging.Formatter("%(message)s"))
+    log_medicion.addHandler(h)
+    log_medicion.setLevel(logging.INFO)
+    log_medicion.propagate = False
+
+# ======================
+# PARSEO
+# ======================
+def sf(x):
+    try:
+        v = float(x)
+        return 0.0 if np.isnan(v) or np.isinf(v) else v
+    except:
+        return 0.0
+
+
+def tis(val):
+    try:
+        if pd.isna(val): return 0
+        if isinstance(val, (int, np.integer)): return int(val)
+        if isinstance(val, (float, np.floating)):
+            if np.isnan(val) or np.isinf(val): return 0
+            return int(val)
+        s = str(val).strip()
+        if s == "": return 0
+        return int(float(s))
+    except:
+        return 0
+
+def parse_h(x):
+    if pd.isna(x): return np.nan
+    m = re.match(r"(\d+)", str(x).strip())
+    return int(m.group(1)) if m else np.nan
+
+MES_PREFIJOS = {"ene":1,"feb":2,"mar":3,"abr":4,"may":5,"jun":6,"jul":7,"ago":8,"sep":9,"oct":10,"nov":11,"dic":12}
+
+def parse_mes_any(x):
+    if pd.isna(x): return 0
+    if isinstance(x, (int, np.integer)):
+        m = int(x)
+        return m if 1 <= m <= 12 else 0
+    if isinstance(x, (float, np.floating)):
+        if np.isnan(x) or np.isinf(x): return 0
+        m = int(x)
+        return m if 1 <= m <= 12 else 0
+    s = str(x).strip().lower()
+    if s[:3] in MES_PREFIJOS: return MES_PREFIJOS[s[:3]]
+    m = re.match(r"^\s*(\d{1,2})(?:\.0+)?\s*$", s)
+    if m:
+        mm = int(m.group(1))
+        return mm if 1 <= mm <= 12 else 0
+    return 0
+
+def _int_col(s, lo=None, hi=None):
+    """Columna numérica → int64 truncado; NaN/inf (y fuera de [lo, hi]) → 0."""
+    v = s.to_numpy(dtype="float64", na_value=np.nan, copy=True)
+    ok = np.isfinite(v)
+    out = np.zeros(len(v), dtype="int64")
+    out[ok] = np.trunc(v[ok]).astype("int64")
+    if lo is not None:
+        out[(out < lo) | (out > hi)] = 0
+    return pd.Series(out, index=s.index)
+
+def _por_unicos(s, fn, dtype="int64"):
+    """Aplica fn a cada valor distinto de s (no a cada fila) y reexpande."""
+    codes, uniq = pd.factorize(s.astype(object))
+    vals = np.array([fn(v) for v in uniq] + [fn(np.nan)], dtype=dtype)
+    return pd.Series(vals[codes], index=s.index)
+
+def parse_mes_col(col):
+    """parse_mes_any para una columna completa: prefijos por tabla y números por máscara."""
+    s = pd.Series(col)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return _int_col(s, 1, 12)
+    codes, uniq = pd.factorize(s.astype(object))
+    u = pd.Series(uniq, dtype=object)
+    vals = np.zeros(len(u) + 1, dtype="int64")   # último = NaN (code -1)
+    es_txt = u.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    if (~es_txt).any():
+        vals[:-1][~es_txt] = [parse_mes_any(v) for v in u[~es_txt]]
+    if es_txt.any():
+        t = u[es_txt].astype(str).str.strip().str.lower()
+        pref = t.str[:3].map(MES_PREFIJOS)
+        num = pd.to_numeric(t.str.extract(r"^\s*(\d{1,2})(?:\.0+)?\s*$", expand=False), errors="coerce")
+        num = num.where(num.between(1, 12))
+        vals[:-1][es_txt] = pref.fillna(num).fillna(0).to_numpy(dtype="int64")
+    return pd.Series(vals[codes], index=s.index)
+
+def tis_col(col):
+    """tis para una columna completa (los textos se convierten una vez por valor distinto)."""
+    s = pd.Series(col)
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return _int_col(s)
+    return _por_unicos(s, tis)
+
+def to_num_auto(v):
+    """
+    Convierte cualquier representación de número a float.
+    Detecta correctamente separadores de miles vs decimales:
+      "5,444"   → 5444   (coma = miles, Google Sheets format)
+      "5.6"     → 5.6    (punto = decimal)
+      "1,234.56"→ 1234.56 (anglosajón)
+      "1.234,56"→ 1234.56 (europeo)
+      "1,234,567"→ 1234567 (múltiples comas = miles)
+    """
+    try:
+        if v is None: return 0.0
+        if isinstance(v, (int, np.integer)): return float(v)
+        if isinstance(v, (float, np.floating)):
+            return 0.0 if (np.isnan(v) or np.isinf(v)) else float(v)
+        s = str(v).strip()
+        if s == "" or s.lower() in ["nan", "none", "null", "-"]: return 0.0
+        # Quitar símbolos de moneda y espacios
+        s = s.replace(" ", "").replace("$", "").replace("€", "").replace("£", "")
+        has_comma = "," in s
+        has_dot   = "." in s
+        if has_comma and has_dot:
+            # El último separador es el decimal
+            if s.rfind(",") > s.rfind("."):
+                s = s.replace(".", "").replace(",", ".")   # "1.234,56" → "1234.56"
+            else:
+                s = s.replace(",", "")                      # "1,234.56" → "1234.56"
+        elif has_comma and not has_dot:
+            parts = s.split(",")
+            # N,NNN  → exactamente 3 dígitos tras la coma = separador de miles
+            if len(parts) == 2 and re.fullmatch(r"\d{1,3}", parts[0]) and re.fullmatch(r"\d{3}", parts[1]):
+                s = s.replace(",", "")   # "5,444" → "5444"
+            elif len(parts) > 2:
+                s = s.replace(",", "")   # "1,234,567" → "1234567"
+            else:
+                s = s.replace(",", ".")  # "5,6" → "5.6" decimal europeo
+        # Solo punto: lo dejamos como está (decimal estándar)
+        s = re.sub(r"[^0-9\.\-]", "", s)
+        if s in ["", "-", ".", "-."]: return 0.0
+        return float(s)
+    except:
+        return 0.0
+
+def to_num_col(col):
+    """
+    Versión vectorizada de to_num_auto para una columna completa.
+    Mismas reglas de miles vs decimales ("5,444", "1.234,56", "1,234,567",
+    "5,6"), pero con métodos .str de pandas y máscaras NumPy sobre los
+    valores únicos de la columna en vez de un apply celda por celda.
+    """
+    s = pd.Series(col)
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        out = s.to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        out[~np.isfinite(out)] = 0.0
+        return pd.Series(out, index=s.index)
+
+    # Las pestañas repiten muchísimo los mismos textos: se parsea cada valor una vez
+    codes, uniq = pd.factorize(s.astype(object))
+    u = pd.Series(uniq, dtype=object)
+    vals = np.zeros(len(u), dtype="float64")
+
+    # Celdas ya numéricas (int/float de read_excel)
+    is_str = u.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    if not is_str.all():
+        nums = pd.to_numeric(u[~is_str], errors="coerce").to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        nums[~np.isfinite(nums)] = 0.0
+        vals[~is_str] = nums
+
+    if is_str.any():
+        t = u[is_str].astype(str).str.strip()
+        vacio = (t == "") | t.str.lower().isin(["nan", "none", "null", "-"])
+        t = t.str.replace(r"[ $€£]", "", regex=True)
+
+        has_comma = t.str.contains(",", regex=False)
+        has_dot   = t.str.contains(".", regex=False)
+        both      = has_comma & has_dot
+        # El último separador es el decimal: alguna coma sin punto después
+        europeo   = both & t.str.contains(r",[^.]*$", regex=True)
+        solo_coma = has_comma & ~has_dot
+        # N,NNN → miles; N,NNN,NNN → miles; cualquier otra coma sola → decimal
+        miles     = solo_coma & (
+            t.str.fullmatch(r"\d{1,3},\d{3}").fillna(False).astype(bool) |
+            (t.str.count(",") > 1)
+        )
+
+        t = t.mask(europeo, t.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        t = t.mask((both & ~europeo) | miles, t.str.replace(",", "", regex=False))
+        t = t.mask(solo_coma & ~miles, t.str.replace(",", ".", regex=False))
+
+        t = t.str.replace(r"[^0-9\.\-]", "", regex=True)
+        invalido = vacio | t.isin(["", "-", ".", "-."])
+        parsed = pd.to_numeric(t.mask(invalido, "0"), errors="coerce").to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        parsed[np.isnan(parsed)] = 0.0
+        vals[is_str] = parsed
+
+    out = np.where(codes >= 0, vals[np.maximum(codes, 0)] if len(vals) else 0.0, 0.0)
+    return pd.Series(out, index=s.index)
+
+def _clave_planta(p):
+    s = str(p or "").strip().upper()
+    s = s.replace("Á","A").replace("É","E").replace("Í","I").replace("Ó","O").replace("Ú","U")
+    return re.sub(r"\s+", " ", s)
+
+def norm_planta(p):
+    """
+    Nombre canónico según el registro: alias exacto, si no la primera planta
+    registrada contenida en el nombre; si no, el nombre limpio (o TOTAL).
+    """
+    s = _clave_planta(p)
+    alias = alias_plantas()
+    if s in alias:
+        return alias[s]
+    for nombre in PLANTAS:
+        if nombre in s: return nombre
+    return s if s else "TOTAL"
+
+def norm_planta_col(col):
+    """norm_planta una vez por nombre distinto de la columna."""
+    return _por_unicos(pd.Series(col).astype(str), norm_planta, dtype=object)
+
+
+def nombre_col(c):
+    """Nombre de columna normalizado como lo dejan los parsers (minúsculas, sin tildes)."""
+    return (str(c).strip().lower()
+            .replace("á","a").replace("é","e").replace("í","i").replace("ó","o").replace("ú","u"))
+
+def cc(df):
+    df.columns = [nombre_col(c) for c in df.columns]
+    return df
+
+# ======================
+# FORMATO
+# ======================
+def fn(x, d=0):
+    s = f"{sf(x):,.{d}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return s.split(",")[0] if d == 0 else s
+
+def fc(x, decimals=0):
+    """Formato moneda COP con decimales opcionales"""
+    if decimals > 0:
+        s = f"{sf(x):,.{decimals}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return f"${s}"
+    return f"${sf(x):,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def mlbl(y, m):
+    return f"{ML.get(int(m), str(m))} {int(y)}"
+
+def dlbl(dt):
+    return f"{dt.day} {ML.get(dt.month, str(dt.month))} {dt.year}"
+
+
+# mismas salidas que fn / fc / mlbl / dlbl, pero sobre arreglos completos
+ML_ARR = np.array([""] + [ML[i] for i in range(1, 13)])
+
+def _txt(a):
+    return np.asarray(a).astype(str)
+
+def _redondeo(v, d):
+    """v·10^d redondeado como f"{x:.{d}f}"; los empates exactos tras escalar se resuelven en Python."""
+    esc = v * 10.0 ** d
+    r = np.round(esc)
+    emp = np.flatnonzero(np.abs(esc - np.trunc(esc)) == 0.5)
+    if len(emp):
+        r[emp] = [round(float(f"{x:.{d}f}") * 10 ** d) for x in v[emp]]
+    return r.astype("int64")
+
+def _miles(ent):
+    """Enteros ≥ 0 → texto con punto de miles."""
+    q = ent // 1000
+    out = np.where(q > 0, np.char.zfill(_txt(ent % 1000), 3), _txt(ent % 1000))
+    while (q > 0).any():
+        g, q2 = q % 1000, q // 1000
+        pieza = np.where(q2 > 0, np.char.zfill(_txt(g), 3), _txt(g))
+        out = np.where(q > 0, np.char.add(np.char.add(pieza, "."), out), out)
+        q = q2
+    return out
+
+def fn_col(x, d=0):
+    """fn(x, d) para un arreglo: miles con punto, decimales con coma, NaN/inf → 0."""
+    v = np.asarray(x, dtype="float64")
+    if len(v) == 0:
+        return np.array([], dtype=str)
+    v = np.where(np.isfinite(v), v, 0.0)
+    # |x|·10^d que no entra en int64: esos (pocos) van por fn
+    grande = np.abs(v) * 10.0 ** d >= 2.0 ** 63
+    r = _redondeo(np.abs(np.where(grande, 0.0, v)), d)
+    out = _miles(r // 10 ** d)
+    if d > 0:
+        out = np.char.add(np.char.add(out, ","), np.char.zfill(_txt(r % 10 ** d), d))
+    out = np.where(np.signbit(v), np.char.add("-", out), out)
+    if grande.any():
+        largos = np.array([fn(x, d) for x in v[grande]])
+        out = out.astype(np.result_type(out.dtype, largos.dtype))
+        out[grande] = largos
+    return out
+
+def fc_col(x, decimals=0):
+    return np.char.add("$", fn_col(x, decimals))
+
+def etiquetas(x, d=0, umbral=0, moneda=False):
+    """Texto de barras: el valor formateado si supera el umbral, si no ""."""
+    v = np.asarray(x, dtype="float64")
+    if len(v) == 0:
+        return np.array([], dtype=str)
+    txt = fc_col(v, d) if moneda else fn_col(v, d)
+    return np.where(v > umbral, txt, "")
+
+def mlbl_col(anios, meses):
+    m = np.asarray(meses, dtype="int64")
+    ok = (m >= 1) & (m <= 12)
+    nom = np.where(ok, ML_ARR[np.where(ok, m, 0)], _txt(m))
+    return np.char.add(np.char.add(nom, " "), _txt(np.asarray(anios, dtype="int64")))
+
+def dlbl_col(fechas):
+    f = pd.DatetimeIndex(fechas)
+    return np.char.add(np.char.add(np.char.add(_txt(f.day), " "), ML_ARR[f.month]),
+                       np.char.add(" ", _txt(f.year)))
+
+def hlbl_col(horas):
+    h = np.asarray(horas, dtype="int64")
+    if len(h) == 0:
+        return np.array([], dtype=str)
+    return np.char.add(np.char.zfill(_txt(h), 2), ":00")
+
+# ======================
+# PLANTAS
+# ======================
+@lru_cache(maxsize=1)
+def alias_plantas():
+    """{alias normalizado: nombre canónico} del registro."""
+    return {_clave_planta(a): nombre for nombre, d in PLANTAS.items() for a in [nombre, *d.get("alias", [])]}
+
+def registrar_planta(nombre, alias=(), color=None, color_epm=None, costo=0):
+    """
+    Agrega (o actualiza) una planta del registro. Hay que hacerlo antes de
+    leer los datos: lo ya normalizado (snapshot, cubos) no se re-etiqueta.
+    """
+    nombre = _clave_planta(nombre)
+    d = PLANTAS.setdefault(nombre, {"alias": []})
+    d["alias"] = sorted(set(d["alias"]) | {_clave_planta(a) for a in alias})
+    base = info_planta(nombre)
+    if color and not color_epm:   # EPM: el mismo tono, 30% más oscuro
+        color_epm = "#" + "".join(f"{int(int(color[i:i + 2], 16) * .7):02x}" for i in (1, 3, 5))
+    d["color"], d["color_epm"] = color or base["color"], color_epm or base["color_epm"]
+    d["costo"] = costo or d.get("costo", 0)
+    COSTOS_EPM[nombre] = d["costo"]
+    alias_plantas.cache_clear()
+    return d
+
+def cargar_plantas(path):
+    """Registra las plantas de un JSON {nombre: {alias, color, color_epm, costo}}."""
+    with open(path, encoding="utf-8") as f:
+        for nombre, d in json.load(f).items():
+            registrar_planta(nombre, **d)
+
+def info_planta(nombre):
+    """Entrada del registro; una planta no registrada toma colores de PALETA_PLANTAS y costo 0."""
+    d = PLANTAS.get(nombre)
+    if d and d.get("color"):
+        return d
+    color, color_epm = PALETA_PLANTAS[zlib.crc32(str(nombre).encode("utf-8")) % len(PALETA_PLANTAS)]
+    return {"alias": [], "color": color, "color_epm": color_epm, "costo": (d or {}).get("costo", 0)}
+
+def plantas_orden(*grupos):
+    """
+    Plantas de uno o varios iterables, sin repetir ni TOTAL (el agregado que
+    viene sin planta): primero las registradas en el orden del registro,
+    luego las demás alfabéticamente.
+    """
+    vistas = {str(p) for g in grupos for p in g} - {"", "TOTAL"}
+    return [p for p in PLANTAS if p in vistas] + sorted(vistas - set(PLANTAS))
+
+if os.environ.get("GEDICOL_PLANTAS"):
+    cargar_plantas(os.environ["GEDICOL_PLANTAS"])
+
+# ======================
+# EPM PARSER
+# ======================
+# nombres aceptados para la columna de kWh del EPM; se usa la primera que aparezca
+COLS_KWH = {"energia_kwh","energía_kwh","energia kwh","energía kwh","epm_kwh","consumo_kwh","kwh","consumo",
+            "energia (kwh)","energía (kwh)","epm (kwh)","valor","energia","energía"}
+
+def parse_epm_df(raw_df):
+    ep = cc(raw_df.copy())
+    cx, ph = {}, {}
+    debug_msgs = []
+
+    for old in ["año", "ano"]:
+        if old in ep.columns and "anio" not in ep.columns:
+            ep = ep.rename(columns={old: "anio"})
+
+    if "planta" not in ep.columns and "sede" in ep.columns:
+        ep = ep.rename(columns={"sede": "planta"})
+    if "planta" in ep.columns:
+        ep["planta"] = norm_planta_col(ep["planta"])
+    else:
+        ep["planta"] = "TOTAL"
+
+    kwh_col = None
+    for c in ep.columns:
+        if str(c).strip().lower() in COLS_KWH:
+            kwh_col = c; break
+
+    if kwh_col:
+        ep["epm_kwh"] = to_num_col(ep[kwh_col])
+        debug_msgs.append(f"kwh_col='{kwh_col}'")
+    else:
+        ep["epm_kwh"] = 0.0
+        debug_msgs.append("⚠ No se encontró columna kWh")
+
+    if "mes" in ep.columns:
+        # Filas especiales (costo / promedio histórico) por máscara sobre "mes"
+        mes_raw = ep["mes"].astype(object).astype(str).str.strip().str.lower()
+        planta  = ep["planta"].astype(object).astype(str).str.strip().str.upper()
+        valor   = ep["epm_kwh"].to_numpy(dtype="float64")
+        es_costo = mes_raw.str.contains("costo", regex=False).to_numpy(dtype=bool)
+        es_prom  = (mes_raw.str.contains("promedio", regex=False) | mes_raw.str.startswith("prom")).to_numpy(dtype=bool) & ~es_costo
+        # Sólo plantas del registro: un nombre suelto ("TOTAL", "N/A", una nota) no fija costo
+        registrada = planta.isin(list(PLANTAS)).to_numpy(dtype=bool)
+        for pl in planta[~registrada & (es_costo | es_prom) & (valor > 0)].unique():
+            debug_msgs.append(f"⚠ Planta no registrada ignorada: {pl}")
+        valido   = registrada & (valor > 0)
+        for i in np.flatnonzero(valido & (es_costo | es_prom)):
+            pl, v = planta.iat[i], float(valor[i])
+            if es_costo[i]:
+                cx[pl] = v
+                debug_msgs.append(f"Costo {pl}={v}")
+            else:
+                ph[pl] = v
+                debug_msgs.append(f"Promedio {pl}={v}")
+        ep["mes"] = parse_mes_col(ep["mes"])
+    else:
+        ep["mes"] = 0
+
+    if "anio" in ep.columns:
+        ep["anio"] = tis_col(ep["anio"])
+    else:
+        ep["anio"] = 0
+
+    ep = ep[ep["mes"].between(1, 12)].copy()
+    ep = ep[ep["anio"] > 0].copy()
+    debug_msgs.append(f"rows={len(ep)} | total={sf(ep['epm_kwh'].sum()):.0f} kWh")
+    return ep, cx, ph, " | ".join(debug_msgs)
+
+# ======================
+# GOOGLE SHEETS
+# ======================
+@lru_cache(maxsize=None)
+def http_session():
+    """Sesión compartida con keep-alive para todas las descargas de Sheets."""
+    sess = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    sess.mount("https://", adapter)
+    return sess
+
+def validador(r, sha=None):
+    """ETag / Last-Modified de la respuesta, o hash del contenido si Google no envía ninguno."""
+    tag = r.headers.get("ETag") or r.headers.get("Last-Modified")
+    return tag or (sha or hashlib.sha1(r.content)).hexdigest()
+
+class FlujoCSV(io.RawIOBase):
+    """Archivo de sólo lectura sobre los trozos de una respuesta en streaming; calcula el sha1 al paso."""
+    def __init__(self, primero, resto):
+        self._resto, self.sha = resto, hashlib.sha1(primero)
+        self._buf, self._pos = memoryview(primero), 0
+        self.leidos = len(primero)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._pos >= len(self._buf):
+            trozo = next(self._resto, None)
+            if trozo is None:
+                return 0
+            self.sha.update(trozo)
+            self._buf, self._pos = memoryview(trozo), 0
+            self.leidos += len(trozo)
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+def leer_csv(r, aviso_login, previo=None):
+    """
+    pd.read_csv directo sobre el cuerpo de una respuesta pedida con
+    stream=True: el parser consume los trozos a medida que llegan, sin
+    armar r.text ni copiarlo a un StringIO. Para detectar el HTML de login
+    sólo se miran los primeros 2500 bytes.
+    Con `previo` (lo recordado para la misma URL) se devuelve el DataFrame
+    anterior si el contenido no cambió. Con ETag / Last-Modified iguales
+    ni se lee el cuerpo. Si Google no manda ninguno (lo normal en gviz) se
+    juntan hasta CSV_COMPARAR bytes: un cuerpo que cabe entero se compara
+    por sha1 sin parsearlo (POR MES, EPM, las consultas de la ingesta
+    incremental). Uno más grande sigue en streaming, el sha1 se calcula
+    mientras se parsea y el resultado se descarta si coincide.
+    """
+    sin_tag = not (r.headers.get("ETag") or r.headers.get("Last-Modified"))
+    if previo is not None and not sin_tag and validador(r) == previo["validador"]:
+        return previo["df"]
+    comparar = previo is not None and sin_tag
+    trozos = r.iter_content(chunk_size=CSV_TROZO)
+    partes, n, completo = [], 0, True
+    for trozo in trozos:
+        partes.append(trozo)
+        n += len(trozo)
+        if n >= (CSV_COMPARAR if comparar else 2500):
+            completo = False
+            break
+    primero = b"".join(partes)
+    head = primero[:2500].decode("utf-8", "ignore").lower()
+    if "<!doctype html" in head or "accounts.google.com" in head or "servicelogin" in head:
+        raise RuntimeError(aviso_login)
+    if comparar and completo and hashlib.sha1(primero).hexdigest() == previo["validador"]:
+        return previo["df"]
+    flujo = FlujoCSV(primero, trozos)
+    with medir("parse_csv") as info:
+        df = pd.read_csv(io.BufferedReader(flujo, CSV_TROZO), encoding=r.encoding or "utf-8")
+        info.update(filas=len(df), bytes=flujo.leidos)
+    df.attrs["validador"] = validador(r, flujo.sha)
+    if previo is not None and df.attrs["validador"] == previo["validador"]:
+        return previo["df"]
+    return df
+
+@lru_cache(maxsize=None)
+def respuestas_previas():
+    """Por URL: validadores de la última respuesta 200 y el DataFrame parseado de ella."""
+    return {"lock": threading.Lock(), "urls": {}}
+
+def get_csv(url, error, aviso_login, session=None, recordar=True):
+    """
+    GET condicional de un CSV de Sheets. Si la URL ya se leyó, manda
+    If-None-Match / If-Modified-Since; un 304 (o un cuerpo igual, ver
+    leer_csv) devuelve el mismo DataFrame de la vez anterior, así que
+    tampoco se rehace lo que se guía por attrs["validador"] (procesar,
+    snapshot y cubos). Sin ETag ni Last-Modified el cuerpo se descarga
+    siempre; sólo los de más de CSV_COMPARAR bytes se parsean aunque no
+    hayan cambiado. Con recordar=False no se guarda nada (descargas
+    grandes de un solo uso).
+    """
+    previas = respuestas_previas()
+    previo = previas["urls"].get(url)
+    headers = {}
+    if previo and previo["etag"]:
+        headers["If-None-Match"] = previo["etag"]
+    if previo and previo["lm"]:
+        headers["If-Modified-Since"] = previo["lm"]
+    with medir("http", fuente=error) as info, \
+            (session or requests).get(url, timeout=30, stream=True, headers=headers) as r:
+        info["status"] = r.status_code
+        if r.status_code == 304 and previo:
+            return previo["df"]
+        if r.status_code != 200:
+            raise RuntimeError(f"{error} status={r.status_code}")
+        df = leer_csv(r, aviso_login, previo)
+        info["sin_cambios"] = previo is not None and df is previo["df"]
+        etag, lm = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if recordar:
+        with previas["lock"]:
+            previas["urls"].pop(url, None)
+            previas["urls"][url] = {"etag": etag, "lm": lm, "validador": df.attrs["validador"], "df": df}
+            while len(previas["urls"]) > RESPUESTAS_MAX:
+                previas["urls"].pop(next(iter(previas["urls"])))
+    return df
+
+def read_gid_csv(sid, gid, session=None):
+    url = f"{SHEETS_URL}/{sid}/export?format=csv&gid={gid}"
+    return get_csv(url, f"Sheet gid={gid}", "Google devolvió HTML de login. El Sheet de EPM NO está público.",
+                   session=session)
+
+def read_tab_csv(sid, tab, session=None, tq=None, recordar=True):
+    url = (
+        f"{SHEETS_URL}/{sid}"
+        f"/gviz/tq?tqx=out:csv&sheet={requests.utils.quote(tab)}"
+    )
+    if tq:
+        url += f"&tq={requests.utils.quote(tq)}"
+    return get_csv(url, f"Sheet tab='{tab}'", f"Google devolvió HTML de login. La pestaña '{tab}' NO está pública.",
+                   session=session, recordar=recordar)
+
+def fetch_sheets(jobs):
+    """
+    Descarga en paralelo {nombre: (lector, args)} sobre la sesión compartida.
+    Devuelve (dfs, errs, secs): DataFrame, mensaje de error y segundos por pestaña.
+    """
+    sess = http_session()
+
+    def run(reader, args):
+        t0 = time.perf_counter()
+        try:
+            return reader(*args, session=sess), None, time.perf_counter() - t0
+        except Exception as e:
+            return None, str(e), time.perf_counter() - t0
+
+    # cada hilo corre en una copia del contexto: sus mediciones caen en el registro de quien llama
+    with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as ex:
+        futs = {k: ex.submit(contextvars.copy_context().run, run, reader, args) for k, (reader, args) in jobs.items()}
+    dfs, errs, secs = {}, {}, {}
+    for k, fut in futs.items():
+        df, err, dt = fut.result()
+        dfs[k], secs[k] = df, dt
+        if err is not None:
+            errs[k] = err
+        anotar("descarga", tab=k, ms=round(dt * 1000, 2), filas=None if df is None else len(df), error=err)
+    return dfs, errs, secs
+
+def descargar_sheets():
+    """
+    Las 3 pestañas solares + el gid de EPM en una sola ronda concurrente.
+    POR DIA y POR HORA llegan ya parseadas (ingesta incremental); POR MES y
+    EPM llegan crudas. Los DataFrames devueltos son compartidos: copiar antes
+    de modificar.
+    """
+    dfs, errs, secs = fetch_sheets({
+        SOLAR_TAB_MES:  (read_tab_csv, (SOLAR_SHEET_ID, SOLAR_TAB_MES)),
+        SOLAR_TAB_DIA:  (leer_tab_incremental, (SOLAR_SHEET_ID, SOLAR_TAB_DIA, parse_dia)),
+        SOLAR_TAB_HORA: (leer_tab_incremental, (SOLAR_SHEET_ID, SOLAR_TAB_HORA, parse_hora)),
+        EPM_TAB:        (read_gid_csv, (EPM_SHEET_ID, EPM_GID_MES)),
+    })
+    # sin alguna pestaña solar no hay datos que servir; EPM puede faltar
+    for tab in (SOLAR_TAB_MES, SOLAR_TAB_DIA, SOLAR_TAB_HORA):
+        if tab in errs:
+            raise RuntimeError(errs[tab])
+    return dfs, errs, secs
+
+# ======================
+# INGESTA INCREMENTAL (POR DIA / POR HORA)
+# ======================
+@lru_cache(maxsize=None)
+def ingesta_estado():
+    """Por pestaña: frame ya parseado, encabezado crudo y modo de la última ingesta."""
+    return {}
+
+def _col_letra(i):
+    """Índice de columna (0 = A) → letra para el lenguaje de consulta de gviz."""
+    s, i = "", i + 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+def _huella(df):
+    """Checksum por mes de lo ingerido: suma y conteo de energia_kwh por (año, mes)."""
+    d = df.dropna(subset=["fecha"])
+    g = d.groupby([d["fecha"].dt.year.rename("anio"), d["fecha"].dt.month.rename("mes")])["energia_kwh"]
+    return g.agg(["sum", "count"])
+
+def _anexar_nuevas(sid, tab, parser, est, session):
+    """
+    Trae sólo las filas con fecha >= la última fecha ya ingerida (la mínima
+    entre plantas, para re-leer el día en curso) y las anexa. Antes compara
+    la huella mensual de lo anterior al corte; si no cuadra, lanza
+    RuntimeError para forzar la recarga completa.
+    """
+    df, cols = est["df"], est["cols"]
+    nombres = [str(c).strip().lower() for c in cols]
+    A, D = _col_letra(nombres.index("fecha")), _col_letra(nombres.index("energia_kwh"))
+
+    ultima = df.dropna(subset=["fecha"]).groupby("planta")["fecha"].max()
+    if ultima.empty:
+        raise RuntimeError("sin fechas previas")
+    corte = ultima.min().normalize()
+    lit = corte.strftime("%Y-%m-%d")
+
+    rem = read_tab_csv(sid, tab, session=session, tq=(
+        f"select year({A}), month({A}), sum({D}), count({A}) "
+        f"where {A} < date '{lit}' group by year({A}), month({A})"
+    ))
+    loc = _huella(df[df["fecha"] < corte])
+    if len(rem.columns) != 4 or len(rem) != len(loc):
+        raise RuntimeError("huella mensual distinta")
+    r_anio, r_mes = tis_col(to_num_col(rem.iloc[:, 0])), tis_col(to_num_col(rem.iloc[:, 1])) + 1  # month() es 0-based
+    r = pd.DataFrame({"sum": to_num_col(rem.iloc[:, 2]).to_numpy(), "count": to_num_col(rem.iloc[:, 3]).to_numpy()},
+                     index=pd.MultiIndex.from_arrays([r_anio, r_mes], names=["anio", "mes"])).sort_index()
+    if not r.index.equals(loc.index) or not np.array_equal(r["count"].to_numpy(), loc["count"].to_numpy()) \
+            or not np.allclose(r["sum"].to_numpy(), loc["sum"].to_numpy(), rtol=1e-6, atol=0.01):
+        raise RuntimeError("huella mensual distinta")
+
+    raw = read_tab_csv(sid, tab, session=session, tq=f"select * where {A} >= date '{lit}'")
+    if [str(c).strip().lower() for c in raw.columns] != nombres:
+        raise RuntimeError("encabezado distinto")
+    if raw.attrs.get("validador") == est.get("val_nuevas"):
+        est["modo"] = "sin cambios"
+        return df
+    with medir("parse", tab=tab, filas=len(raw)):
+        nuevas = parser(raw)
+    out = pd.concat([df[~(df["fecha"] >= corte)], nuevas], ignore_index=True)
+    out.attrs["validador"] = hashlib.sha1(f"{df.attrs.get('validador')}|{raw.attrs.get('validador')}".encode()).hexdigest()
+    est["val_nuevas"] = raw.attrs.get("validador")
+    est["modo"] = f"+{len(nuevas)} filas desde {corte.strftime('%d/%m/%Y')}"
+    return out
+
+def leer_tab_incremental(sid, tab, parser, session=None):
+    """
+    Lector de pestañas que sólo crecen. La primera vez (o tras un cambio en
+    filas pasadas, o si la consulta incremental falla) descarga y parsea todo;
+    el motivo de la recarga queda en est["modo"] para el panel de depuración.
+    """
+    est = ingesta_estado().setdefault(tab, {"lock": threading.Lock(), "df": None, "cols": None, "modo": None})
+    with est["lock"]:
+        modo = "completa"
+        if est["df"] is not None:
+            try:
+                est["df"] = _anexar_nuevas(sid, tab, parser, est, session)
+                return est["df"]
+            except (RuntimeError, ValueError, KeyError, requests.RequestException) as e:
+                # huella distinta, HTTP/login, columna faltante o CSV que gviz no pudo armar
+                modo = f"completa (incremental falló: {e})"
+                anotar("ingesta_incremental", tab=tab, error=str(e))
+        raw = read_tab_csv(sid, tab, session=session, recordar=False)
+        with medir("parse", tab=tab, filas=len(raw)):
+            est["df"], est["cols"], est["modo"] = parser(raw), list(raw.columns), modo
+        est["df"].attrs["validador"], est["val_nuevas"] = raw.attrs.get("validador"), None
+        return est["df"]
+
+# ======================
+# SNAPSHOT LOCAL
+# ======================
+SNAPSHOT_DIR = os.environ.get("GEDICOL_SNAPSHOT_DIR", ".snapshot")
+SNAP_COLS = {
+    "mes":  ["anio","mes","planta","energia_kwh"],
+    "dia":  ["fecha","planta","energia_kwh"],
+    "hora": ["fecha","hora_num","planta","energia_kwh"],
+    "epm":  ["anio","mes","planta","epm_kwh"],
+}
+# esquema compacto: el mismo en memoria (POR MES / DIA / HORA) y en disco
+TIPOS_COMPACTOS = {"planta": "category", "anio": "int16", "mes": "int8", "hora_num": "int8",
+                   "energia_kwh": "float32", "epm_kwh": "float32"}
+# EPM se sigue usando con sus tipos de siempre (es chico y lleva filas TOTAL)
+SNAP_TIPOS_APP = {"planta": object, "anio": "int64", "mes": "int64", "epm_kwh": "float64"}
+
+# los kWh de las hojas traen a lo sumo 3 decimales: al volver a float64 se
+# redondea ahí para que el float32 no asome (76,59999847 en vez de 76,6)
+DEC_KWH = 3
+
+def kwh64(col):
+    return np.round(pd.Series(col).to_numpy(dtype="float64", na_value=np.nan), DEC_KWH)
+
+def memoria(df):
+    """Bytes en memoria del frame, contando el contenido de las columnas object."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+def compactar(df, nombre):
+    """
+    Deja sólo las columnas de SNAP_COLS[nombre] con los tipos de
+    TIPOS_COMPACTOS: planta categórica, año/mes/hora en enteros chicos y kWh
+    en float32. Descarta filas sin fecha u hora (o con hora fuera de 0-23) y
+    lleva a 0 los enteros que no caben en su tipo, como tis con lo inválido.
+    En attrs["memoria"] quedan los bytes antes y después.
+    """
+    cols = [c for c in SNAP_COLS[nombre] if c in df.columns]
+    out = df[cols].dropna(subset=[c for c in ("fecha", "hora_num") if c in cols])
+    if "hora_num" in cols:
+        out = out[out["hora_num"].between(0, 23)]
+    for c in cols:
+        t = TIPOS_COMPACTOS.get(c)
+        if t in ("int8", "int16"):
+            v = out[c].to_numpy(dtype="float64", na_value=np.nan)
+            lim = np.iinfo(t)
+            out[c] = np.where(np.isfinite(v) & (v >= lim.min) & (v <= lim.max), v, 0).astype(t)
+        elif t is not None:
+            out[c] = out[c].astype(t)
+    if "fecha" in cols:
+        out["fecha"] = pd.to_datetime(out["fecha"])
+    out = out.reset_index(drop=True)
+    out.attrs = {k: v for k, v in df.attrs.items() if k != "bloques"}
+    out.attrs["memoria"] = {"antes": memoria(df), "despues": memoria(out)}
+    return out
+
+def guardar_snapshot(nombre, df, meta=None):
+    """
+    Guarda df en SNAPSHOT_DIR/<nombre>.parquet con columnas tipadas y un
+    <nombre>.json con fecha de guardado y metadatos. Escritura atómica
+    (tmp + os.replace); cualquier fallo se ignora y devuelve False.
+    """
+    try:
+        out = compactar(df, nombre)
+        out.attrs = {}
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        base = os.path.join(SNAPSHOT_DIR, nombre)
+        out.to_parquet(base + ".parquet.tmp", index=False)
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"guardado": datetime.now().isoformat(timespec="seconds"), "meta": meta or {}}, f)
+        os.replace(base + ".parquet.tmp", base + ".parquet")
+        os.replace(base + ".json.tmp", base + ".json")
+        return True
+    except Exception:
+        return False
+
+def leer_snapshot(nombre, mtime_ns):
+    """(df, info) del snapshot SNAPSHOT_DIR/<nombre>; mtime_ns entra en la versión."""
+    base = os.path.join(SNAPSHOT_DIR, nombre)
+    df = pd.read_parquet(base + ".parquet")
+    if nombre == "epm":
+        df = df.astype({c: t for c, t in SNAP_TIPOS_APP.items() if c in df.columns})
+    else:
+        df = compactar(df, nombre)
+    if nombre in ("dia", "hora"):
+        df = ordenar_indexar(df, horas=(nombre == "hora"))
+    df.attrs["version"] = f"snapshot:{nombre}:{mtime_ns}"
+    with open(base + ".json", encoding="utf-8") as f:
+        info = json.load(f)
+    return df, info
+
+# ======================
+# EXCEL / CSV
+# ======================
+# columnas (ya normalizadas con nombre_col) que leen los parsers; el resto no se convierte
+COLS_LECTURA = {
+    EPM_TAB:        {"anio", "año", "ano", "mes", "planta", "sede"} | COLS_KWH,
+    SOLAR_TAB_MES:  {"anio", "año", "ano", "mes", "planta", "energia_kwh"},
+    SOLAR_TAB_DIA:  {"fecha", "planta", "energia_kwh"},
+    SOLAR_TAB_HORA: {"fecha", "hora", "planta", "energia_kwh"},
+}
+
+def formato_tabla(fuente, nombre=""):
+    """
+    "xlsx", "xls" o "csv" según los primeros bytes (zip / OLE2) de la ruta
+    o de los bytes; la extensión de `nombre` (o de la ruta) sólo desempata
+    cuando no hay firma.
+    """
+    if isinstance(fuente, (bytes, bytearray)):
+        cabeza = bytes(fuente[:8])
+    else:
+        with open(fuente, "rb") as f:
+            cabeza = f.read(8)
+        nombre = nombre or str(fuente)
+    if cabeza.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if cabeza.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls"
+    ext = os.path.splitext(str(nombre).lower())[1].lstrip(".")
+    return ext if ext in ("xlsx", "xls") else "csv"
+
+@lru_cache(maxsize=None)
+def motor_excel(formato):
+    """calamine (Rust, xlsx y xls) si python-calamine está instalado; si no openpyxl / xlrd."""
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl" if formato == "xlsx" else "xlrd"
+
+def _xlsx_streaming(fuente, hojas, columnas):
+    """
+    openpyxl en modo sólo lectura: recorre cada hoja fila por fila y guarda
+    únicamente las columnas pedidas. Saltea las filas vacías como read_excel.
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(fuente, read_only=True, data_only=True, keep_links=False)
+    try:
+        out = {}
+        for hoja in hojas:
+            ws = wb[hoja] if hoja is not None else wb.worksheets[0]
+            filas = ws.iter_rows(values_only=True)
+            cab = list(next(filas, ()))
+            cols = columnas(hoja)
+            idx = [i for i, c in enumerate(cab) if c is not None and (cols is None or nombre_col(c) in cols)]
+            datos = [v for v in ([f[i] if i < len(f) else None for i in idx] for f in filas)
+                     if any(x is not None for x in v)]
+            out[hoja] = pd.DataFrame(datos, columns=[cab[i] for i in idx]).infer_objects()
+        return out
+    finally:
+        wb.close()
+
+def leer_tabla(fuente, hojas=None, columnas=None, nombre=""):
+    """
+    Excel o CSV (ruta o bytes) → DataFrame; con `hojas` (lista) un dict por
+    hoja. El formato sale de formato_tabla y el motor de motor_excel: CSV con
+    el lector nativo de pandas, xlsx/xls con calamine o, sin él, xlsx con
+    openpyxl en streaming. `columnas` (conjunto o {hoja: conjunto} de
+    nombres normalizados) limita lo que se lee.
+    """
+    formato = formato_tabla(fuente, nombre)
+    pedidas = list(hojas) if hojas is not None else [None]
+    def cols(hoja):
+        return columnas.get(hoja) if isinstance(columnas, dict) else columnas
+    def usecols(hoja):
+        c = cols(hoja)
+        return None if c is None else (lambda x: nombre_col(x) in c)
+    abrir = io.BytesIO(fuente) if isinstance(fuente, (bytes, bytearray)) else fuente
+
+    with medir("leer_tabla", formato=formato) as info:
+        if formato == "csv":
+            out = {pedidas[0]: pd.read_csv(abrir, usecols=usecols(pedidas[0]))}
+        else:
+            info["motor"] = motor = motor_excel(formato)
+            if motor == "openpyxl":
+                out = _xlsx_streaming(abrir, pedidas, cols)
+            else:
+                with pd.ExcelFile(abrir, engine=motor) as xf:
+                    out = {h: xf.parse(h if h is not None else 0, usecols=usecols(h)) for h in pedidas}
+        info["filas"] = sum(len(d) for d in out.values())
+    return out if hojas is not None else out[None]
+
+# ======================
+# EPM LOADER
+# ======================
+EPM_LOCAL_PATHS = [
+    r"/mnt/data/Reporte_Energia_EPM_Solar_Completo.xlsx",
+    r"Reporte_Energia_EPM_Solar_Completo.xlsx",
+]
+
+def buscar_epm_local():
+    """Primer Excel de EPM_LOCAL_PATHS que exista, o None."""
+    return next((p for p in EPM_LOCAL_PATHS if os.path.exists(p)), None)
+
+def leer_epm_crudo(fuente, nombre=""):
+    """Excel o CSV de EPM (ruta o bytes) con sólo las columnas que usa parse_epm_df."""
+    return leer_tabla(fuente, columnas=COLS_LECTURA[EPM_TAB], nombre=nombre)
+
+def leer_epm_excel(path):
+    """Excel (o CSV) de EPM → (ep, costos, promedios, info) de parse_epm_df."""
+    return parse_epm_df(leer_epm_crudo(path))
+
+# ======================
+# SOLAR LOADER
+# ======================
+def _renombrar_anio(d):
+    for old in ["año","ano"]:
+        if old in d.columns and "anio" not in d.columns:
+            d.rename(columns={old: "anio"}, inplace=True)
+    return d
+
+def parse_mes(raw):
+    ms = _renombrar_anio(cc(raw.copy()))
+    ms["planta"]      = norm_planta_col(ms["planta"])
+    ms["anio"]        = tis_col(ms["anio"])
+    ms["mes"]         = parse_mes_col(ms["mes"])
+    ms["energia_kwh"] = to_num_col(ms["energia_kwh"])
+    return ms
+
+def parse_dia(raw):
+    di = _renombrar_anio(cc(raw.copy()))
+    di["planta"]      = norm_planta_col(di["planta"])
+    di["energia_kwh"] = to_num_col(di["energia_kwh"])
+    di["fecha"]       = pd.to_datetime(di["fecha"], errors="coerce", dayfirst=True)
+    return di
+
+def parse_hora(raw):
+    hr = _renombrar_anio(cc(raw.copy()))
+    hr["planta"]      = norm_planta_col(hr["planta"])
+    hr["energia_kwh"] = to_num_col(hr["energia_kwh"])
+    hr["fecha"]       = pd.to_datetime(hr["fecha"], errors="coerce", dayfirst=True)
+    hr["hora_num"]    = hr["hora"].apply(parse_h)
+    return hr
+
+def ordenar_indexar(df, horas=False):
+    """
+    Quita filas sin fecha (u hora), ordena por (planta, fecha[, hora_num]) y
+    guarda en df.attrs["bloques"] el rango de filas de cada planta, para
+    resolver rangos con searchsorted en vez de máscaras sobre todo el frame.
+    """
+    claves = ["planta", "fecha"] + (["hora_num"] if horas else [])
+    out = df.dropna(subset=claves[1:]).sort_values(claves, kind="stable").reset_index(drop=True)
+    pl = out["planta"].to_numpy()
+    cortes = np.flatnonzero(pl[1:] != pl[:-1]) + 1 if len(pl) else np.zeros(0, dtype="int64")
+    inicios, fines = np.r_[0, cortes], np.r_[cortes, len(pl)]
+    out.attrs["bloques"] = {pl[a]: (int(a), int(b)) for a, b in zip(inicios, fines) if b > a}
+    return out
+
+def rango_fechas(df):
+    """(primera, última) fecha de un frame ordenado por ordenar_indexar, en O(plantas)."""
+    bloques = df.attrs.get("bloques") or {}
+    if not bloques:
+        return None, None
+    f = df["fecha"].to_numpy()
+    return min(f[a] for a, _ in bloques.values()), max(f[b - 1] for _, b in bloques.values())
+
+def filas_rango(df, plantas, fi, ff, h_min=None, h_max=None):
+    """
+    Filas de las plantas dadas con fecha en [fi, ff] (y hora en [h_min, h_max]).
+    La fecha se resuelve con searchsorted dentro del bloque de cada planta;
+    con una sola planta y sin filtro horario el resultado es un slice del frame.
+    """
+    bloques = df.attrs.get("bloques") or {}
+    f = df["fecha"].to_numpy()
+    lo = np.datetime64(pd.Timestamp(fi).normalize(), "ns")
+    hi = np.datetime64(pd.Timestamp(ff).normalize() + pd.Timedelta(days=1), "ns")
+    partes = []
+    for p in plantas:
+        if p not in bloques:
+            continue
+        a, b = bloques[p]
+        i = a + np.searchsorted(f[a:b], lo, side="left")
+        j = a + np.searchsorted(f[a:b], hi, side="left")
+        if j > i:
+            partes.append(df.iloc[i:j])
+    if not partes:
+        return df.iloc[0:0]
+    out = partes[0] if len(partes) == 1 else pd.concat(partes)
+    if h_min is not None:
+        out = out[out["hora_num"].between(h_min, h_max)]
+    return out
+
+def procesar_solar(clave, raw_ms, di, hr, snap=True):
+    """
+    Pestañas descargadas (POR MES cruda, POR DIA / POR HORA ya parseadas) →
+    frames compactos y ordenados, con la versión derivada de clave (los
+    validadores de las tres pestañas). Con snap se guarda el snapshot local.
+    """
+    with medir("parse", tab=SOLAR_TAB_MES, filas=len(raw_ms)):
+        ms = compactar(parse_mes(raw_ms), "mes")
+    with medir("compactar", filas=len(di) + len(hr)) as info:
+        di = ordenar_indexar(compactar(di, "dia"))
+        hr = ordenar_indexar(compactar(hr, "hora"), horas=True)
+        info["mb"] = round(sum(memoria(d) for d in (ms, di, hr)) / 2**20, 2)
+
+    version = "sheets:" + hashlib.sha1(repr(clave).encode()).hexdigest()[:16]
+    for nombre, d in (("mes", ms), ("dia", di), ("hora", hr)):
+        d.attrs["version"] = version
+        if snap:
+            with medir("snapshot", nombre=nombre, filas=len(d)):
+                guardar_snapshot(nombre, d)
+    return ms, di, hr
+
+SOLAR_EXCEL = "Reporte_Energia_Solar_GEDICOL.xlsx"
+
+def leer_excel_solar(path=SOLAR_EXCEL):
+    """
+    Las pestañas POR MES / POR DIA / POR HORA de un Excel con el mismo
+    formato que el Sheet solar, en la forma de descargar_sheets: POR MES
+    cruda, POR DIA y POR HORA ya parseadas.
+    """
+    hojas = leer_tabla(path, hojas=[SOLAR_TAB_MES, SOLAR_TAB_DIA, SOLAR_TAB_HORA], columnas=COLS_LECTURA)
+    return {SOLAR_TAB_MES: hojas[SOLAR_TAB_MES],
+            SOLAR_TAB_DIA: parse_dia(hojas[SOLAR_TAB_DIA]),
+            SOLAR_TAB_HORA: parse_hora(hojas[SOLAR_TAB_HORA])}
+
+# ======================
+# CUBO DE AGREGADOS
+# ======================
+def _reducir(idx, vals, total, ufunc, vacio):
+    """ufunc.reduceat por celda del cubo (min / max)."""
+    out = np.full(total, vacio, dtype="float64")
+    if len(idx):
+        orden = np.argsort(idx, kind="stable")
+        i, v = idx[orden], vals[orden]
+        ini = np.flatnonzero(np.r_[True, i[1:] != i[:-1]])
+        out[i[ini]] = ufunc.reduceat(v, ini)
+    return out
+
+def construir_cubo(ejes, kwh):
+    """
+    Cubo denso a partir de ejes = [(códigos, tamaño), ...] y los kWh de cada
+    fila: suma, conteo, mínimo y máximo por celda, con forma (tamaño_1, ...).
+    """
+    shape = tuple(t for _, t in ejes)
+    total = int(np.prod(shape))
+    idx = np.ravel_multi_index(tuple(np.asarray(c, dtype="int64") for c, _ in ejes), shape) \
+        if len(kwh) else np.zeros(0, dtype="int64")
+    return {
+        "suma": np.bincount(idx, weights=kwh, minlength=total).reshape(shape),
+        "n":    np.bincount(idx, minlength=total).reshape(shape),
+        "min":  _reducir(idx, kwh, total, np.minimum, np.inf).reshape(shape),
+        "max":  _reducir(idx, kwh, total, np.maximum, -np.inf).reshape(shape),
+    }
+
+def _codigos(col, valores):
+    return pd.Categorical(col, categories=valores).codes
+
+def cubo_mensual(ms):
+    """POR MES → cubo [planta, año, mes] sobre los valores presentes."""
+    plantas = sorted(ms["planta"].unique())
+    anios, meses = sorted(ms["anio"].unique()), sorted(ms["mes"].unique())
+    cubo = construir_cubo([
+        (_codigos(ms["planta"], plantas), max(1, len(plantas))),
+        (_codigos(ms["anio"], anios), max(1, len(anios))),
+        (_codigos(ms["mes"], meses), max(1, len(meses))),
+    ], kwh64(ms["energia_kwh"]))
+    cubo.update(plantas=plantas, anios=anios, meses=meses)
+    return cubo
+
+def cubo_fechas(df, horas=False):
+    """
+    POR DIA → cubo [planta, día]; POR HORA → [planta, día, hora]. El eje de
+    días es (año, mes, día del mes) aplanado en orden cronológico, 372 celdas
+    por año, así que un rango de fechas es un slice contiguo. dia_ord guarda
+    el ordinal de cada celda o -1 si la fecha no existe (30 feb).
+    El cubo horario lleva además sumas acumuladas (cs, cn) sobre los días.
+    """
+    d = df.dropna(subset=["fecha", "hora_num"] if horas else ["fecha"])
+    if horas:
+        d = d[d["hora_num"].between(0, 23)]
+    plantas = sorted(d["planta"].unique())
+    f = d["fecha"]
+    y0 = int(f.dt.year.min()) if len(d) else datetime.today().year
+    ny = int(f.dt.year.max()) - y0 + 1 if len(d) else 1
+    ejes = [
+        (_codigos(d["planta"], plantas), max(1, len(plantas))),
+        ((f.dt.year.to_numpy() - y0) * 372 + (f.dt.month.to_numpy() - 1) * 31 + f.dt.day.to_numpy() - 1, ny * 372),
+    ]
+    if horas:
+        ejes.append((d["hora_num"].to_numpy().astype("int64"), 24))
+    cubo = construir_cubo(ejes, kwh64(d["energia_kwh"]))
+    dias = pd.date_range(f"{y0}-01-01", f"{y0 + ny - 1}-12-31")
+    dia_ord = np.full(ny * 372, -1, dtype="int64")
+    dia_ord[(dias.year - y0) * 372 + (dias.month - 1) * 31 + dias.day - 1] = \
+        dias.to_numpy().astype("datetime64[D]").astype("int64")
+    cubo.update(plantas=plantas, y0=y0, dia_ord=dia_ord)
+    if horas:
+        cero = np.zeros(cubo["suma"][:, :1].shape)
+        cubo["cs"] = np.concatenate([cero, np.cumsum(cubo["suma"], axis=1)], axis=1)
+        cubo["cn"] = np.concatenate([cero.astype("int64"), np.cumsum(cubo["n"], axis=1)], axis=1)
+    return cubo
+
+def version_datos(*dfs):
+    return "|".join(str(d.attrs.get("version", "")) for d in dfs)
+
+def construir_cubos(ms, di, hr):
+    """
+    Cubos de POR MES / POR DIA / POR HORA. Los arreglos quedan de sólo
+    lectura: el tablero comparte los cubos entre sesiones y una escritura
+    accidental fallaría en vez de alterar los datos de todos.
+    """
+    cubos = {"mes": cubo_mensual(ms), "dia": cubo_fechas(di), "hora": cubo_fechas(hr, horas=True)}
+    for cubo in cubos.values():
+        for v in cubo.values():
+            if isinstance(v, np.ndarray):
+                v.flags.writeable = False
+    return cubos
+
+def _sel_plantas(cubo, plantas):
+    return np.isin(np.array(cubo["plantas"], dtype=object), list(plantas))
+
+def _rango_dias(cubo, fi, ff):
+    """[fi, ff] → slice sobre el eje plano de días del cubo."""
+    nd = len(cubo["dia_ord"])
+    pos = lambda f: (f.year - cubo["y0"]) * 372 + (f.month - 1) * 31 + f.day - 1
+    a = min(max(pos(fi), 0), nd)
+    b = min(max(pos(ff) + 1, 0), nd)
+    return slice(a, max(a, b))
+
+def mensual_desde_cubo(cubo, plantas, anios, meses):
+    """Equivale a mf.groupby(["anio","mes","planta"], as_index=False)["energia_kwh"].sum()."""
+    pm = _sel_plantas(cubo, plantas)
+    am = np.isin(np.array(cubo["anios"]), list(anios))
+    mm = np.isin(np.array(cubo["meses"]), list(meses))
+    n = cubo["n"] * (pm[:, None, None] & am[None, :, None] & mm[None, None, :])
+    ia, im, ip = np.nonzero(n.transpose(1, 2, 0) > 0)   # orden anio, mes, planta
+    return pd.DataFrame({
+        "anio": np.array(cubo["anios"], dtype="int64")[ia],
+        "mes": np.array(cubo["meses"], dtype="int64")[im],
+        "planta": np.array(cubo["plantas"], dtype=object)[ip],
+        "energia_kwh": cubo["suma"][ip, ia, im],
+    })
+
+def diario_desde_cubo(cubo, plantas, fi, ff):
+    """
+    Del cubo diario: dd (= dff.groupby(["fecha","planta"]).sum()), la tabla
+    (mes, día) del mapa de calor y el resumen sum/mean/max/min por planta.
+    Sólo recorre los días del rango.
+    """
+    pm, r = _sel_plantas(cubo, plantas), _rango_dias(cubo, fi, ff)
+    pl = np.array(cubo["plantas"], dtype=object)[pm]
+    suma, n = cubo["suma"][:, r][pm], cubo["n"][:, r][pm]              # [planta, día]
+    i_dia, i_pl = np.nonzero(n.T > 0)
+    dd = pd.DataFrame({
+        "fecha": pd.to_datetime(cubo["dia_ord"][r][i_dia], unit="D"),
+        "planta": pl[i_pl],
+        "energia_kwh": suma.T[i_dia, i_pl],
+    })
+
+    # mapa de calor: suma por (mes, día del mes) sobre años y plantas
+    md = np.arange(r.start, r.stop) % 372
+    hm_s = np.bincount(md, weights=suma.sum(axis=0), minlength=372)
+    hm_n = np.bincount(md, weights=n.sum(axis=0), minlength=372)
+    celdas = np.flatnonzero(hm_n > 0)
+    hm = pd.DataFrame({
+        "mes_nombre": [ML.get(c // 31 + 1, str(c // 31 + 1)) for c in celdas],
+        "dia": celdas % 31 + 1,
+        "energia_kwh": hm_s[celdas],
+    })
+
+    n_pl, s_pl = n.sum(axis=1), suma.sum(axis=1)
+    con = n_pl > 0
+    resumen = pd.DataFrame({
+        "planta": pl[con],
+        "sum": s_pl[con],
+        "mean": s_pl[con] / n_pl[con],
+        "max": cubo["max"][:, r][pm].max(axis=1, initial=-np.inf)[con],
+        "min": cubo["min"][:, r][pm].min(axis=1, initial=np.inf)[con],
+    })
+    return dd, hm, resumen
+
+def horario_desde_cubo(cubo, plantas, fi, ff, h_min, h_max):
+    """
+    Del cubo horario: hh (= hf.groupby(["hora_num","planta"]).mean()) y el
+    total de kWh por planta. Con las sumas acumuladas el costo no depende
+    del largo del histórico ni del rango de fechas.
+    """
+    pm, r = _sel_plantas(cubo, plantas), _rango_dias(cubo, fi, ff)
+    pl = np.array(cubo["plantas"], dtype=object)[pm]
+    h = slice(max(0, int(h_min)), int(h_max) + 1)
+    suma = (cubo["cs"][:, r.stop, h] - cubo["cs"][:, r.start, h])[pm]   # [planta, hora]
+    n = (cubo["cn"][:, r.stop, h] - cubo["cn"][:, r.start, h])[pm]
+    horas = np.arange(24)[h]
+    i_h, i_pl = np.nonzero(n.T > 0)
+    hh = pd.DataFrame({
+        "hora_num": horas[i_h].astype("float64"),
+        "planta": pl[i_pl],
+        "energia_kwh": suma.T[i_h, i_pl] / n.T[i_h, i_pl],
+    })
+    totales = dict(zip(pl, suma.sum(axis=1)))
+    return hh, totales
+
+
+# ======================
+# TABLA MENSUAL SOLAR VS EPM
+# ======================
+EPM_VACIO = ["anio","mes","planta","epm_kwh"]
+
+def tabla_mensual(mf, ef, costos, plantas=None):
+    """
+    mf (solar por anio/mes/planta) y ef (EPM ya filtrado) → una fila por
+    mes con una columna solar por planta, SOL_T, EPM_<planta> por planta,
+    EPM_T, Mes, Cob (%) y Ahorro (kWh solares × costo por kWh de cada
+    planta). `plantas` por defecto: las registradas más las de los datos.
+    EPM_T suma todas las plantas de ef (o su TOTAL si no viene por planta).
+    """
+    if plantas is None:
+        plantas = plantas_orden(PLANTAS, mf["planta"].unique(), ef["planta"].unique())
+    plantas = list(plantas)
+    epm_cols = [f"EPM_{p}" for p in plantas]
+
+    sp = mf.pivot_table(
+        index=["anio","mes"], columns="planta",
+        values="energia_kwh", aggfunc="sum", fill_value=0
+    )
+    sp = sp.reindex(columns=plantas, fill_value=0.0).astype("float64")
+    sp["SOL_T"] = sp.sum(axis=1)
+    sp = sp.reset_index()
+
+    if ef.empty or ef["epm_kwh"].sum() == 0:
+        epp = pd.DataFrame(columns=["anio","mes"] + epm_cols + ["EPM_T"])
+    else:
+        epp = ef.pivot_table(
+            index=["anio","mes"], columns="planta",
+            values="epm_kwh", aggfunc="sum", fill_value=0
+        )
+        por_planta = epp[[c for c in epp.columns if c != "TOTAL"]].sum(axis=1)
+        total = epp["TOTAL"] if "TOTAL" in epp.columns else 0.0
+        epp = epp.reindex(columns=plantas, fill_value=0.0).astype("float64")
+        epp.columns = epm_cols
+        epp["EPM_T"] = np.where(por_planta > 0, por_planta, total)
+        epp = epp.reset_index()
+
+    if epp.empty:
+        b = sp.copy()
+        for c in epm_cols + ["EPM_T"]:
+            b[c] = 0.0
+    else:
+        b = pd.merge(sp, epp, on=["anio","mes"], how="outer")
+        for c in plantas + ["SOL_T"] + epm_cols + ["EPM_T"]:
+            b[c] = b[c].astype("float64").fillna(0.0)
+
+    b["anio"] = tis_col(b["anio"])
+    b["mes"]  = parse_mes_col(b["mes"])
+    b = b[b["mes"].between(1,12)].sort_values(["anio","mes"]).reset_index(drop=True)
+    b["Mes"]    = mlbl_col(b["anio"], b["mes"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b["Cob"] = np.where(b["EPM_T"] > 0, b["SOL_T"] / b["EPM_T"] * 100, 0.0)
+    b["Ahorro"] = 0.0
+    for p in plantas:
+        b["Ahorro"] += b[p] * costos.get(p, 0)
+    b.attrs["plantas"] = plantas
+    return b
+
+def kpis_plantas(mf, ef, plantas, costos):
+    """
+    KPIs de la vista mensual con un groupby por tabla, para N plantas:
+    DataFrame por planta (solar, solar_prom, epm, epm_prom, costo, ahorro;
+    los promedios son por mes) y dict de totales (solar, epm, ahorro,
+    cobertura). epm total es todo ef, con o sin planta.
+    """
+    plantas = list(plantas)
+    sol = mf.groupby("planta", observed=True)["energia_kwh"].agg(["sum", "mean"])
+    epm = (ef.groupby(["planta", "anio", "mes"], observed=True)["epm_kwh"].sum()
+             .groupby(level="planta").agg(["sum", "mean"]))
+    k = pd.DataFrame({
+        "solar":      sol["sum"].reindex(plantas).astype("float64").fillna(0.0),
+        "solar_prom": sol["mean"].reindex(plantas).astype("float64").fillna(0.0),
+        "epm":        epm["sum"].reindex(plantas).astype("float64").fillna(0.0),
+        "epm_prom":   epm["mean"].reindex(plantas).astype("float64").fillna(0.0),
+        "costo":      [float(costos.get(p, 0)) for p in plantas],
+    }, index=pd.Index(plantas, name="planta"))
+    k["ahorro"] = k["solar"] * k["costo"]
+    sol_t = sf(k["solar"].sum())
+    epm_t = sf(ef["epm_kwh"].sum()) if not ef.empty else 0.0
+    tot = {
+        "solar": sol_t,
+        "epm": epm_t,
+        "ahorro": sf(k["ahorro"].sum()),
+        "cobertura": sol_t / epm_t * 100 if epm_t > 0 else 0.0,
+    }
+    return k, tot
+
+def tabla_resumen(b):
+    """La "Tabla Resumen Mensual" del tablero: columnas con unidades y redondeos de pantalla."""
+    plantas = b.attrs["plantas"]
+    return pd.DataFrame({
+        "Periodo": b["Mes"],
+        **{f"Solar {p} (kWh)": b[p].round(1) for p in plantas},
+        "Solar TOTAL (kWh)": b["SOL_T"].round(1),
+        **{f"EPM {p} (kWh)": b[f"EPM_{p}"].round(0).fillna(0).astype(int) for p in plantas},
+        "EPM TOTAL (kWh)": b["EPM_T"].round(0).fillna(0).astype(int),
+        "Cobertura (%)": b["Cob"].round(1),
+        "Ahorro (COP)": b["Ahorro"].round(2),
+    })
+
+def reporte_mensual(ms, ep, cx=None, anios=None, plantas=None):
+    """
+    Tabla mensual Solar vs EPM sin filtros de pantalla: todas las plantas,
+    años y meses (o los dados), con los costos del Excel de EPM (cx) sobre
+    los de COSTOS_EPM.
+    """
+    cubo = cubo_mensual(ms)
+    anios = list(anios) if anios else sorted(set(cubo["anios"]) | set(ep["anio"].unique()))
+    plantas = plantas_orden(plantas or [*PLANTAS, *cubo["plantas"]])
+    mf = mensual_desde_cubo(cubo, plantas, anios, range(1, 13))
+    ef = ep[ep["anio"].isin(anios)] if not ep.empty else pd.DataFrame(columns=EPM_VACIO)
+    costos = {**COSTOS_EPM, **{k: v for k, v in (cx or {}).items() if v > 0}}
+    return tabla_resumen(tabla_mensual(mf, ef, costos, plantas))
+
+# ======================
+# PRONÓSTICO
+# ======================
+# Modelo por planta sobre el cubo horario: perfil de la hora del día por mes
+# del año (qué fracción del día aporta cada hora), índice estacional por mes
+# y un nivel con suavizado exponencial sobre los totales diarios
+# desestacionalizados. Todo son sumas por celda del cubo, así que un ajuste
+# nuevo sólo absorbe los días que llegaron desde el anterior.
+ALFA_PRONOSTICO  = 0.05    # peso de cada día nuevo en el nivel
+HORIZONTE_MESES  = 3       # meses completos pronosticados después del mes del último dato
+COBERTURA_MIN    = 0.5     # fracción del perfil que debe tener un día incompleto para contar
+
+def _perfiles(horas):
+    """Fracción del día por hora [planta, mes, hora]; un mes sin datos usa el perfil de todo el año."""
+    anual = horas.sum(axis=1, keepdims=True)
+    h = np.where(horas.sum(axis=2, keepdims=True) > 0, horas, anual)
+    tot = h.sum(axis=2, keepdims=True)
+    return np.divide(h, tot, out=np.zeros_like(h), where=tot > 0)
+
+def _indice_estacional(mes_s, mes_n):
+    """Promedio diario de cada mes / promedio diario de la planta; 1 en meses sin datos."""
+    prom = np.divide(mes_s, mes_n, out=np.zeros_like(mes_s), where=mes_n > 0)
+    glob = np.divide(mes_s.sum(axis=1), mes_n.sum(axis=1),
+                     out=np.zeros(len(mes_s)), where=mes_n.sum(axis=1) > 0)
+    return np.divide(prom, glob[:, None], out=np.ones_like(mes_s), where=(mes_n > 0) & (glob[:, None] > 0))
+
+def _suavizar(nivel, x, alfa):
+    """Suavizado exponencial de x (en orden) a partir de nivel (NaN: arranca en x[0])."""
+    if not len(x):
+        return nivel
+    if np.isnan(nivel):
+        nivel, x = x[0], x[1:]
+    k = len(x)
+    pesos = alfa * (1 - alfa) ** np.arange(k - 1, -1, -1)
+    return (1 - alfa) ** k * nivel + float(pesos @ x)
+
+def _absorber(modelo, cubo, celdas):
+    """Suma al modelo las celdas (días del cubo, en orden cronológico) y avanza el nivel."""
+    suma, n = cubo["suma"][:, celdas], cubo["n"][:, celdas]        # [planta, día, hora]
+    mes = (celdas % 372) // 31
+    for m in np.unique(mes):
+        modelo["horas"][:, m] += suma[:, mes == m].sum(axis=1)
+    tot, ok = _totales_dia(modelo, suma, n, mes)
+    np.add.at(modelo["mes_s"].T, mes, np.where(ok, tot, 0.0).T)
+    np.add.at(modelo["mes_n"].T, mes, ok.T.astype("float64"))
+    idx = _indice_estacional(modelo["mes_s"], modelo["mes_n"])
+    for i in range(len(modelo["plantas"])):
+        x = tot[i, ok[i]] / idx[i, mes[ok[i]]]
+        modelo["nivel"][i] = _suavizar(modelo["nivel"][i], x, ALFA_PRONOSTICO)
+
+def _totales_dia(modelo, suma, n, mes):
+    """
+    Total de cada día [planta, día], completando las horas que faltan con el
+    perfil: kWh observados / fracción del día que cubren. ok marca los días
+    con cobertura suficiente.
+    """
+    perfil = _perfiles(modelo["horas"])[:, mes]                      # [planta, día, hora]
+    cob = (perfil * (n > 0)).sum(axis=2)
+    ok = cob >= COBERTURA_MIN
+    return np.divide(suma.sum(axis=2), cob, out=np.zeros_like(cob), where=ok), ok
+
+def _firma_dias(cubo, celdas):
+    d = cubo["suma"][:, celdas].sum(axis=2)
+    return zlib.crc32(d.tobytes(), zlib.crc32(cubo["dia_ord"][celdas].tobytes()))
+
+def ajustar_pronostico(cubo, previo=None):
+    """
+    Modelo de pronóstico sobre el cubo horario (construir_cubos(...)["hora"]).
+    Sólo entran los días cerrados (anteriores al último día con datos, que
+    puede estar a medias); el último ajusta el nivel al pronosticar. Con
+    `previo` se absorben sólo los días cerrados nuevos si los ya absorbidos
+    no cambiaron; si cambiaron (o cambian las plantas) se reajusta desde
+    cero. previo no se modifica.
+    """
+    plantas = list(cubo["plantas"])
+    con = np.flatnonzero((cubo["n"].sum(axis=(0, 2)) > 0) & (cubo["dia_ord"] >= 0))
+    ultimo = int(cubo["dia_ord"][con[-1]]) if len(con) else None
+    cerradas = con[:-1]
+    ords = cubo["dia_ord"][cerradas]
+
+    if (previo is not None and previo["plantas"] == plantas
+            and _firma_dias(cubo, cerradas[ords <= previo["hasta"]]) == previo["firma"]):
+        modelo = {k: (v.copy() if isinstance(v, np.ndarray) else v) for k, v in previo.items()}
+        nuevas = cerradas[ords > previo["hasta"]]
+    else:
+        np_ = len(plantas)
+        modelo = {"plantas": plantas, "hasta": -1, "firma": _firma_dias(cubo, cerradas[:0]),
+                  "horas": np.zeros((np_, 12, 24)), "mes_s": np.zeros((np_, 12)),
+                  "mes_n": np.zeros((np_, 12)), "nivel": np.full(np_, np.nan)}
+        nuevas = cerradas
+    if len(nuevas):
+        _absorber(modelo, cubo, nuevas)
+        modelo["hasta"] = int(cubo["dia_ord"][nuevas[-1]])
+        modelo["firma"] = _firma_dias(cubo, cerradas[ords <= modelo["hasta"]])
+    modelo["nuevos"] = len(nuevas)
+
+    # último día (abierto) y lo ya generado en su mes
+    modelo["ultimo"], modelo["nivel_hoy"] = ultimo, modelo["nivel"].copy()
+    modelo["mes_hoy"] = np.zeros(len(plantas))
+    if ultimo is not None:
+        c = con[-1]
+        idx = _indice_estacional(modelo["mes_s"], modelo["mes_n"])
+        tot, ok = _totales_dia(modelo, cubo["suma"][:, [c]], cubo["n"][:, [c]], np.array([(c % 372) // 31]))
+        for i in np.flatnonzero(ok[:, 0]):
+            modelo["nivel_hoy"][i] = _suavizar(modelo["nivel"][i], tot[i] / idx[i, (c % 372) // 31], ALFA_PRONOSTICO)
+        ini = c - c % 31                                             # día 1 del mes
+        modelo["mes_hoy"] = cubo["suma"][:, ini:c + 1].sum(axis=(1, 2))
+    return modelo
+
+def pronosticar(modelo, costos, plantas=None, meses=HORIZONTE_MESES):
+    """
+    (diario, mensual) desde el día siguiente al último dato hasta el fin del
+    mes `meses` posterior: kWh esperados y ahorro (kWh × costo por kWh) por
+    planta. El mes en curso suma lo ya generado ("real") a lo pronosticado.
+    """
+    cols_d, cols_m = ["fecha", "planta", "energia_kwh", "ahorro"], \
+        ["anio", "mes", "planta", "energia_kwh", "real", "ahorro"]
+    if modelo["ultimo"] is None:
+        return pd.DataFrame(columns=cols_d), pd.DataFrame(columns=cols_m)
+    hoy = pd.Timestamp(modelo["ultimo"], unit="D")
+    fin = (hoy.to_period("M") + meses).to_timestamp(how="end").normalize()
+    fechas = pd.date_range(hoy + pd.Timedelta(days=1), fin)
+    pos = {p: i for i, p in enumerate(modelo["plantas"])}
+    pl = [p for p in plantas_orden(modelo["plantas"])
+          if (plantas is None or p in plantas) and not np.isnan(modelo["nivel_hoy"][pos[p]])]
+    sel = [pos[p] for p in pl]
+    costo = np.array([costos.get(p, 0) for p in pl], dtype="float64")
+    idx = _indice_estacional(modelo["mes_s"], modelo["mes_n"])
+    kwh = modelo["nivel_hoy"][sel, None] * idx[sel][:, fechas.month - 1]   # [planta, día]
+
+    diario = pd.DataFrame({
+        "fecha": np.repeat(fechas, len(pl)),
+        "planta": np.tile(np.array(pl, dtype=object), len(fechas)),
+        "energia_kwh": kwh.T.ravel(),
+        "ahorro": (kwh * costo[:, None]).T.ravel(),
+    })
+    mes_f = fechas.year * 12 + fechas.month - 1
+    ini = np.flatnonzero(np.diff(mes_f, prepend=-1))                    # primer día de cada mes
+    kwh_m = np.add.reduceat(kwh, ini, axis=1) if len(ini) else kwh[:, :0]   # [planta, mes]
+    en_curso = (mes_f[ini] == hoy.year * 12 + hoy.month - 1)
+    real = modelo["mes_hoy"][sel, None] * en_curso[None, :]
+    kwh_m = kwh_m + real
+    mensual = pd.DataFrame({
+        "anio": np.repeat(mes_f[ini] // 12, len(pl)),
+        "mes": np.repeat(mes_f[ini] % 12 + 1, len(pl)),
+        "planta": np.tile(np.array(pl, dtype=object), len(ini)),
+        "energia_kwh": kwh_m.T.ravel(),
+        "real": real.T.ravel(),
+        "ahorro": (kwh_m * costo[:, None]).T.ravel(),
+    })
+    return diario, mensual
+
+# ======================
+# ANOMALÍAS
+# ======================
+# Días y horas que se apartan de lo esperado para esa planta, hora y época
+# del año. Lo esperado es la mediana del mismo mes de ese año (sigue la
+# estación y la degradación); la escala, 1,4826 × MAD de la planta en ese
+# mes del año sobre todos los años. Con varias plantas se mira además la
+# participación de cada una en el total del día / hora: un día nublado baja
+# a todas, una falla de inversor o paneles sucios sólo a una.
+Z_ANOMALIA   = 3.5    # |z robusto| desde el que se marca
+DESVIO_MIN   = 0.2    # y además apartarse al menos este tanto de lo esperado
+FRACCION_LUZ = 0.1    # horas con lo esperado bajo esta fracción de la hora pico del mes no se evalúan
+COLS_ALERTAS = ["fecha", "planta", "nivel", "horas", "energia_kwh", "esperado", "desvio", "z", "tipo"]
+
+def _mediana(a, ejes):
+    """np.nanmedian sobre `ejes`, con un solo sort (los NaN quedan al final)."""
+    a = np.moveaxis(a, ejes, tuple(range(-len(ejes), 0)))
+    a = np.sort(a.reshape(*a.shape[:a.ndim - len(ejes)], -1), axis=-1)
+    n = (~np.isnan(a)).sum(axis=-1, keepdims=True)
+    lo = np.take_along_axis(a, np.maximum(n - 1, 0) // 2, axis=-1)
+    hi = np.take_along_axis(a, np.minimum(n // 2, a.shape[-1] - 1), axis=-1)
+    return ((lo + hi) / 2)[..., 0]
+
+def _z_robusto(x, ejes_centro):
+    """
+    x [planta, año, mes, día(, hora)] → (esperado, z). El centro es la
+    mediana sobre ejes_centro; la escala, la MAD sobre años y días.
+    """
+    esperado = np.expand_dims(_mediana(x, ejes_centro), ejes_centro)
+    dev = x - esperado
+    esc = np.expand_dims(1.4826 * _mediana(np.abs(dev), (1, 3)), (1, 3))
+    return esperado, dev / np.maximum(esc, 1e-9)
+
+def _marcar(x):
+    """
+    (esperado, z, tipo) de cada celda de x [planta, año, mes, día(, hora)]:
+    tipo -1 bajo, +1 alto, 0 normal o sin datos. Donde reportan todas las
+    plantas, bajo lo decide la participación (el clima mueve a todas por
+    igual); si no, o con una sola planta, el nivel propio. Alto pide las
+    dos: cuando una planta cae, la participación de las demás sube sin que
+    generen de más. Generar 0 donde se espera algo siempre es bajo.
+    """
+    esperado, z = _z_robusto(x, (3,))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel = x / esperado - 1
+        zq = z
+        if len(x) > 1:
+            q = x / np.where(np.isnan(x).any(axis=0), np.nan, x.sum(axis=0))
+            zq = np.where(np.isnan(q), z, _z_robusto(q, (1, 3))[1])
+        bajo = ((zq <= -Z_ANOMALIA) & (rel <= -DESVIO_MIN)) | ((x == 0) & (esperado > 0))
+        alto = (z >= Z_ANOMALIA) & (zq >= Z_ANOMALIA) & (rel >= DESVIO_MIN)
+    return np.broadcast_to(esperado, x.shape), np.where(alto, np.minimum(z, zq), zq), \
+        np.where(bajo, -1, np.where(alto, 1, 0))
+
+def _valores(cubo):
+    """kWh del cubo, NaN sin datos; el último día con datos (abierto, puede estar a medias) no se evalúa."""
+    x = np.where(cubo["n"] > 0, cubo["suma"], np.nan)
+    con = np.flatnonzero(cubo["n"].reshape(len(x), x.shape[1], -1).sum(axis=(0, 2)) > 0)
+    if len(con):
+        x[:, con[-1]] = np.nan
+    return x
+
+def _filas_alertas(cubo, x, esperado, z, tipo, p, c, nivel, horas=""):
+    return pd.DataFrame({
+        "fecha": pd.to_datetime(cubo["dia_ord"][c], unit="D"),
+        "planta": np.array(cubo["plantas"], dtype=object)[p],
+        "nivel": nivel,
+        "horas": horas,
+        "energia_kwh": x,
+        "esperado": esperado,
+        "desvio": x / esperado - 1,
+        "z": z,
+        "tipo": np.where(tipo < 0, "bajo", "alto"),
+    })
+
+def detectar_anomalias(cubos):
+    """
+    Alertas (COLS_ALERTAS) de los cubos diario y horario de construir_cubos:
+    días fuera de lo esperado (nivel "día") y, por planta y día, las horas
+    de luz fuera de lo esperado para esa hora (nivel "horas", con el rango
+    de horas y los kWh sumados). desvio es la fracción sobre lo esperado.
+    """
+    partes = []
+    cd = cubos["dia"]
+    x = _valores(cd).reshape(len(cd["plantas"]), -1, 12, 31)
+    esperado, z, tipo = _marcar(x)
+    p, y, m, d = np.nonzero(tipo)
+    if len(p):
+        i = (p, y, m, d)
+        partes.append(_filas_alertas(cd, x[i], esperado[i], z[i], tipo[i], p, y * 372 + m * 31 + d, "día"))
+
+    ch = cubos["hora"]
+    x = _valores(ch).reshape(len(ch["plantas"]), -1, 12, 31, 24)
+    esperado, z, tipo = _marcar(x)
+    pico = np.nanmax(np.where(np.isnan(esperado), -np.inf, esperado), axis=-1, keepdims=True)
+    tipo = np.where(esperado >= FRACCION_LUZ * pico, tipo, 0)
+    p, y, m, d, h = np.nonzero(tipo)
+    if len(p):
+        i = (p, y, m, d, h)
+        f = _filas_alertas(ch, x[i], esperado[i], z[i], tipo[i], p, y * 372 + m * 31 + d, "horas")
+        f["hora"] = h
+        g = f.groupby(["fecha", "planta", "tipo"], as_index=False, sort=False).agg(
+            h0=("hora", "min"), h1=("hora", "max"), n=("hora", "size"),
+            energia_kwh=("energia_kwh", "sum"), esperado=("esperado", "sum"),
+            zmin=("z", "min"), zmax=("z", "max"))
+        g["nivel"] = "horas"
+        rango = np.char.add(np.char.add(np.char.add(hlbl_col(g["h0"]), "–"), hlbl_col(g["h1"] + 1)),
+                            np.char.add(" · ", np.char.add(g["n"].to_numpy().astype(str), " h")))
+        g["horas"] = np.where(g["n"] > 1, rango, hlbl_col(g["h0"]))
+        g["desvio"] = g["energia_kwh"] / g["esperado"] - 1
+        g["z"] = np.where(g["tipo"] == "bajo", g["zmin"], g["zmax"])
+        partes.append(g[COLS_ALERTAS])
+
+    if not partes:
+        return pd.DataFrame(columns=COLS_ALERTAS)
+    al = pd.concat(partes, ignore_index=True)
+    orden = {p: i for i, p in enumerate(plantas_orden(al["planta"].unique()))}
+    return al.sort_values(["fecha", "planta", "nivel"], key=lambda c: c.map(orden) if c.name == "planta" else c,
+                          ignore_index=True)
+
+def marcas_mapa(alertas):
+    """Celdas (mes_nombre, dia) del mapa de calor con alguna alerta, y su texto para el hover."""
+    if alertas.empty:
+        return pd.DataFrame(columns=["mes_nombre", "dia", "texto"])
+    f = alertas["fecha"]
+    alcance = alertas["horas"].where(alertas["nivel"] != "día", "día completo")
+    txt = (dlbl_col(f) + " · " + alertas["planta"] + " " + alcance + ": "
+           + fn_col((alertas["desvio"] * 100).to_numpy(), 0) + "%")
+    g = pd.DataFrame({"mes": f.dt.month, "dia": f.dt.day, "texto": txt}) \
+        .groupby(["mes", "dia"], as_index=False)["texto"].agg("<br>".join)
+    g.insert(0, "mes_nombre", g["mes"].map(ML))
+    return g.drop(columns="mes")
+
+# ======================
+# EXPORTACIÓN
+# ======================
+TROZO_EXPORT = 50_000        # filas por trozo al escribir (memoria acotada con años de datos horarios)
+FILAS_HOJA_XLSX = 1_048_575  # filas de datos por hoja de Excel; lo que sobra sigue en "<hoja> 2"
+
+def _en_trozos(df, n=TROZO_EXPORT):
+    for i in range(0, max(len(df), 1), n):
+        yield df.iloc[i:i + n]
+
+def hojas_reporte(hr, cubos, ep, costos, plantas, anios, meses, fi, ff, h_min=0, h_max=23):
+    """
+    Las hojas del reporte para una selección de filtros, como en el tablero:
+    mensual Solar vs EPM y ahorro por años/meses, diario y horario por rango
+    de fechas (y horas). {hoja: función sin argumentos → iterable de
+    DataFrames}; nada se calcula hasta que el escritor pide cada hoja, y el
+    horario sale por planta y en trozos de TROZO_EXPORT filas.
+    """
+    plantas = plantas_orden(plantas)
+    fi, ff = pd.Timestamp(fi), pd.Timestamp(ff)
+
+    def mensual():
+        mf = mensual_desde_cubo(cubos["mes"], plantas, anios, meses)
+        ef = ep[ep["anio"].isin(anios) & ep["mes"].isin(meses)] if not ep.empty else pd.DataFrame(columns=EPM_VACIO)
+        yield tabla_resumen(tabla_mensual(mf, ef, costos, plantas))
+
+    def ahorro():
+        mf = mensual_desde_cubo(cubos["mes"], plantas, anios, meses)
+        mf = mf[mf["planta"].isin(plantas)].sort_values(["anio", "mes", "planta"])
+        costo = mf["planta"].astype(object).map(lambda p: float(costos.get(p, 0))).astype("float64")
+        yield pd.DataFrame({
+            "Periodo": mlbl_col(mf["anio"], mf["mes"]),
+            "Planta": mf["planta"].astype(object),
+            "Solar (kWh)": mf["energia_kwh"].astype("float64").round(2),
+            "Costo (COP/kWh)": costo,
+            "Ahorro (COP)": (mf["energia_kwh"].astype("float64") * costo).round(2),
+        })
+
+    def diario():
+        dd, _, _ = diario_desde_cubo(cubos["dia"], plantas, fi, ff)
+        costo = dd["planta"].map(lambda p: float(costos.get(p, 0))).astype("float64")
+        yield pd.DataFrame({
+            "Fecha": dd["fecha"].dt.date,
+            "Planta": dd["planta"],
+            "Solar (kWh)": dd["energia_kwh"].round(2),
+            "Ahorro (COP)": (dd["energia_kwh"] * costo).round(2),
+        })
+
+    def horario():
+        # los trozos vacíos (planta sin horas en el rango) no se escriben;
+        # si no hubo ninguna fila sale la hoja vacía, con sus tipos
+        vacio = True
+        for p in plantas:
+            for t in _en_trozos(filas_rango(hr, [p], fi, ff, h_min, h_max)):
+                if len(t):
+                    vacio = False
+                    yield pd.DataFrame({
+                        "Fecha": t["fecha"].dt.date,
+                        "Hora": hlbl_col(t["hora_num"]),
+                        "Planta": p,
+                        "Solar (kWh)": t["energia_kwh"].astype("float64").round(2),
+                    })
+        if vacio:
+            yield pd.DataFrame({"Fecha": pd.Series(dtype=object), "Hora": pd.Series(dtype=object),
+                                "Planta": pd.Series(dtype=object), "Solar (kWh)": pd.Series(dtype="float64")})
+
+    return {"Mensual Solar vs EPM": mensual, "Diario": diario, "Horario": horario, "Ahorro": ahorro}
+
+def escribir_xlsx(destino, hojas):
+    """
+    Libro de Excel con openpyxl en modo sólo escritura: cada fila va a un
+    temporal al agregarla, así la memoria no crece con el tamaño del libro.
+    """
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for nombre, trozos in hojas.items():
+        ws, n, parte = None, 0, 1
+        for t in trozos():
+            if ws is None:
+                ws = wb.create_sheet(nombre)
+                ws.append(list(t.columns))
+            for fila in t.itertuples(index=False, name=None):
+                if n == FILAS_HOJA_XLSX:
+                    parte += 1
+                    ws, n = wb.create_sheet(f"{nombre} {parte}"), 0
+                    ws.append(list(t.columns))
+                ws.append(fila)
+                n += 1
+    wb.save(destino)
+
+# tipos Parquet de las columnas de texto / fecha de las hojas; las numéricas salen de su dtype
+TIPOS_PARQUET = {"Fecha": "date32", "Periodo": "string", "Planta": "string", "Hora": "string"}
+
+def esquema_parquet(t):
+    """
+    Esquema Arrow de una hoja desde los dtypes de sus columnas (no desde los
+    valores): un trozo vacío o con NaN da el mismo esquema que uno lleno.
+    """
+    import pyarrow as pa
+    campos = []
+    for c, dt in t.dtypes.items():
+        if pd.api.types.is_numeric_dtype(dt) and not pd.api.types.is_bool_dtype(dt):
+            tipo = pa.from_numpy_dtype(np.dtype(getattr(dt, "numpy_dtype", dt)))
+        else:
+            tipo = getattr(pa, TIPOS_PARQUET.get(c, "string"))()
+        campos.append(pa.field(str(c), tipo))
+    return pa.schema(campos)
+
+def escribir_parquet_zip(destino, hojas):
+    """Un .zip con un Parquet por hoja; cada trozo es un row group (ParquetWriter)."""
+    import zipfile
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nombre, trozos in hojas.items():
+            with zf.open(f"{nombre}.parquet", "w", force_zip64=True) as f:
+                escritor = None
+                for t in trozos():
+                    if escritor is None:
+                        escritor = pq.ParquetWriter(f, esquema_parquet(t))
+                    escritor.write_table(pa.Table.from_pandas(t, schema=escritor.schema, preserve_index=False))
+                if escritor is not None:
+                    escritor.close()
+
+FORMATOS_EXPORT = {
+    "xlsx":    (escribir_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": (escribir_parquet_zip, "zip", "application/zip"),
+}
+
+def exportar(formato, hojas):
+    """
+    Arma el archivo en un temporal en disco y devuelve sus bytes (lo que
+    sirve st.download_button). Se mide como etapa "exportar".
+    """
+    escribir = FORMATOS_EXPORT[formato][0]
+    with medir("exportar", formato=formato) as info, tempfile.TemporaryFile() as f:
+        escribir(f, hojas)
+        f.seek(0)
+        datos = f.read()
+        info["bytes"] = len(datos)
+    return datos
+
+# ======================
+# CLI
+# ======================
+def _cargar_cli(args):
+    """(ms, ep, cx) desde Sheets o desde los Excel locales, sin tocar el snapshot."""
+    if args.fuente == "sheets":
+        dfs, errs, _ = fetch_sheets({
+            SOLAR_TAB_MES: (read_tab_csv, (SOLAR_SHEET_ID, SOLAR_TAB_MES)),
+            EPM_TAB:       (read_gid_csv, (EPM_SHEET_ID, EPM_GID_MES)),
+        })
+        if SOLAR_TAB_MES in errs:
+            raise RuntimeError(errs[SOLAR_TAB_MES])
+        raw_ms = dfs[SOLAR_TAB_MES]
+        if EPM_TAB in errs:
+            print(f"⚠ EPM Sheets: {errs[EPM_TAB]}", file=sys.stderr)
+            ep, cx = pd.DataFrame(columns=EPM_VACIO), {}
+        else:
+            ep, cx, _, _ = parse_epm_df(dfs[EPM_TAB])
+    else:
+        raw_ms = leer_tabla(args.excel, hojas=[SOLAR_TAB_MES], columnas=COLS_LECTURA)[SOLAR_TAB_MES]
+        path = args.epm or buscar_epm_local()
+        if path:
+            ep, cx, _, _ = leer_epm_excel(path)
+        else:
+            print("⚠ Sin Excel de EPM: columnas EPM en 0", file=sys.stderr)
+            ep, cx = pd.DataFrame(columns=EPM_VACIO), {}
+    return compactar(parse_mes(raw_ms), "mes"), ep, cx
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        prog="gedicol",
+        description="Tabla mensual Solar vs EPM (la misma del tablero) en CSV o Parquet.")
+    ap.add_argument("--fuente", choices=["sheets", "excel"], default="sheets",
+                    help="Google Sheets (por defecto) o los Excel locales")
+    ap.add_argument("--excel", default=SOLAR_EXCEL, help=f"Excel solar (por defecto {SOLAR_EXCEL})")
+    ap.add_argument("--epm", help="Excel/CSV de EPM (por defecto el primero de EPM_LOCAL_PATHS)")
+    ap.add_argument("--anios", type=int, nargs="+", help="sólo estos años")
+    ap.add_argument("--plantas", nargs="+", help="sólo estas plantas (por defecto las registradas y las de los datos)")
+    ap.add_argument("-o", "--salida", default="-",
+                    help="archivo .csv o .parquet; '-' (por defecto) escribe CSV a stdout")
+    args = ap.parse_args(argv)
+    activar_log(os.environ.get("GEDICOL_LOG_MEDICIONES"))
+
+    ms, ep, cx = _cargar_cli(args)
+    plantas = [norm_planta(p) for p in args.plantas] if args.plantas else None
+    tbl = reporte_mensual(ms, ep, cx, anios=args.anios, plantas=plantas)
+    if args.salida == "-":
+        tbl.to_csv(sys.stdout, index=False)
+    elif args.salida.lower().endswith(".parquet"):
+        tbl.to_parquet(args.salida, index=False)
+    else:
+        tbl.to_csv(args.salida, index=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""leer_csv: parseo en streaming y reutilización del DataFrame anterior; ingesta incremental."""
+import pandas as pd
+import pytest
+
+import gedicol
+
+CUERPO = b"fecha,planta,energia_kwh\n" + b"".join(b"01/01/2025,CAFE,%d.5\n" % i for i in range(5000))
+
+
+class Resp:
+    def __init__(self, cuerpo, headers=None):
+        self.cuerpo, self.headers, self.encoding = cuerpo, headers or {}, "utf-8"
+        self.pedidos = 0
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.cuerpo), chunk_size):
+            self.pedidos += 1
+            yield self.cuerpo[i:i + chunk_size]
+
+
+def test_sin_validadores_reusa_si_el_sha_coincide():
+    df = gedicol.leer_csv(Resp(CUERPO), "login")
+    previo = {"validador": df.attrs["validador"], "df": df}
+    assert gedicol.leer_csv(Resp(CUERPO), "login", previo) is df
+
+    nuevo = gedicol.leer_csv(Resp(CUERPO + b"02/01/2025,CAFE,1\n"), "login", previo)
+    assert nuevo is not df and len(nuevo) == len(df) + 1
+    assert nuevo.attrs["validador"] != df.attrs["validador"]
+
+
+def test_etag_igual_no_lee_el_cuerpo():
+    df = gedicol.leer_csv(Resp(CUERPO), "login")
+    r = Resp(CUERPO, {"ETag": '"v1"'})
+    assert gedicol.leer_csv(r, "login", {"validador": '"v1"', "df": df}) is df
+    assert r.pedidos == 0
+
+
+def test_sin_validadores_cuerpo_chico_no_se_parsea(monkeypatch):
+    df = gedicol.leer_csv(Resp(CUERPO), "login")
+    previo = {"validador": df.attrs["validador"], "df": df}
+
+    def no_parsear(*a, **k):
+        raise AssertionError("se parseó un cuerpo sin cambios")
+
+    monkeypatch.setattr(gedicol.pd, "read_csv", no_parsear)
+    assert gedicol.leer_csv(Resp(CUERPO), "login", previo) is df
+
+
+def test_sin_validadores_cuerpo_grande_sigue_en_streaming(monkeypatch):
+    df = gedicol.leer_csv(Resp(CUERPO), "login")
+    previo = {"validador": df.attrs["validador"], "df": df}
+    monkeypatch.setattr(gedicol, "CSV_COMPARAR", 4096)
+    assert gedicol.leer_csv(Resp(CUERPO), "login", previo) is df
+    nuevo = gedicol.leer_csv(Resp(CUERPO.replace(b"4999.5", b"4999.6")), "login", previo)
+    assert nuevo is not df and nuevo["energia_kwh"].iat[-1] == 4999.6
+
+
+def test_incremental_fallida_deja_el_motivo(monkeypatch):
+    crudo = pd.DataFrame({"fecha": ["01/01/2025"], "planta": ["CAFE"], "energia_kwh": ["1.5"]})
+    pedidos = []
+
+    def leer(sid, tab, session=None, tq=None, recordar=True):
+        pedidos.append(tq)
+        if tq:
+            raise fallo
+        return crudo
+
+    def parser(raw):
+        return raw.assign(fecha=pd.to_datetime(raw["fecha"], dayfirst=True), energia_kwh=1.5)
+
+    monkeypatch.setattr(gedicol, "read_tab_csv", leer)
+    tab = "TEST INCREMENTAL"
+    try:
+        fallo = RuntimeError("Sheet tab='TEST INCREMENTAL' status=400")
+        gedicol.leer_tab_incremental("sid", tab, parser)
+        assert gedicol.ingesta_estado()[tab]["modo"] == "completa"
+        gedicol.leer_tab_incremental("sid", tab, parser)
+        assert gedicol.ingesta_estado()[tab]["modo"] == f"completa (incremental falló: {fallo})"
+        assert pedidos[-1] is None and pedidos[-2] is not None
+
+        fallo = TypeError("error de programación")
+        with pytest.raises(TypeError):
+            gedicol.leer_tab_incremental("sid", tab, parser)
+    finally:
+        gedicol.ingesta_estado().pop(tab, None)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Formateadores vectorizados y figuras con selecciones vacías."""
+import numpy as np
+import pandas as pd
+
+import figuras
+import gedicol
+
+
+def test_formateadores_vacios():
+    for r in (gedicol.fn_col([]), gedicol.fn_col([], 2), gedicol.fc_col([]),
+              gedicol.etiquetas([]), gedicol.etiquetas([], 1, moneda=True),
+              gedicol.hlbl_col([])):
+        assert r.shape == (0,) and r.dtype.kind == "U"
+
+
+def test_formateadores_valores():
+    assert gedicol.fn_col([1234567.891, -5, np.nan], 2).tolist() == ["1.234.567,89", "-5,00", "0,00"]
+    assert gedicol.fc_col([1500]).tolist() == ["$1.500"]
+    assert gedicol.hlbl_col([0, 7, 23]).tolist() == ["00:00", "07:00", "23:00"]
+
+
+def test_formateadores_fuera_de_int64():
+    # |x|·10^d ≥ 2^63 no entra en int64: debe dar lo mismo que fn, sin "invalid value encountered in cast"
+    x = [1e17, -1e17, 9.3e18, 1e300, 1234.5, -0.5]
+    with np.errstate(invalid="raise"):
+        for d in (0, 2):
+            assert gedicol.fn_col(x, d).tolist() == [gedicol.fn(v, d) for v in x]
+        assert gedicol.fn_col([1e17], 2).tolist() == ["100.000.000.000.000.000,00"]
+        assert gedicol.fc_col([-1e17], 1).tolist() == ["$-100.000.000.000.000.000,0"]
+
+
+def test_figuras_sin_meses():
+    pv = ("CAFE", "MERCADO")
+    b = gedicol.tabla_mensual(pd.DataFrame(columns=["anio", "mes", "planta", "energia_kwh"]),
+                              pd.DataFrame(columns=gedicol.EPM_VACIO), gedicol.COSTOS_EPM, list(pv))
+    assert b.empty
+    proms = ((0, 0), (0, 0))
+    figuras.fig_comparativo(b[["Mes", *pv, *(f"EPM_{p}" for p in pv)]], pv, proms)
+    figuras.fig_apilado(b[["Mes", *pv, *(f"EPM_{p}" for p in pv)]], pv, proms)
+    figuras.fig_ahorro(b[["Mes", "Ahorro"]])
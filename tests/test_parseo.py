@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""to_num_col (vectorizado) contra to_num_auto (celda por celda)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import gedicol
+
+CASOS = [
+    # miles / decimales
+    "5,444", "5.6", "1,234.56", "1.234,56", "1,234,567", "5,6", "12,3456", "0,5",
+    "1.000.000,5", "1,23,456", ".5", "1.2.3",
+    # negativos
+    "-12", "-5,444", "-1.234,56", "-0,5", "-.5", "--1", "5-",
+    # símbolos y espacios
+    "$ 1.500,25", "€ 3,5", " 7 ", "+3", "(4)", "1e3", "abc",
+    # vacíos
+    "", "  ", "-", " -.  ", "nan", "NaN", "None", "null",
+    # celdas no texto (read_excel)
+    None, np.nan, float("inf"), -float("inf"), 3, -2, 2.5, np.int64(7), np.float64(-1.5),
+]
+
+
+def _fila(col):
+    return np.array([gedicol.to_num_auto(v) for v in col], dtype="float64")
+
+
+@pytest.mark.parametrize("v", CASOS, ids=repr)
+def test_paridad_por_valor(v):
+    assert gedicol.to_num_col(pd.Series([v], dtype=object)).tolist() == _fila([v]).tolist()
+
+
+def test_paridad_columna_mixta():
+    rng = np.random.default_rng(7)
+    x = np.round(rng.uniform(-2e6, 2e6, 2000), 2)
+    formatos = [lambda v: f"{v:,.2f}",                                              # 1,234.56
+                lambda v: f"{v:,.2f}".replace(",", "_").replace(".", ",").replace("_", "."),  # 1.234,56
+                lambda v: f"{v:,.0f}",                                              # 1,234,567
+                lambda v: f"{v:.1f}".replace(".", ","),                             # 5,6
+                lambda v: repr(v), lambda v: v, lambda v: ""]
+    col = pd.Series([formatos[i % len(formatos)](v) for i, v in enumerate(x)] + [None, np.nan], dtype=object)
+    r = gedicol.to_num_col(col)
+    assert r.index.equals(col.index)
+    np.testing.assert_array_equal(r.to_numpy(), _fila(col))
+
+
+def test_columnas_numericas():
+    col = pd.Series([1.5, np.nan, np.inf, -3.0])
+    assert gedicol.to_num_col(col).tolist() == [1.5, 0.0, 0.0, -3.0]
+    assert gedicol.to_num_col(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_costos_epm_solo_plantas_registradas():
+    raw = pd.DataFrame({
+        "anio": ["", "", "", "", "", 2025],
+        "mes": ["Costo kWh", "Costo kWh", "Costo kWh", "Promedio histórico", "Costo kWh", 5],
+        "planta": ["Monte Sereno Cafe", "N/A", "Total", "MERCADO", "OTRA", "CAFE"],
+        "energia_kwh": ["1,041", "999", "5", "5,100", "3", "100"],
+    })
+    ep, cx, ph, _ = gedicol.parse_epm_df(raw)
+    assert cx == {"CAFE": 1041.0}
+    assert ph == {"MERCADO": 5100.0}
+    assert ep["epm_kwh"].sum() == 100